@@ -0,0 +1,113 @@
+# benchmarks/bench_deadline_parse.py
+"""
+Микробенчмарк разбора дедлайнов (utils.datetime_parse).
+
+    python -m benchmarks.bench_deadline_parse --rounds 20000
+
+Печатает цену одного вызова по каждой форме ввода (без кэша и с
+попаданием в кэш) и показывает, что она не растёт вместе с грамматикой:
+к словарю и таблице правил добавляются тысячи синтетических записей,
+а для сравнения рядом замеряется «наивный» разбор — перебор по одному
+regex на правило, как было до табличной грамматики.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+SAMPLES = (
+    "2025-03-01 15:00",
+    "01.03",
+    "завтра 10:00",
+    "в пятницу 15:00",
+    "через 3 дня",
+    "+1d +2h",
+    "18:30",
+)
+
+
+def _parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--rounds", type=int, default=20000, help="вызовов на замер")
+    p.add_argument(
+        "--sizes", default="0,100,1000,10000", help="доп. правил в грамматике"
+    )
+    return p.parse_args()
+
+
+def _ns_per_call(fn, arg, rounds: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        fn(arg)
+    return (time.perf_counter() - t0) / rounds * 1e9
+
+
+def _grown(extra: int):
+    """Грамматика с extra синтетическими словами и правилами."""
+    from utils.datetime_parse import REL_UNITS, RULES, VOCAB, DeadlineGrammar
+
+    vocab = dict(VOCAB)
+    rules = dict(RULES)
+    for i in range(extra):
+        word = "слово" + "".join("абвгдежзик"[int(c)] for c in str(i))
+        vocab[word] = (f"X{i}", i)
+        rules[(f"X{i}", "TIME")] = RULES[("DAY", "TIME")]
+    return DeadlineGrammar(vocab, rules, REL_UNITS)
+
+
+def _naive(extra: int):
+    """Перебор fullmatch по списку шаблонов: цена растёт с числом правил."""
+    patterns = [re.compile(rf"слово{i} (\d{{1,2}}):(\d{{2}})") for i in range(extra)]
+    patterns += [
+        re.compile(r"(\d{4})-(\d{2})-(\d{2})\s+(\d{2}):(\d{2})"),
+        re.compile(r"(\d{4})-(\d{2})-(\d{2})"),
+        re.compile(r"(\d{1,2})\.(\d{1,2})"),
+        re.compile(r"(завтра|сегодня)\s+(\d{1,2}):(\d{2})"),
+        re.compile(r"в (пятницу|субботу)\s+(\d{1,2}):(\d{2})"),
+        re.compile(r"через (\d+) (дня|дней|день)"),
+        re.compile(r"\+(\d+)([dhm])(?: \+(\d+)([dhm]))?"),
+        re.compile(r"(\d{1,2}):(\d{2})"),
+    ]
+
+    def parse(text: str):
+        for p in patterns:
+            m = p.fullmatch(text)
+            if m:
+                return m.groups()
+        raise ValueError(text)
+
+    return parse
+
+
+def main(args: argparse.Namespace) -> None:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.datetime_parse import GRAMMAR, parse_deadline
+
+    now = datetime.now()
+    print(f"{'input':<18} {'uncached ns':>12} {'cached ns':>10}")
+    for text in SAMPLES:
+        cold = _ns_per_call(lambda t: GRAMMAR.parse(t, now), text, args.rounds)
+        parse_deadline(text)
+        hot = _ns_per_call(parse_deadline, text, args.rounds)
+        print(f"{text:<18} {cold:>12.0f} {hot:>10.0f}")
+
+    print()
+    print(f"{'extra rules':>11} {'table ns':>10} {'naive regex ns':>15}")
+    for extra in [int(x) for x in args.sizes.split(",") if x.strip()]:
+        grammar = _grown(extra)
+        naive = _naive(extra)
+        table = sum(
+            _ns_per_call(lambda t: grammar.parse(t, now), t, args.rounds)
+            for t in SAMPLES
+        ) / len(SAMPLES)
+        rounds = max(1, args.rounds // max(1, extra // 100))  # наивный медленный
+        brute = sum(_ns_per_call(naive, t, rounds) for t in SAMPLES) / len(SAMPLES)
+        print(f"{extra:>11} {table:>10.0f} {brute:>15.0f}")
+
+
+if __name__ == "__main__":
+    main(_parse_args())
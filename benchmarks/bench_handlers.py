@@ -0,0 +1,298 @@
+# benchmarks/bench_handlers.py
+"""
+Нагрузочный прогон обработчиков в одном процессе, без Telegram.
+
+Собирает настоящий Dispatcher из bot.build_dispatcher, подменяет сессию
+Bot API на FakeSession и гонит синтетические Update через
+dp.feed_update. База — локальная (по умолчанию SQLite во временном
+файле, нужен aiosqlite; или --dsn на локальный Postgres).
+
+    python -m benchmarks.bench_handlers --users 200 --tasks 500
+    python -m benchmarks.bench_handlers --dsn postgresql+asyncpg://... \\
+        --handlers show_active,paginate --concurrency 64
+
+Для каждого обработчика печатает updates/sec и p50/p95/p99 задержки
+одного апдейта.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+HANDLERS = ("show_active", "paginate", "done", "save", "feedback_send")
+
+
+def _parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--users", type=int, default=100)
+    p.add_argument("--tasks", type=int, default=200, help="задач на пользователя")
+    p.add_argument("--updates", type=int, default=2000, help="апдейтов на обработчик")
+    p.add_argument("--concurrency", type=int, default=32)
+    p.add_argument("--dsn", default=None, help="по умолчанию SQLite во временном файле")
+    p.add_argument("--handlers", default=",".join(HANDLERS))
+    p.add_argument("--admins", type=int, default=3, help="получателей обратной связи")
+    p.add_argument("--no-page-cache", action="store_true")
+    return p.parse_args()
+
+
+def _configure_env(args: argparse.Namespace) -> None:
+    # config.py читает окружение при импорте — настраиваем до импорта бота
+    dsn = args.dsn or "sqlite+aiosqlite:///" + os.path.join(
+        tempfile.mkdtemp(prefix="taskbot-bench-"), "bench.sqlite3"
+    )
+    os.environ["PG_DSN"] = dsn
+    os.environ.setdefault("BOT_TOKEN", "123456:BENCHMARK-FAKE-TOKEN")
+    os.environ["ADMINS"] = ",".join(str(900_000 + i) for i in range(args.admins))
+    os.environ["REMINDERS_ENABLED"] = "0"
+    os.environ["ARCHIVE_ENABLED"] = "0"
+    os.environ["STATS_RECONCILE_INTERVAL"] = "0"
+    for name in ("RATE_MESSAGE", "RATE_CALLBACK"):
+        os.environ[name] = "1000000"  # антиспам не должен мешать замеру
+    for name in ("SEND_RATE", "SEND_CHAT_RATE", "SEND_CHAT_BURST"):
+        os.environ[name] = "1000000"  # очередь исходящих — без лимитов Telegram
+    if args.no_page_cache:
+        os.environ["PAGE_CACHE_TTL"] = "0"
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def _seed(users: list[int], tasks_per_user: int) -> dict[int, list[int]]:
+    from sqlalchemy import insert, select
+
+    from models.db import get_sessionmaker, init_db
+    from models.task import Task, User
+    from services.stats_reconciler import RECONCILER
+
+    await init_db()
+    now = datetime.now()
+    Session = get_sessionmaker()
+    async with Session() as session:
+        await session.execute(
+            insert(User), [{"user_id": u, "username": f"u{u}"} for u in users]
+        )
+        rows = []
+        for u in users:
+            for i in range(tasks_per_user):
+                dl = now + timedelta(hours=random.randint(1, 24 * 90))
+                rows.append(
+                    {
+                        "user_id": u,
+                        "title": f"Задача {i} пользователя {u}",
+                        "deadline_ts": dl if i % 5 else None,
+                        "is_done": False,
+                        "created_ts": now,
+                    }
+                )
+        for i in range(0, len(rows), 10_000):
+            await session.execute(insert(Task), rows[i : i + 10_000])
+        await session.commit()
+    # задачи вставлены в обход storage.repo — счётчики user_stats по ним
+    await RECONCILER.run_once()
+    async with Session() as session:
+        res = await session.execute(select(Task.user_id, Task.id))
+        open_ids: dict[int, list[int]] = {u: [] for u in users}
+        for uid, tid in res.all():
+            open_ids[uid].append(tid)
+    return open_ids
+
+
+class Bench:
+    def __init__(self, args: argparse.Namespace):
+        from aiogram import Bot
+        from aiogram.client.default import DefaultBotProperties
+        from aiogram.enums import ParseMode
+
+        from benchmarks.fake_session import FakeSession
+        from bot import build_dispatcher
+        from services.outbox import OUTBOX
+
+        self.args = args
+        self.session = FakeSession()
+        self.bot = Bot(
+            token=os.environ["BOT_TOKEN"],
+            session=self.session,
+            default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+        )
+        self.session.middleware(OUTBOX)
+        self.dp = build_dispatcher()
+        self._update_id = 0
+        self._message_id = 0
+        self._page_data: dict[int, str] = {}
+
+    # ---------- синтетические апдейты ----------
+    def _ids(self) -> tuple[int, int]:
+        self._update_id += 1
+        self._message_id += 1
+        return self._update_id, self._message_id
+
+    def _user(self, uid: int):
+        from aiogram.types import User
+
+        return User(id=uid, is_bot=False, first_name="Bench", username=f"u{uid}")
+
+    def _message(self, uid: int, text: str):
+        from aiogram.types import Chat, Message
+
+        _, mid = self._ids()
+        return Message(
+            message_id=mid,
+            date=int(time.time()),
+            chat=Chat(id=uid, type="private"),
+            from_user=self._user(uid),
+            text=text,
+        )
+
+    def message_update(self, uid: int, text: str):
+        from aiogram.types import Update
+
+        msg = self._message(uid, text)
+        return Update(update_id=self._update_id, message=msg)
+
+    def callback_update(self, uid: int, data: str):
+        from aiogram.types import CallbackQuery, Update
+
+        msg = self._message(uid, "…")
+        return Update(
+            update_id=self._update_id,
+            callback_query=CallbackQuery(
+                id=str(self._update_id),
+                from_user=self._user(uid),
+                chat_instance="bench",
+                message=msg,
+                data=data,
+            ),
+        )
+
+    # ---------- сценарии ----------
+    async def _next_page_data(self, uid: int) -> str | None:
+        await self.dp.feed_update(self.bot, self.message_update(uid, "📋 Список дел"))
+        sent = self.session.last.get(("sendMessage", uid))
+        markup = getattr(sent, "reply_markup", None)
+        for row in getattr(markup, "inline_keyboard", []):
+            for btn in row:
+                if (btn.callback_data or "").startswith("page:1:"):
+                    return btn.callback_data
+        return None
+
+    async def prepare(self, handler: str, uid: int, open_ids: dict[int, list[int]]):
+        """Готовит апдейт для одного вызова обработчика (вне замера)."""
+        from handlers.feedback import FeedbackStates
+        from states.add_task import AddTaskStates
+
+        if handler == "show_active":
+            return self.message_update(uid, "📋 Список дел")
+        if handler == "paginate":
+            if uid not in self._page_data:
+                self._page_data[uid] = await self._next_page_data(uid) or "page:0"
+            return self.callback_update(uid, self._page_data[uid])
+        if handler == "done":
+            ids = open_ids[uid]
+            task_id = ids.pop() if ids else 0
+            return self.callback_update(uid, f"taskdone:{task_id}")
+
+        ctx = self.dp.fsm.get_context(self.bot, chat_id=uid, user_id=uid)
+        if handler == "save":
+            await ctx.set_state(AddTaskStates.confirm)
+            await ctx.set_data(
+                {
+                    "category": "Разработка",
+                    "title": "Новая задача из бенчмарка",
+                    "deadline": (datetime.now() + timedelta(days=3)).isoformat(),
+                }
+            )
+            return self.callback_update(uid, "task:save")
+        if handler == "feedback_send":
+            await ctx.set_state(FeedbackStates.confirm_send)
+            await ctx.set_data(
+                {
+                    "category": "idea",
+                    "text": "Предложение из бенчмарка, достаточно длинное.",
+                    "screenshots": ["photo-a", "photo-b", "photo-c"],
+                    "documents": [],
+                }
+            )
+            return self.callback_update(uid, "fb:send")
+        raise ValueError(handler)
+
+    async def run_handler(
+        self, handler: str, users: list[int], open_ids: dict[int, list[int]]
+    ) -> tuple[float, list[float]]:
+        sem = asyncio.Semaphore(self.args.concurrency)
+        latencies: list[float] = []
+        # один пользователь за раз: его апдейты идут последовательно, как в проде
+        locks = {u: asyncio.Lock() for u in users}
+
+        if handler == "paginate":
+            # курсор второй страницы берём из ответа на show_active — до замера
+            for uid in users:
+                await self.prepare(handler, uid, open_ids)
+
+        async def one(i: int):
+            uid = users[i % len(users)]
+            async with sem, locks[uid]:
+                update = await self.prepare(handler, uid, open_ids)
+                t0 = time.perf_counter()
+                await self.dp.feed_update(self.bot, update)
+                latencies.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(self.args.updates)))
+        return time.perf_counter() - t0, latencies
+
+
+def _pct(values: list[float]) -> tuple[float, float, float]:
+    if len(values) < 2:
+        v = values[0] if values else 0.0
+        return v, v, v
+    q = statistics.quantiles(values, n=100, method="inclusive")
+    return q[49], q[94], q[98]
+
+
+async def _main(args: argparse.Namespace) -> None:
+    users = [100_000 + i for i in range(args.users)]
+    t0 = time.perf_counter()
+    open_ids = await _seed(users, args.tasks)
+    print(
+        f"seeded {args.users} users × {args.tasks} tasks "
+        f"in {time.perf_counter() - t0:.1f}s ({os.environ['PG_DSN'].split('://')[0]})"
+    )
+
+    from handlers.add_task import DEFAULT_CATS
+    from storage.repo import warm_category_cache
+
+    await warm_category_cache(DEFAULT_CATS)
+    bench = Bench(args)
+    await bench.dp.emit_startup(bot=bench.bot)
+
+    print(
+        f"{'handler':<14} {'updates':>8} {'upd/s':>9} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    for handler in [h.strip() for h in args.handlers.split(",") if h.strip()]:
+        if handler not in HANDLERS:
+            raise SystemExit(f"unknown handler {handler!r}; choose from {HANDLERS}")
+        elapsed, lat = await bench.run_handler(handler, users, open_ids)
+        p50, p95, p99 = _pct(lat)
+        print(
+            f"{handler:<14} {len(lat):>8} {len(lat) / elapsed:>9.1f} "
+            f"{p50 * 1000:>8.2f} {p95 * 1000:>8.2f} {p99 * 1000:>8.2f}"
+        )
+
+    await bench.dp.emit_shutdown(bot=bench.bot)
+    print("Bot API calls:", dict(bench.session.calls))
+
+    from models.db import get_engine
+
+    await get_engine().dispose()  # иначе потоки aiosqlite не дают процессу выйти
+
+
+if __name__ == "__main__":
+    _args = _parse_args()
+    _configure_env(_args)
+    asyncio.run(_main(_args))
@@ -0,0 +1,195 @@
+# benchmarks/bench_http_session.py
+"""
+Сравнение HTTP-сессий Bot API на локальной заглушке (aiohttp-сервер).
+
+    python -m benchmarks.bench_http_session --calls 5000 --concurrency 50
+    python -m benchmarks.bench_http_session --idle 0   # без пауз, быстро
+
+Гоняет sendMessage с инлайн-клавиатурой через стандартную AiohttpSession
+и через services.http_session.BotHttpSession. Два сценария: поток вызовов
+с заданной конкурентностью и несколько коротких пачек с паузой --idle
+между ними (по умолчанию дольше 15 с — keep-alive aiohttp по умолчанию).
+Для каждого печатает вызовов/с, p50/p99 одного вызова и сколько TCP-
+соединений открыл клиент (по числу соединений, увиденных заглушкой).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import time
+
+
+def _parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--calls", type=int, default=5000, help="вызовов в потоке")
+    p.add_argument("--concurrency", type=int, default=50)
+    p.add_argument("--bursts", type=int, default=3, help="пачек в сценарии с паузами")
+    p.add_argument("--burst-size", type=int, default=20)
+    p.add_argument("--idle", type=float, default=16.0, help="пауза между пачками, с")
+    p.add_argument("--json", default="auto", help="JSON для BotHttpSession")
+    return p.parse_args()
+
+
+class Stub:
+    """
+    Заглушка Bot API в отдельном процессе (чтобы не делить event loop с
+    клиентом): отвечает на sendMessage, GET /connections — сколько TCP-
+    соединений она приняла с запуска.
+    """
+
+    def __init__(self):
+        self.transports: set = set()
+        self._message_id = 0
+
+    async def send(self, request):
+        from aiohttp import web
+
+        self.transports.add(request.transport)
+        if request.content_type == "application/json":
+            form = await request.json()
+        else:
+            form = await request.post()
+        self._message_id += 1
+        return web.json_response(
+            {
+                "ok": True,
+                "result": {
+                    "message_id": self._message_id,
+                    "date": int(time.time()),
+                    "chat": {"id": int(form["chat_id"]), "type": "private"},
+                    "text": form.get("text", ""),
+                    "reply_markup": {"inline_keyboard": []},
+                },
+            }
+        )
+
+    async def connections(self, request):
+        from aiohttp import web
+
+        return web.json_response(len(self.transports))
+
+    def serve(self, port: int) -> None:
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.send)
+        app.router.add_get("/connections", self.connections)
+        web.run_app(
+            app, host="127.0.0.1", port=port, keepalive_timeout=300, print=None
+        )
+
+
+def _start_stub() -> tuple[multiprocessing.Process, str]:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    proc = multiprocessing.Process(target=Stub().serve, args=(port,), daemon=True)
+    proc.start()
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return proc, f"http://localhost:{port}"
+
+
+async def _connections(base: str) -> int:
+    from aiohttp import ClientSession
+
+    async with ClientSession() as http:
+        async with http.get(f"{base}/connections") as resp:
+            return await resp.json()
+
+
+def _keyboard():
+    from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(text="✅ Готово", callback_data=f"taskdone:{i}"),
+                InlineKeyboardButton(text="ℹ️", callback_data=f"taskinfo:{i}"),
+            ]
+            for i in range(5)
+        ]
+    )
+
+
+async def _calls(bot, n: int, concurrency: int) -> list[float]:
+    kb = _keyboard()
+    latencies: list[float] = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with sem:
+            t0 = time.perf_counter()
+            await bot.send_message(1000 + i % 100, f"Задача #{i}", reply_markup=kb)
+            latencies.append(time.perf_counter() - t0)
+
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return latencies
+
+
+def _row(name: str, lat: list[float], elapsed: float, connects: int) -> str:
+    q = statistics.quantiles(lat, n=100)
+    return (
+        f"{name:<22} {len(lat) / elapsed:>9.0f} {q[49] * 1000:>8.2f} "
+        f"{q[98] * 1000:>8.2f} {connects:>9}"
+    )
+
+
+async def _run(args: argparse.Namespace, base: str) -> None:
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+
+    from services.http_session import BotHttpSession
+
+    api = TelegramAPIServer.from_base(base)
+    sessions = {
+        "AiohttpSession": lambda: AiohttpSession(api=api),
+        f"BotHttpSession/{args.json}": lambda: BotHttpSession(api=api, json=args.json),
+    }
+    print(f"{'session':<22} {'calls/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'connects':>9}")
+    for scenario in ("stream", "bursts"):
+        print(f"--- {scenario}")
+        for name, factory in sessions.items():
+            bot = Bot("123456:BENCHMARK-FAKE-TOKEN", session=factory())
+            await _calls(bot, args.concurrency, args.concurrency)  # прогрев пула
+            before = await _connections(base)
+            lat: list[float] = []
+            t0 = time.perf_counter()
+            if scenario == "stream":
+                lat = await _calls(bot, args.calls, args.concurrency)
+                elapsed = time.perf_counter() - t0
+            else:
+                elapsed = 0.0
+                for i in range(args.bursts):
+                    if i:
+                        await asyncio.sleep(args.idle)
+                    t0 = time.perf_counter()
+                    lat += await _calls(bot, args.burst_size, args.burst_size)
+                    elapsed += time.perf_counter() - t0
+            connects = await _connections(base) - before
+            print(_row(name, lat, elapsed, connects))
+            await bot.session.close()
+
+
+async def main(args: argparse.Namespace) -> None:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ.setdefault("BOT_TOKEN", "123456:BENCHMARK-FAKE-TOKEN")
+    proc, base = _start_stub()
+    try:
+        await _run(args, base)
+    finally:
+        proc.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(_parse_args()))
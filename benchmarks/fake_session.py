@@ -0,0 +1,69 @@
+# benchmarks/fake_session.py
+from __future__ import annotations
+
+import itertools
+import time
+from collections import Counter
+from typing import Any, AsyncGenerator, Optional, get_args, get_origin
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import Chat, Message
+
+
+class FakeSession(BaseSession):
+    """
+    Сессия Bot API без сети: запоминает вызовы и отвечает правдоподобной
+    заглушкой нужного типа (Message, list[Message], True).
+    """
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.calls: Counter[str] = Counter()
+        self.last: dict[tuple[str, int], TelegramMethod] = {}
+        self._ids = itertools.count(1)
+
+    async def make_request(
+        self,
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+        timeout: Optional[int] = None,
+    ) -> TelegramType:
+        name = method.__api_method__
+        self.calls[name] += 1
+        chat_id = getattr(method, "chat_id", None)
+        if isinstance(chat_id, int):
+            self.last[(name, chat_id)] = method
+        return self._result(method)
+
+    def _message(self, method: TelegramMethod) -> Message:
+        chat_id = getattr(method, "chat_id", None)
+        return Message(
+            message_id=next(self._ids),
+            date=int(time.time()),
+            chat=Chat(id=chat_id if isinstance(chat_id, int) else 0, type="private"),
+            text=getattr(method, "text", None),
+        )
+
+    def _result(self, method: TelegramMethod) -> Any:
+        ret = method.__returning__
+        if ret is Message or Message in get_args(ret):
+            return self._message(method)
+        if get_origin(ret) is list and get_args(ret)[0] is Message:
+            return [self._message(method) for _ in getattr(method, "media", [None])]
+        return True
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: Optional[dict[str, Any]] = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def close(self) -> None:
+        pass
@@ -1,30 +1,151 @@
 import asyncio
 import os
+import signal
+import sys
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 
-from config import ADMINS, BOT_TOKEN
-from handlers import add_task, feedback, start, tasks
-from middlewares.anti_spam import CooldownMiddleware
-from models.db import init_db
+from config import (
+    ADMINS,
+    ARCHIVE_ENABLED,
+    BOT_HTTP_DNS_TTL,
+    BOT_HTTP_KEEPALIVE,
+    BOT_HTTP_LIMIT,
+    BOT_JSON,
+    BOT_TOKEN,
+    BOT_WORKERS,
+    FSM_CACHE_SIZE,
+    FSM_CACHE_TTL,
+    FSM_FLUSH_INTERVAL,
+    FSM_STORAGE,
+    METRICS_ENABLED,
+    METRICS_LOG_INTERVAL,
+    METRICS_WORKER_PORT,
+    RATE_CALLBACK,
+    RATE_CALLBACK_BURST,
+    RATE_MAX_USERS,
+    RATE_MESSAGE,
+    RATE_MESSAGE_BURST,
+    REMINDERS_ENABLED,
+    SHUTDOWN_TIMEOUT,
+    SLOW_QUERY_MS,
+    STATS_RECONCILE_INTERVAL,
+    UPDATE_QUEUE_SIZE,
+    UPDATE_WORKERS,
+    WRITE_QUEUE_ENABLED,
+)
+from handlers import (
+    add_task,
+    export_tasks,
+    feedback,
+    import_tasks,
+    search,
+    start,
+    stats,
+    tasks,
+)
+from middlewares.anti_spam import TokenBucketMiddleware
+from models.db import get_engine, init_db
+from services.metrics import (
+    REGISTRY,
+    ApiTimingMiddleware,
+    log_metrics_periodically,
+    metrics_handler_factory,
+    setup_dispatcher_metrics,
+    tag_handlers,
+)
+from services.archiver import ARCHIVER
+from services.export import EXPORTS
+from services.http_session import BotHttpSession
+from services.outbox import OUTBOX
+from services.reminders import REMINDERS
+from services.stats_reconciler import RECONCILER
+from storage.cache import CATEGORY_CACHE, PAGE_CACHE
+from storage.repo import warm_category_cache
+from storage.user_lock import USER_LOCKS
+from storage.write_queue import WRITE_QUEUE
+from utils.startup import STARTUP
 
 BOT_MODE = os.getenv("BOT_MODE", "polling")  # 'polling' по умолчанию
 WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # нужен для webhook режима
 
 
-async def main():
-    await init_db()  # Создание таблиц
-    bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+def build_fsm_storage(multiprocess: bool = False):
+    if FSM_STORAGE == "memory":
+        if multiprocess:
+            # апдейты одного пользователя могут прийти в разные процессы
+            raise RuntimeError("BOT_WORKERS > 1 requires FSM_STORAGE=sql")
+        return MemoryStorage()
+    if FSM_STORAGE == "sql":
+        from storage.fsm import SQLAlchemyStorage
+
+        return SQLAlchemyStorage(
+            get_engine(),
+            # между процессами состояние должно быть видно сразу
+            flush_interval=0 if multiprocess else FSM_FLUSH_INTERVAL,
+            cache_size=FSM_CACHE_SIZE,
+            cache_ttl=0 if multiprocess else FSM_CACHE_TTL,
+        )
+    raise RuntimeError(f"Unknown FSM_STORAGE: {FSM_STORAGE!r} (memory | sql)")
+
+
+async def _start_reminders(bot: Bot):
+    REMINDERS.start(bot)
+
+
+async def _start_archiver():
+    ARCHIVER.start()
+
+
+async def _start_reconciler():
+    RECONCILER.start()
+
+
+async def _stop_metrics_log(metrics_log: asyncio.Task):
+    # metrics_log — из workflow_data диспетчера (dp["metrics_log"])
+    metrics_log.cancel()
+    try:
+        await metrics_log
+    except asyncio.CancelledError:
+        pass
+
+
+def build_bot() -> Bot:
+    session = BotHttpSession(
+        limit=BOT_HTTP_LIMIT,
+        keepalive=BOT_HTTP_KEEPALIVE,
+        dns_ttl=BOT_HTTP_DNS_TTL,
+        json=BOT_JSON,
+    )
+    bot = Bot(
+        token=BOT_TOKEN,
+        session=session,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+    # Все отправки — через общую очередь с лимитами Telegram; она снаружи,
+    # чтобы время ожидания в очереди не попадало в замер запроса
+    bot.session.middleware(OUTBOX)
+    if METRICS_ENABLED:
+        bot.session.middleware(ApiTimingMiddleware())
+        REGISTRY.add_collector("bot_http", session.stats)
+    return bot
+
 
+def build_dispatcher(multiprocess: bool = False, background: bool = True) -> Dispatcher:
     # FSM-хранилище
-    storage = MemoryStorage()
+    storage = build_fsm_storage(multiprocess)
     dp = Dispatcher(storage=storage)
-    antispam = CooldownMiddleware(
-        cooldown=1.0,
+    dp.shutdown.register(storage.close)  # сбросить отложенные записи FSM
+    antispam = TokenBucketMiddleware(
+        budgets={
+            "message": (RATE_MESSAGE, RATE_MESSAGE_BURST),
+            "callback_query": (RATE_CALLBACK, RATE_CALLBACK_BURST),
+        },
         whitelist={int(x) for x in (ADMINS or []) if str(x).strip().isdigit()},
+        max_users=RATE_MAX_USERS,
     )
 
     dp.message.middleware(antispam)
@@ -36,33 +157,218 @@ async def main():
         tasks.router,
         add_task.router,
         feedback.router,  # Обратная связь от пользователей
+        import_tasks.router,  # /import — пачка задач текстом или CSV
+        export_tasks.router,  # /export — вся история файлом
+        search.router,  # /find и inline-поиск по задачам
+        stats.router,  # /stats — сводка по счётчикам пользователя
+    )
+
+    # Фоновые задачи живут столько же, сколько диспетчер
+    if REMINDERS_ENABLED and background:
+        dp.startup.register(_start_reminders)  # напоминания о дедлайнах
+        dp.shutdown.register(REMINDERS.stop)
+    if ARCHIVE_ENABLED and background:
+        dp.startup.register(_start_archiver)  # перенос старых выполненных
+        dp.shutdown.register(ARCHIVER.stop)
+    if STATS_RECONCILE_INTERVAL > 0 and background:
+        dp.startup.register(_start_reconciler)  # сверка счётчиков user_stats
+        dp.shutdown.register(RECONCILER.stop)
+    if WRITE_QUEUE_ENABLED:
+        dp.shutdown.register(WRITE_QUEUE.stop)  # дописать накопленную пачку
+    dp.shutdown.register(EXPORTS.stop)
+    dp.shutdown.register(OUTBOX.stop)  # последней: дослать то, что поставили выше
+
+    if METRICS_ENABLED:
+        setup_dispatcher_metrics(dp)
+        REGISTRY.add_collector("page_cache", PAGE_CACHE.stats)
+        REGISTRY.add_collector("category_cache", CATEGORY_CACHE.stats)
+        REGISTRY.add_collector("antispam", antispam.stats)
+        REGISTRY.add_collector("export", EXPORTS.stats)
+        REGISTRY.add_collector("outbox", OUTBOX.stats)
+        if hasattr(storage, "stats"):
+            REGISTRY.add_collector("fsm", storage.stats)
+        if multiprocess:
+            REGISTRY.add_collector("user_locks", USER_LOCKS.stats)
+        if WRITE_QUEUE_ENABLED:
+            REGISTRY.add_collector("write_queue", WRITE_QUEUE.stats)
+        if REMINDERS_ENABLED and background:
+            REGISTRY.add_collector("reminders", REMINDERS.stats)
+        if ARCHIVE_ENABLED and background:
+            REGISTRY.add_collector("archiver", ARCHIVER.stats)
+        if STATS_RECONCILE_INTERVAL > 0 and background:
+            REGISTRY.add_collector("stats_reconciler", RECONCILER.stats)
+    elif SLOW_QUERY_MS > 0:
+        tag_handlers(dp)  # имя обработчика в логе медленных запросов
+    return dp
+
+
+async def serve_webhook(
+    bot: Bot,
+    dp: Dispatcher,
+    register_webhook: bool = True,
+    reuse_port: bool = False,
+    stop_event: asyncio.Event | None = None,
+    metrics_port: int | None = None,
+):
+    from aiogram.webhook.aiohttp_server import (
+        SimpleRequestHandler,
+        setup_application,
     )
+    from aiohttp import web
+
+    app = web.Application()
+
+    # Регистрируем обработчик webhook
+    if UPDATE_WORKERS > 0:
+        # апдейты одного пользователя — строго по порядку, разных — параллельно
+        from services.update_pool import ShardedUpdatePool
+
+        pool = ShardedUpdatePool(
+            dp, bot, workers=UPDATE_WORKERS, queue_size=UPDATE_QUEUE_SIZE
+        )
+        pool.register(app, path="/")
+        if METRICS_ENABLED:
+            REGISTRY.add_collector("update_pool", pool.stats)
+    else:
+        SimpleRequestHandler(dp, bot).register(app, path="/")
+    if METRICS_ENABLED:
+        app.router.add_get("/metrics", metrics_handler_factory())
+    # startup/shutdown диспетчера — вместе с приложением
+    setup_application(app, dp, bot=bot)
+
+    if register_webhook:
+
+        async def on_startup(app):
+            with STARTUP.step("webhook"):
+                await set_webhook(bot)
+
+        app.on_startup.append(on_startup)
+
+    port = int(os.environ.get("PORT", 8080))
+    # web.run_app поднимает свой event loop и не работает внутри
+    # asyncio.run(), поэтому запускаем сервер через AppRunner
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, port=port, reuse_port=reuse_port or None).start()
+    metrics_runner = None
+    if METRICS_ENABLED and metrics_port:
+        # /metrics именно этого процесса — на общем порту отвечает любой
+        metrics_app = web.Application()
+        metrics_app.router.add_get("/metrics", metrics_handler_factory())
+        metrics_runner = web.AppRunner(metrics_app)
+        await metrics_runner.setup()
+        await web.TCPSite(metrics_runner, port=metrics_port).start()
+    STARTUP.mark("http")
+    STARTUP.report()
+    try:
+        await (stop_event or asyncio.Event()).wait()
+    finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await runner.cleanup()
+
+
+async def set_webhook(bot: Bot):
+    if not WEBHOOK_URL:
+        raise RuntimeError("WEBHOOK_URL not set for webhook mode!")
+    await bot.set_webhook(WEBHOOK_URL)
+    print(f"Webhook set to {WEBHOOK_URL}")
+
+
+async def _init_db_timed():
+    with STARTUP.step("db"):
+        before, after = await init_db()  # схема по версии, см. models/migrations.py
+    if before != after:
+        STARTUP.notes.append(f"schema v{before} -> v{after}")
+
+
+async def main():
+    STARTUP.mark("imports")
+    await _init_db_timed()
+    with STARTUP.step("categories"):
+        await warm_category_cache(add_task.DEFAULT_CATS)  # системные категории
+    bot = build_bot()
+    dp = build_dispatcher()
 
     if BOT_MODE == "polling":
         print("Task Bot started in POLLING mode!")
+        if METRICS_ENABLED and METRICS_LOG_INTERVAL > 0:
+            # держим ссылку, иначе задачу может собрать GC
+            dp["metrics_log"] = asyncio.create_task(
+                log_metrics_periodically(METRICS_LOG_INTERVAL)
+            )
+            dp.shutdown.register(_stop_metrics_log)
+        STARTUP.mark("dispatcher")
+        STARTUP.report()
         await dp.start_polling(bot)
     else:
         # --- Webhook mode ---
         print("Task Bot started in WEBHOOK mode!")
-        from aiogram.webhook.aiohttp_server import SimpleRequestHandler
-        from aiohttp import web
+        await serve_webhook(bot, dp)
 
-        app = web.Application()
 
-        # Регистрируем обработчик webhook
-        SimpleRequestHandler(dp, bot).register(app, path="/")
+# --- Webhook mode, несколько процессов (BOT_WORKERS > 1) ---
+async def _prepare_workers():
+    """Один раз на все процессы: схема БД, системные категории и webhook."""
+    STARTUP.mark("imports")
+    await _init_db_timed()
+    with STARTUP.step("categories"):
+        # создаём здесь, до запуска воркеров: параллельно они вставили бы
+        # дубликаты (uq_cat_user_name не различает user_id IS NULL)
+        await warm_category_cache(add_task.DEFAULT_CATS)
+    bot = build_bot()
+    try:
+        with STARTUP.step("webhook"):
+            await set_webhook(bot)
+    finally:
+        await bot.session.close()
+    await get_engine().dispose()  # у каждого воркера будет свой пул
+    STARTUP.report()
 
-        async def on_startup(app):
-            if not WEBHOOK_URL:
-                raise RuntimeError("WEBHOOK_URL not set for webhook mode!")
-            await bot.set_webhook(WEBHOOK_URL)
-            print(f"Webhook set to {WEBHOOK_URL}")
 
-        app.on_startup.append(on_startup)
+async def _worker_main(index: int):
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    # Кэш страниц и память показанных списков живут в процессе и не видят
+    # записей соседей
+    PAGE_CACHE.ttl = 0
+    tasks.SKIP_UNCHANGED = False
+    # порядок апдейтов пользователя между процессами — замком в Postgres
+    USER_LOCKS.enabled = True
+    STARTUP.mark("imports")
+    with STARTUP.step("categories"):
+        # категории уже созданы в _prepare_workers — здесь только чтение в кэш
+        await warm_category_cache(add_task.DEFAULT_CATS)
+    bot = build_bot()
+    # Напоминания, архив и сверка — только в первом воркере, иначе они задвоятся
+    dp = build_dispatcher(multiprocess=True, background=index == 0)
+    print(f"Task Bot worker #{index} (pid {os.getpid()}) started in WEBHOOK mode!")
+    await serve_webhook(
+        bot,
+        dp,
+        register_webhook=False,
+        reuse_port=True,
+        stop_event=stop,
+        metrics_port=METRICS_WORKER_PORT + index if METRICS_WORKER_PORT else None,
+    )
+
+
+def worker_entry(index: int):
+    asyncio.run(_worker_main(index))
 
-        port = int(os.environ.get("PORT", 8080))
-        web.run_app(app, port=port)
+
+def run_multiprocess():
+    from services.workers import run_workers
+
+    asyncio.run(_prepare_workers())
+    sys.exit(run_workers(worker_entry, BOT_WORKERS, timeout=SHUTDOWN_TIMEOUT))
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if BOT_MODE != "polling" and BOT_WORKERS > 1:
+        run_multiprocess()
+    else:
+        asyncio.run(main())
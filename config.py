@@ -16,3 +16,94 @@ if not LOGGER.handlers:
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 PG_DSN = os.getenv("PG_DSN")
 ADMINS = os.getenv("ADMINS", "").split(",")
+
+# Кэш отрисованных страниц списка задач (storage/cache.py)
+PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", "2048"))
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", "300"))
+# Сколько уже записанных пользователей помнить, чтобы не писать их снова
+KNOWN_USERS_SIZE = int(os.getenv("KNOWN_USERS_SIZE", "100000"))
+
+# FSM-хранилище: memory | sql (storage/fsm.py)
+FSM_STORAGE = os.getenv("FSM_STORAGE", "memory")
+FSM_FLUSH_INTERVAL = float(os.getenv("FSM_FLUSH_INTERVAL", "1.0"))
+FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", "10000"))
+FSM_CACHE_TTL = float(os.getenv("FSM_CACHE_TTL", "30"))
+
+# Антиспам (middlewares/anti_spam.py): токенов/сек и ёмкость бакета
+RATE_MESSAGE = float(os.getenv("RATE_MESSAGE", "1.0"))
+RATE_MESSAGE_BURST = float(os.getenv("RATE_MESSAGE_BURST", "3"))
+RATE_CALLBACK = float(os.getenv("RATE_CALLBACK", "2.0"))
+RATE_CALLBACK_BURST = float(os.getenv("RATE_CALLBACK_BURST", "5"))
+RATE_MAX_USERS = int(os.getenv("RATE_MAX_USERS", "100000"))
+
+# Очередь исходящих сообщений (services/outbox.py): лимиты Telegram
+SEND_RATE = float(os.getenv("SEND_RATE", "30"))  # сообщений/сек на бота
+SEND_CHAT_RATE = float(os.getenv("SEND_CHAT_RATE", "1"))  # в один чат, в сек
+SEND_CHAT_BURST = float(os.getenv("SEND_CHAT_BURST", "3"))
+SEND_GROUP_PER_MINUTE = int(os.getenv("SEND_GROUP_PER_MINUTE", "20"))
+SEND_RETRIES = int(os.getenv("SEND_RETRIES", "3"))  # повторов после RetryAfter
+SEND_MAX_PENDING = int(os.getenv("SEND_MAX_PENDING", "10000"))
+
+# HTTP-сессия Bot API (services/http_session.py): пул соединений и JSON
+BOT_HTTP_LIMIT = int(os.getenv("BOT_HTTP_LIMIT", "100"))
+BOT_HTTP_KEEPALIVE = float(os.getenv("BOT_HTTP_KEEPALIVE", "60"))
+BOT_HTTP_DNS_TTL = int(os.getenv("BOT_HTTP_DNS_TTL", "300"))
+BOT_JSON = os.getenv("BOT_JSON", "auto")  # auto | orjson | json
+
+# Напоминания о дедлайнах (services/reminders.py)
+REMINDERS_ENABLED = os.getenv("REMINDERS_ENABLED", "1") == "1"
+REMINDER_LEAD_MINUTES = int(os.getenv("REMINDER_LEAD_MINUTES", "60"))
+REMINDER_WINDOW_MINUTES = int(os.getenv("REMINDER_WINDOW_MINUTES", "60"))
+REMINDER_MAX_PENDING = int(os.getenv("REMINDER_MAX_PENDING", "50000"))
+# При BOT_WORKERS > 1: как часто подбирать задачи, созданные другими процессами
+REMINDER_SYNC_SECONDS = float(os.getenv("REMINDER_SYNC_SECONDS", "10"))
+
+# Групповой коммит записей (storage/write_queue.py)
+WRITE_QUEUE_ENABLED = os.getenv("WRITE_QUEUE_ENABLED", "0") == "1"
+WRITE_QUEUE_WINDOW_MS = float(os.getenv("WRITE_QUEUE_WINDOW_MS", "10"))
+WRITE_QUEUE_MAX_BATCH = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "200"))
+
+# Webhook: пул воркеров с шардированием по пользователю (services/update_pool.py)
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", "16"))  # 0 — как раньше
+UPDATE_QUEUE_SIZE = int(os.getenv("UPDATE_QUEUE_SIZE", "100"))
+
+# Webhook: число процессов на одном порту (SO_REUSEPORT) и таймаут их остановки
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "1"))
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "25"))
+# Номер процесса-воркера; выставляет services/workers.py, None — один процесс
+WORKER_INDEX = (
+    int(os.environ["BOT_WORKER_INDEX"]) if "BOT_WORKER_INDEX" in os.environ else None
+)
+
+# Метрики (services/metrics.py): /metrics в webhook-режиме, лог — в polling
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_LOG_INTERVAL = float(os.getenv("METRICS_LOG_INTERVAL", "300"))
+# При BOT_WORKERS > 1: воркер i отдаёт свои /metrics ещё и на порту
+# METRICS_WORKER_PORT + i (общий порт попадает в случайный воркер); 0 — нет
+METRICS_WORKER_PORT = int(os.getenv("METRICS_WORKER_PORT", "0"))
+
+# Лог медленных запросов (services/slow_queries.py); 0 — выключен
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "slow_queries.jsonl")
+SLOW_QUERY_EXPLAIN_SAMPLE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE", "0.1"))
+SLOW_QUERY_LOG_MAX_MB = float(os.getenv("SLOW_QUERY_LOG_MAX_MB", "10"))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "5"))
+
+# Импорт задач (/import): строк за раз и размер CSV-файла
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "1000"))
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(1024 * 1024)))
+
+# Выгрузка задач (/export): одновременных выгрузок и сколько держать в памяти
+EXPORT_CONCURRENCY = int(os.getenv("EXPORT_CONCURRENCY", "2"))
+EXPORT_SPOOL_BYTES = int(os.getenv("EXPORT_SPOOL_BYTES", str(1024 * 1024)))
+
+# Архив выполненных задач (services/archiver.py)
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "1") == "1"
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_BATCH = int(os.getenv("ARCHIVE_BATCH", "1000"))
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "3600"))  # сек
+
+# Сверка счётчиков user_stats с задачами (services/stats_reconciler.py);
+# интервал 0 — выключена
+STATS_RECONCILE_INTERVAL = float(os.getenv("STATS_RECONCILE_INTERVAL", "3600"))  # сек
+STATS_RECONCILE_BATCH = int(os.getenv("STATS_RECONCILE_BATCH", "500"))
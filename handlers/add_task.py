@@ -5,10 +5,12 @@ from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 
+from config import WRITE_QUEUE_ENABLED
 from keyboards.tasks import categories_kb, confirm_kb
 from models.db import get_sessionmaker
 from states.add_task import AddTaskStates
-from storage.repo import ensure_user, get_or_create_category
+from storage.repo import ensure_user, get_category_id
+from storage.write_queue import WRITE_QUEUE
 from utils.datetime_parse import parse_deadline
 
 router = Router()
@@ -44,8 +46,8 @@ async def type_title(message: Message, state: FSMContext):
     await state.update_data(title=title)
     await state.set_state(AddTaskStates.typing_deadline)
     await message.answer(
-        "Введите дедлайн в формате YYYY-MM-DD или YYYY-MM-DD HH:MM.\n"
-        "Или напишите «без дедлайна»."
+        "Введите дедлайн: YYYY-MM-DD [HH:MM], ДД.ММ [HH:MM], «завтра 10:00»,\n"
+        "«в пятницу 15:00», «через 3 дня», «+2h». Или напишите «без дедлайна»."
     )
 
 
@@ -83,20 +85,38 @@ async def save(cb: CallbackQuery, state: FSMContext):
     title = data.get("title")
     deadline_iso = data.get("deadline")
 
+    if WRITE_QUEUE_ENABLED:
+        # групповой коммит: запись уходит пачкой вместе с соседними апдейтами
+        from datetime import datetime
+
+        await WRITE_QUEUE.create_task(
+            cb.from_user.id,
+            cb.from_user.username,
+            title,
+            cat_name,
+            datetime.fromisoformat(deadline_iso) if deadline_iso else None,
+        )
+        await state.clear()
+        await cb.message.edit_text("✅ Задача сохранена!")
+        await cb.answer()
+        return
+
     Session = get_sessionmaker()
     async with Session() as session:
         await ensure_user(session, cb.from_user.id, cb.from_user.username)
-        category = None
+        category_id = None
         if cat_name:
-            category = await get_or_create_category(
+            category_id = await get_category_id(
                 session, user_id=None, name=cat_name
-            )  # системная категория
+            )  # системная категория, обычно из кэша
         from datetime import datetime
 
         from storage.repo import create_task
 
         dl = datetime.fromisoformat(deadline_iso) if deadline_iso else None
-        await create_task(session, cb.from_user.id, title, category, dl)
+        await create_task(
+            session, cb.from_user.id, title, None, dl, category_id=category_id
+        )
         await session.commit()
 
     await state.clear()
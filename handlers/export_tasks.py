@@ -0,0 +1,23 @@
+# app/routers/export_tasks.py
+from __future__ import annotations
+
+from aiogram import Bot, Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from services.export import EXPORTS, FORMATS
+
+router = Router()
+
+
+@router.message(Command("export"))
+async def cmd_export(message: Message, command: CommandObject, bot: Bot):
+    fmt = (command.args or "csv").strip().lower()
+    if fmt not in FORMATS:
+        await message.answer("Формат выгрузки: /export csv или /export jsonl")
+        return
+    # выгрузка идёт в фоне — обработчик не ждёт чтения истории
+    if not EXPORTS.start(bot, message.chat.id, message.from_user.id, fmt):
+        await message.answer("Выгрузка уже готовится, подождите немного.")
+        return
+    await message.answer("Готовлю выгрузку, пришлю файлом.")
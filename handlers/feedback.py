@@ -1,28 +1,40 @@
 # handlers/feedback.py
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime
+from typing import Awaitable, Callable
 
 from aiogram import Bot, F, Router
 from aiogram.enums import ParseMode
-from aiogram.exceptions import TelegramBadRequest
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import (
     CallbackQuery,
     InlineKeyboardButton,
     InlineKeyboardMarkup,
+    InputMediaDocument,
+    InputMediaPhoto,
     Message,
     ReplyKeyboardRemove,
 )
 
-from config import ADMINS
+from config import ADMINS, LOGGER
 from keyboards.main import MAIN_MENU
 from models.db import get_sessionmaker
 from models.feedback import Feedback
+from services.outbox import OutboxFull, send_later
 
 router = Router()
 
+CAPTION_LIMIT = 1024  # лимит Telegram на подпись к медиа
+ALBUM_LIMIT = 10  # максимум элементов в send_media_group
+
 
 # ================== Keyboards ==================
 def feedback_start_kb() -> InlineKeyboardMarkup:
@@ -82,20 +94,103 @@ def parse_admin_ids(raw) -> list[int]:
     return list(dict.fromkeys(out))
 
 
-async def safe_send_message(bot: Bot, chat_id: int, *args, **kwargs) -> bool:
+async def _send_with_retry(call: Callable[[], Awaitable]) -> bool:
+    """
+    Вызов Bot API; темп и повторы после TelegramRetryAfter — в очереди
+    исходящих (services/outbox.py). Сюда RetryAfter доходит, только если
+    повторы исчерпаны.
+    """
     try:
-        await bot.send_message(chat_id, *args, **kwargs)
+        await call()
         return True
-    except TelegramBadRequest:
+    except (
+        TelegramBadRequest,
+        TelegramForbiddenError,
+        TelegramRetryAfter,
+        OutboxFull,
+    ) as e:
+        LOGGER.warning("Send failed: %s", e)
         return False
 
 
+async def safe_send_message(bot: Bot, chat_id: int, *args, **kwargs) -> bool:
+    return await _send_with_retry(lambda: bot.send_message(chat_id, *args, **kwargs))
+
+
 async def safe_send_photo(bot: Bot, chat_id: int, *args, **kwargs) -> bool:
-    try:
-        await bot.send_photo(chat_id, *args, **kwargs)
-        return True
-    except TelegramBadRequest:
-        return False
+    return await _send_with_retry(lambda: bot.send_photo(chat_id, *args, **kwargs))
+
+
+async def safe_send_document(bot: Bot, chat_id: int, *args, **kwargs) -> bool:
+    return await _send_with_retry(
+        lambda: bot.send_document(chat_id, *args, **kwargs)
+    )
+
+
+async def safe_send_media_group(bot: Bot, chat_id: int, media: list) -> bool:
+    return await _send_with_retry(lambda: bot.send_media_group(chat_id, media=media))
+
+
+async def _send_album(
+    bot: Bot, chat_id: int, kind: str, file_ids: list[str], caption: str | None
+) -> bool:
+    # один файл нельзя отправить альбомом: send_media_group требует 2–10
+    extra = {"caption": caption, "parse_mode": ParseMode.HTML} if caption else {}
+    if len(file_ids) == 1:
+        if kind == "photo":
+            return await safe_send_photo(bot, chat_id, file_ids[0], **extra)
+        return await safe_send_document(bot, chat_id, file_ids[0], **extra)
+    media_cls = InputMediaPhoto if kind == "photo" else InputMediaDocument
+    media = [
+        media_cls(media=fid, **(extra if i == 0 else {}))
+        for i, fid in enumerate(file_ids)
+    ]
+    return await safe_send_media_group(bot, chat_id, media)
+
+
+async def deliver_feedback(
+    bot: Bot,
+    admin_id: int,
+    caption: str,
+    photos: list[str],
+    documents: list[str],
+) -> bool:
+    """Одному админу: текст и вложения альбомами (фото и файлы отдельно)."""
+    text: str | None = caption
+    if not (photos or documents) or len(caption) > CAPTION_LIMIT:
+        if not await safe_send_message(
+            bot, admin_id, caption, parse_mode=ParseMode.HTML
+        ):
+            return False
+        text = None
+    ok = True
+    for kind, ids in (("photo", photos), ("document", documents)):
+        for i in range(0, len(ids), ALBUM_LIMIT):
+            chunk = ids[i : i + ALBUM_LIMIT]
+            sent = await _send_album(bot, admin_id, kind, chunk, text)
+            if sent:
+                text = None  # подпись — только у первого альбома
+            ok = ok and sent
+    return ok
+
+
+async def _deliver_to_admins(
+    bot: Bot,
+    admin_ids: list[int],
+    caption: str,
+    photos: list[str],
+    documents: list[str],
+) -> None:
+    results = await asyncio.gather(
+        *(
+            deliver_feedback(bot, admin_id, caption, photos, documents)
+            for admin_id in admin_ids
+        ),
+        return_exceptions=True,
+    )
+    failed = [a for a, r in zip(admin_ids, results) if r is not True]
+    if failed:
+        LOGGER.warning("Feedback not delivered to admins: %s", failed)
 
 
 async def _clear_inline(cb: CallbackQuery):
@@ -145,7 +240,7 @@ async def feedback_text(message: Message, state: FSMContext):
     if len(txt) < 10:
         await message.answer("Коротко. Пожалуйста, опишите подробнее (от 10 символов).")
         return
-    await state.update_data(text=txt, screenshots=[])
+    await state.update_data(text=txt, screenshots=[], documents=[])
     await state.set_state(FeedbackStates.confirm_send)
     await message.answer(
         "Принято. Хотите добавить скриншот(ы)? Если да — нажмите «Добавить скрин», "
@@ -171,18 +266,18 @@ async def feedback_wait_screenshot(cb: CallbackQuery, state: FSMContext):
 async def feedback_collect_screenshot(message: Message, state: FSMContext):
     data = await state.get_data()
     screenshots: list[str] = data.get("screenshots", [])
+    documents: list[str] = data.get("documents", [])
 
-    file_id = None
+    # фото и файлы копим раздельно: в одном альбоме их смешивать нельзя
     if message.photo:
-        file_id = message.photo[-1].file_id
+        screenshots.append(message.photo[-1].file_id)
     elif message.document:
-        file_id = message.document.file_id
+        documents.append(message.document.file_id)
 
-    if file_id:
-        screenshots.append(file_id)
-        await state.update_data(screenshots=screenshots)
+    if message.photo or message.document:
+        await state.update_data(screenshots=screenshots, documents=documents)
         await message.answer(
-            f"Скрин добавлен. Всего: {len(screenshots)}",
+            f"Скрин добавлен. Всего: {len(screenshots) + len(documents)}",
             reply_markup=feedback_attach_kb(),
         )
     else:
@@ -200,6 +295,7 @@ async def feedback_send(cb: CallbackQuery, state: FSMContext, bot: Bot):
     cat: str = data.get("category", "unknown")
     text: str = data.get("text", "")
     screenshots: list[str] = data.get("screenshots", [])
+    documents: list[str] = data.get("documents", [])
     user = cb.from_user
 
     # 1) save to DB (SQLAlchemy)
@@ -224,24 +320,13 @@ async def feedback_send(cb: CallbackQuery, state: FSMContext, bot: Bot):
     )
     admin_ids = parse_admin_ids(ADMINS)
 
-    if not admin_ids:
-        # Если не настроены админы, завершаем, сообщив пользователю об успехе
-        pass
-    elif not screenshots:
-        for admin_id in admin_ids:
-            await safe_send_message(bot, admin_id, caption, parse_mode=ParseMode.HTML)
-    else:
-        for admin_id in admin_ids:
-            ok = await safe_send_photo(
-                bot,
-                admin_id,
-                screenshots[0],
-                caption=caption,
-                parse_mode=ParseMode.HTML,
-            )
-            if ok:
-                for file_id in screenshots[1:]:
-                    await safe_send_photo(bot, admin_id, file_id)
+    # Если админы не настроены, просто сообщаем пользователю об успехе.
+    # Админам — в фоне, полосой уведомлений: ответ пользователю не ждёт
+    # рассылки, её темп держит очередь исходящих.
+    if admin_ids:
+        send_later(
+            _deliver_to_admins(bot, admin_ids, caption, screenshots, documents)
+        )
 
     # 3) user reply
     await state.clear()
@@ -0,0 +1,115 @@
+# app/routers/import_tasks.py
+from __future__ import annotations
+
+import io
+from typing import Iterable
+
+from aiogram import Bot, F, Router
+from aiogram.filters import Command
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message
+
+from config import IMPORT_MAX_BYTES, IMPORT_MAX_ROWS
+from handlers.add_task import DEFAULT_CATS
+from models.db import get_sessionmaker
+from states.import_tasks import ImportStates
+from storage.repo import create_tasks_bulk, ensure_user, resolve_categories
+from utils.task_import import parse_rows
+
+router = Router()
+
+IMPORT_HELP = (
+    "Пришлите задачи сообщением — по одной в строке — или CSV-файлом:\n"
+    "<code>категория;название;дедлайн</code>\n\n"
+    "Категорию и дедлайн можно не указывать. Пример:\n"
+    "<code>Разработка;Починить логин;завтра 12:00\n"
+    "Дизайн;Макет главной;01.03\n"
+    "Позвонить бухгалтеру</code>"
+)
+ERRORS_SHOWN = 20
+_SYSTEM_CATS = {c.lower(): c for c in DEFAULT_CATS}
+
+
+@router.message(Command("import"))
+async def cmd_import(message: Message, state: FSMContext):
+    # строки можно прислать прямо под командой: "/import\nа;б;в\n..."
+    body = (message.text or "").partition("\n")[2]
+    if body.strip():
+        await state.clear()
+        await _import(message, body.splitlines())
+        return
+    await state.set_state(ImportStates.waiting)
+    await message.answer(IMPORT_HELP)
+
+
+@router.message(ImportStates.waiting, F.document)
+async def import_file(message: Message, state: FSMContext, bot: Bot):
+    doc = message.document
+    if doc.file_size and doc.file_size > IMPORT_MAX_BYTES:
+        await message.answer(
+            f"Файл слишком большой (максимум {IMPORT_MAX_BYTES // 1024} КБ)."
+        )
+        return
+    await state.clear()
+    buf = await bot.download(doc)
+    # файл читается построчно, без декодирования целиком
+    text = io.TextIOWrapper(buf, encoding="utf-8-sig", errors="replace", newline="")
+    await _import(message, text)
+
+
+@router.message(ImportStates.waiting, F.text)
+async def import_text(message: Message, state: FSMContext):
+    await state.clear()
+    await _import(message, message.text.splitlines())
+
+
+async def _import(message: Message, lines: Iterable[str]):
+    rows, errors = parse_rows(lines, IMPORT_MAX_ROWS)
+    if rows:
+        uid = message.from_user.id
+        # системные категории узнаём без учёта регистра, остальные — личные
+        cats = [_category_name(r.category) for r in rows]
+        names = set(filter(None, cats))
+        Session = get_sessionmaker()
+        async with Session() as session:
+            await ensure_user(session, uid, message.from_user.username)
+            cat_ids = await resolve_categories(
+                session, None, names & set(DEFAULT_CATS)
+            )
+            cat_ids.update(
+                await resolve_categories(session, uid, names - cat_ids.keys())
+            )
+            await create_tasks_bulk(
+                session,
+                [
+                    {
+                        "user_id": uid,
+                        "title": r.title,
+                        "category_id": cat_ids.get(cat) if cat else None,
+                        "deadline_ts": r.deadline,
+                    }
+                    for r, cat in zip(rows, cats)
+                ],
+            )
+            await session.commit()
+    await message.answer(_report(len(rows), errors))
+
+
+def _category_name(name: str | None) -> str | None:
+    if not name:
+        return None
+    return _SYSTEM_CATS.get(name.lower(), name)
+
+
+def _report(imported: int, errors: list[tuple[int, str]]) -> str:
+    if not imported and not errors:
+        return "Не нашёл ни одной задачи. " + IMPORT_HELP
+    text = f"✅ Импортировано задач: {imported}"
+    if errors:
+        text += f"\n⚠️ Пропущено строк: {len(errors)}"
+        text += "".join(
+            f"\n• строка {line}: {msg}" for line, msg in errors[:ERRORS_SHOWN]
+        )
+        if len(errors) > ERRORS_SHOWN:
+            text += f"\n… и ещё {len(errors) - ERRORS_SHOWN}"
+    return text
@@ -0,0 +1,133 @@
+# app/routers/search.py
+from __future__ import annotations
+
+import html
+
+from aiogram import F, Router
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject
+from aiogram.types import (
+    CallbackQuery,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InlineQuery,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+    Message,
+)
+
+from models.db import get_sessionmaker
+from storage.repo import search_tasks, search_terms
+
+router = Router()
+
+PAGE_SIZE = 5
+INLINE_PAGE_SIZE = 20
+MAX_RESULTS = 200  # дальше OFFSET дорожает, а листать столько никто не станет
+# callback_data — не длиннее 64 байт: "find:{offset}:" + запрос
+QUERY_MAX_BYTES = 48
+
+FIND_HELP = (
+    "Поиск по активным задачам: <code>/find слова</code>\n"
+    "Например: <code>/find логин</code>. Можно и в любом чате: "
+    "<code>@имя_бота логин</code>."
+)
+
+
+def _clip(query: str) -> str:
+    """Запрос без лишних пробелов, не длиннее QUERY_MAX_BYTES в UTF-8."""
+    query = " ".join(query.split())
+    raw = query.encode()[:QUERY_MAX_BYTES]
+    return raw.decode(errors="ignore").strip()
+
+
+def _line(t) -> str:
+    cat = f"[{html.escape(t.category.name)}] " if t.category else ""
+    dl = f" — до {t.deadline_ts:%Y-%m-%d %H:%M}" if t.deadline_ts else ""
+    return f"• [#{t.id}] {cat}{html.escape(t.title)}{dl}"
+
+
+async def _search(user_id: int, query: str, limit: int, offset: int):
+    Session = get_sessionmaker()
+    async with Session() as session:
+        return await search_tasks(session, user_id, query, limit=limit, offset=offset)
+
+
+async def _render(
+    user_id: int, query: str, offset: int
+) -> tuple[str, InlineKeyboardMarkup | None]:
+    tasks, has_next = await _search(user_id, query, PAGE_SIZE, offset)
+    has_next = has_next and offset + PAGE_SIZE < MAX_RESULTS
+    head = f"<b>Поиск</b>: {html.escape(query)}\n"
+    if not tasks:
+        return head + "Ничего не найдено.", None
+    nav = []
+    if offset > 0:
+        prev = max(0, offset - PAGE_SIZE)
+        nav.append(
+            InlineKeyboardButton(text="⬅️ Назад", callback_data=f"find:{prev}:{query}")
+        )
+    if has_next:
+        nxt = offset + PAGE_SIZE
+        nav.append(
+            InlineKeyboardButton(text="Вперёд ➡️", callback_data=f"find:{nxt}:{query}")
+        )
+    kb = InlineKeyboardMarkup(inline_keyboard=[nav]) if nav else None
+    return head + "\n".join(_line(t) for t in tasks), kb
+
+
+@router.message(Command("find"))
+async def cmd_find(message: Message, command: CommandObject):
+    query = _clip(command.args or "")
+    if not search_terms(query):
+        await message.answer(FIND_HELP)
+        return
+    text, kb = await _render(message.from_user.id, query, 0)
+    await message.answer(text, reply_markup=kb)
+
+
+@router.callback_query(F.data.startswith("find:"))
+async def find_page(cb: CallbackQuery):
+    _, offset, query = cb.data.split(":", 2)
+    text, kb = await _render(cb.from_user.id, query, max(0, int(offset)))
+    try:
+        await cb.message.edit_text(text, reply_markup=kb)
+    except TelegramBadRequest:
+        pass  # двойное нажатие: «message is not modified»
+    await cb.answer()
+
+
+@router.inline_query()
+async def inline_find(query: InlineQuery):
+    text = _clip(query.query)
+    offset = int(query.offset) if query.offset.isdigit() else 0
+    if not search_terms(text) or offset >= MAX_RESULTS:
+        await query.answer([], cache_time=5, is_personal=True)
+        return
+    tasks, has_next = await _search(query.from_user.id, text, INLINE_PAGE_SIZE, offset)
+    results = [
+        InlineQueryResultArticle(
+            id=str(t.id),
+            title=t.title[:100],
+            description=" · ".join(
+                filter(
+                    None,
+                    [
+                        t.category.name if t.category else None,
+                        f"до {t.deadline_ts:%d.%m %H:%M}" if t.deadline_ts else None,
+                    ],
+                )
+            )
+            or None,
+            input_message_content=InputTextMessageContent(
+                message_text=_line(t), parse_mode="HTML"
+            ),
+        )
+        for t in tasks
+    ]
+    await query.answer(
+        results,
+        cache_time=10,
+        is_personal=True,
+        next_offset=str(offset + len(tasks)) if has_next else "",
+    )
@@ -0,0 +1,28 @@
+# app/routers/stats.py
+from __future__ import annotations
+
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.types import Message
+
+from models.db import get_sessionmaker
+from storage.repo import get_user_stats
+
+router = Router()
+
+
+@router.message(Command("stats"))
+async def cmd_stats(message: Message):
+    Session = get_sessionmaker()
+    async with Session() as session:
+        s = await get_user_stats(session, message.from_user.id)
+        await session.commit()  # строка счётчиков, если её только что посчитали
+    await message.answer(
+        "<b>Статистика</b>\n"
+        f"Активных задач: {s.open}\n"
+        f"Просрочено: {s.overdue}\n"
+        f"Выполнено сегодня: {s.done_today}\n"
+        f"Выполнено за неделю: {s.done_week}\n"
+        f"Выполнено всего: {s.done_total}",
+        parse_mode="HTML",
+    )
@@ -1,106 +1,233 @@
 # app/routers/tasks.py
 from __future__ import annotations
 
+import hashlib
+import html
+from collections import OrderedDict
+
 from aiogram import F, Router
-from aiogram.types import CallbackQuery, Message
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, Message
 
 from keyboards.tasks import tasks_list_kb
+from config import WRITE_QUEUE_ENABLED
 from models.db import get_sessionmaker
-from models.task import Task
+from storage.cache import PAGE_CACHE
 from storage.repo import (
-    count_tasks_active,
-    list_tasks_active,
+    TaskKey,
+    decode_cursor,
+    encode_cursor,
+    list_active_page,
     list_tasks_done,
     mark_done,
 )
+from storage.user_lock import USER_LOCKS
+from storage.write_queue import WRITE_QUEUE
 
 router = Router()
 PAGE_SIZE = 5
 
+# (chat_id, message_id) -> хэши показанных текста и клавиатуры списка
+_SHOWN: OrderedDict[tuple[int, int], tuple[str, str]] = OrderedDict()
+_SHOWN_LIMIT = 10_000
+# Пропускать правки по _SHOWN. При нескольких процессах (bot._worker_main)
+# сообщение мог обновить соседний воркер, и его память устарела: там
+# правим всегда, а совпадение ловим по «message is not modified»
+SKIP_UNCHANGED = True
+
 
 def _render_task_line(t) -> str:
-    cat = f"[{t.category.name}] " if t.category else ""
+    cat = f"[{html.escape(t.category.name)}] " if t.category else ""
     dl = f" — до {t.deadline_ts:%Y-%m-%d %H:%M}" if t.deadline_ts else ""
-    return f"[#{t.id}] {cat}{t.title}{dl}"
+    return f"[#{t.id}] {cat}{html.escape(t.title)}{dl}"
 
 
-@router.message(F.text == "📋 Список дел")
-async def show_active(message: Message):
-    await _send_active_page(message.chat.id, message, page=0)
+def _digest(text: str, kb: InlineKeyboardMarkup) -> tuple[str, str]:
+    def h(s: str) -> str:
+        return hashlib.blake2b(s.encode(), digest_size=8).hexdigest()
 
+    return h(text), h(kb.model_dump_json(exclude_none=True))
 
-async def _send_active_page(chat_id: int, message_or_cb, page: int):
-    Session = get_sessionmaker()
-    async with Session() as session:
-        tasks, total = await _list_active(chat_id, PAGE_SIZE, page * PAGE_SIZE)
-    has_next = (page + 1) * PAGE_SIZE < total
+
+def _remember_shown(message: Message, digest: tuple[str, str]) -> None:
+    if not SKIP_UNCHANGED:
+        return
+    key = (message.chat.id, message.message_id)
+    _SHOWN[key] = digest
+    _SHOWN.move_to_end(key)
+    if len(_SHOWN) > _SHOWN_LIMIT:
+        _SHOWN.popitem(last=False)
+
+
+@router.message(F.text == "📋 Список дел")
+async def show_active(message: Message):
+    text, kb, digest = await _load_active_page(message.chat.id, page=0)
+    sent = await message.answer(text, parse_mode="HTML", reply_markup=kb)
+    _remember_shown(sent, digest)
+
+
+async def _load_active_page(
+    chat_id: int,
+    page: int,
+    after: TaskKey | None = None,
+    before: TaskKey | None = None,
+) -> tuple[str, InlineKeyboardMarkup, tuple[str, str]]:
+    cursor = encode_cursor(after or before) if (after or before) else ""
+    key = (page, "p" if before else "n", cursor)
+
+    async def load():
+        text, kb = await _render_active_page(chat_id, page, after, before)
+        return text, kb, _digest(text, kb)
+
+    return await PAGE_CACHE.get_or_load(chat_id, key, load)
+
+
+async def _show_in_place(
+    message: Message, text: str, kb: InlineKeyboardMarkup, digest: tuple[str, str]
+) -> None:
+    """
+    Показывает страницу в том же сообщении. Без вызова API, если
+    содержимое не изменилось; только клавиатура, если изменилась лишь она.
+    """
+    shown = (
+        _SHOWN.get((message.chat.id, message.message_id)) if SKIP_UNCHANGED else None
+    )
+    if shown == digest:
+        return
+    try:
+        if shown is not None and shown[0] == digest[0]:
+            await message.edit_reply_markup(reply_markup=kb)
+        else:
+            await message.edit_text(text, parse_mode="HTML", reply_markup=kb)
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            # старое или удалённое сообщение редактировать нельзя — шлём новое
+            message = await message.answer(text, parse_mode="HTML", reply_markup=kb)
+    _remember_shown(message, digest)
+
+
+async def _render_active_page(
+    chat_id: int,
+    page: int,
+    after: TaskKey | None = None,
+    before: TaskKey | None = None,
+) -> tuple[str, InlineKeyboardMarkup]:
+    tasks, has_next = await _list_active(
+        chat_id, PAGE_SIZE, after=after, before=before
+    )
+    if before is not None and len(tasks) < PAGE_SIZE:
+        # Дошли до начала списка — показываем первую страницу целиком
+        page = 0
+        tasks, has_next = await _list_active(chat_id, PAGE_SIZE)
     lines = "\n".join(_render_task_line(t) for t in tasks) or "Активных задач нет."
     pairs = [(t.id, t.title) for t in tasks]
-    kb = tasks_list_kb(pairs, page=page, has_next=has_next, done_buttons=True)
-    await message_or_cb.answer(
-        f"<b>Активные задачи</b>:\n{lines}", parse_mode="HTML", reply_markup=kb
+    kb = tasks_list_kb(
+        pairs,
+        page=page,
+        has_next=has_next,
+        done_buttons=True,
+        first_cursor=encode_cursor(TaskKey.of(tasks[0])) if tasks else None,
+        last_cursor=encode_cursor(TaskKey.of(tasks[-1])) if tasks else None,
     )
+    return f"<b>Активные задачи</b>:\n{lines}", kb
+
+
+def _parse_page_cb(data: str) -> tuple[int, TaskKey | None, TaskKey | None]:
+    # page:{номер}:{n|p}:{ключ}; старые кнопки вида page:{n} ведут на начало
+    parts = data.split(":", 3)
+    if len(parts) != 4:
+        return 0, None, None
+    _, page, direction, token = parts
+    try:
+        key = decode_cursor(token)
+    except ValueError:
+        return 0, None, None
+    if direction == "p":
+        return int(page), None, key
+    return int(page), key, None
+
+
+def _page_start(kb: InlineKeyboardMarkup | None) -> tuple[int, TaskKey | None]:
+    """
+    Номер и ключ первой строки страницы, показанной в сообщении, — из
+    кнопки «Назад» (page:{n-1}:p:{ключ первой строки}); её нет только
+    на первой странице.
+    """
+    for row in kb.inline_keyboard if kb else []:
+        for btn in row:
+            data = btn.callback_data or ""
+            if data.startswith("page:"):
+                page, _, before = _parse_page_cb(data)
+                if before is not None:
+                    return page + 1, before
+    return 0, None
 
 
 @router.callback_query(F.data.startswith("page:"))
 async def paginate(cb: CallbackQuery):
-    page = int(cb.data.split(":")[1])
-    await cb.message.delete()
-    await _send_active_page(cb.from_user.id, cb.message, page=page)
+    # правка списка — под замком пользователя: соседний процесс может
+    # как раз закрывать задачу на этой странице (storage/user_lock.py)
+    async with USER_LOCKS.hold(cb.from_user.id):
+        page, after, before = _parse_page_cb(cb.data)
+        text, kb, digest = await _load_active_page(
+            cb.from_user.id, page=page, after=after, before=before
+        )
+        if page > 0 and after and not kb.inline_keyboard:
+            # «Вперёд» по устаревшему номеру страницы привёл в пустоту — шаг назад
+            text, kb, digest = await _load_active_page(
+                cb.from_user.id, page - 1, before=after.following()
+            )
+        await _show_in_place(cb.message, text, kb, digest)
     await cb.answer()
 
 
 @router.callback_query(F.data.startswith("taskdone:"))
 async def done(cb: CallbackQuery):
     task_id = int(cb.data.split(":")[1])
+    async with USER_LOCKS.hold(cb.from_user.id):
+        if WRITE_QUEUE_ENABLED:
+            ok = await WRITE_QUEUE.mark_done(task_id, cb.from_user.id)
+        else:
+            Session = get_sessionmaker()
+            async with Session() as session:
+                ok = await mark_done(session, task_id, cb.from_user.id)
+                if ok:
+                    await session.commit()
+        await cb.answer(
+            "Готово!" if ok else "Не удалось (возможно, уже завершена).",
+            show_alert=False,
+        )
+        # Та же страница с той же первой строки: закрытая задача уходит,
+        # снизу подтягивается следующая
+        page, start = _page_start(cb.message.reply_markup)
+        after = start.preceding() if start else None
+        text, kb, digest = await _load_active_page(cb.from_user.id, page, after=after)
+        if page > 0 and start and not kb.inline_keyboard:
+            # закрыли последнюю задачу последней страницы — шаг назад
+            text, kb, digest = await _load_active_page(
+                cb.from_user.id, page - 1, before=start
+            )
+        await _show_in_place(cb.message, text, kb, digest)
+
+
+async def _list_active(
+    uid: int,
+    limit: int,
+    after: TaskKey | None = None,
+    before: TaskKey | None = None,
+):
     Session = get_sessionmaker()
     async with Session() as session:
-        ok = await mark_done(session, task_id, cb.from_user.id)
-        if ok:
-            await session.commit()
-    await cb.answer(
-        "Готово!" if ok else "Не удалось (возможно, уже завершена).", show_alert=False
-    )
-    await cb.message.delete()
-    # показать первую страницу заново
-    await _send_active_page(cb.from_user.id, cb.message, page=0)
-
-
-async def _list_active(uid: int, limit: int, offset: int):
-    Session = get_sessionmaker()
-    async with Session() as session:
-        q = (
-            select(Task)
-            .options(selectinload(Task.category))  # << вот это
-            .where(Task.user_id == uid, Task.is_done.is_(False))
-            .order_by(Task.deadline_ts.is_(None), Task.deadline_ts, Task.created_ts)
-            .limit(limit)
-            .offset(offset)
+        return await list_active_page(
+            session, uid, limit=limit, after=after, before=before
         )
-        res = await session.execute(q)
-        tasks = list(res.scalars().all())
-
-        q2 = select(Task).where(Task.user_id == uid, Task.is_done.is_(False))
-        res2 = await session.execute(q2)
-        total = len(res2.scalars().all())
-    return tasks, total
 
 
 @router.message(F.text == "✅ Выполненные")
 async def show_done(message: Message):
     Session = get_sessionmaker()
     async with Session() as session:
-        q = (
-            select(Task)
-            .options(selectinload(Task.category))  # << и тут
-            .where(Task.user_id == message.from_user.id, Task.is_done.is_(True))
-            .order_by(Task.done_ts.desc())
-            .limit(10)
-        )
-        res = await session.execute(q)
-        tasks = list(res.scalars().all())
+        tasks = await list_tasks_done(session, message.from_user.id, limit=10)
     if not tasks:
         await message.answer("История выполненных задач пуста.")
         return
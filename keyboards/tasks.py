@@ -22,8 +22,18 @@ def confirm_kb():
 
 
 def tasks_list_kb(
-    tasks: list[tuple[int, str]], page: int, has_next: bool, done_buttons: bool = True
+    tasks: list[tuple[int, str]],
+    page: int,
+    has_next: bool,
+    done_buttons: bool = True,
+    first_cursor: str | None = None,
+    last_cursor: str | None = None,
 ):
+    """
+    first_cursor/last_cursor — ключи первой и последней строки страницы
+    (storage.repo.encode_cursor); кнопки навигации переносят их в callback:
+    page:{номер}:p:{ключ} — назад, page:{номер}:n:{ключ} — вперёд.
+    """
     rows = []
     for tid, title in tasks:
         btns = []
@@ -34,11 +44,17 @@ def tasks_list_kb(
         btns.append(InlineKeyboardButton(text="ℹ️", callback_data=f"taskinfo:{tid}"))
         rows.append(btns)
     nav = []
-    if page > 0:
-        nav.append(InlineKeyboardButton(text="⬅️ Назад", callback_data=f"page:{page-1}"))
-    if has_next:
+    if page > 0 and first_cursor:
         nav.append(
-            InlineKeyboardButton(text="Вперёд ➡️", callback_data=f"page:{page+1}")
+            InlineKeyboardButton(
+                text="⬅️ Назад", callback_data=f"page:{page-1}:p:{first_cursor}"
+            )
+        )
+    if has_next and last_cursor:
+        nav.append(
+            InlineKeyboardButton(
+                text="Вперёд ➡️", callback_data=f"page:{page+1}:n:{last_cursor}"
+            )
         )
     if nav:
         rows.append(nav)
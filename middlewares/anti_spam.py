@@ -1,57 +1,136 @@
-# middlewares/anti_spam_simple.py
+# middlewares/anti_spam.py
 from __future__ import annotations
 
 import time
-from typing import Dict, Iterable, Optional
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
 
 from aiogram import BaseMiddleware
 from aiogram.types import CallbackQuery, Message, TelegramObject
 
 
-class CooldownMiddleware(BaseMiddleware):
+class TokenBucketMiddleware(BaseMiddleware):
     """
-    Простой кулдаун на пользователя:
-      - cooldown: минимальный интервал (секунды) между событиями
+    Антиспам на токен-бакетах:
+      - budgets: тип события -> (rate токенов/сек, burst — ёмкость бакета);
+        типы: "message", "callback_query"; неизвестные типы и типы с
+        rate <= 0 не ограничиваются; burst — не меньше 1
       - whitelist: ID, на кого антиспам не действует
+      - max_users: сколько бакетов держать в памяти
       - reply_text: сообщение пользователю при превышении лимита
+
+    Бакеты лежат в OrderedDict в порядке последнего обращения. Бакет,
+    простоявший burst/rate секунд, уже полон и ничем не отличается от
+    нового, поэтому его можно выкинуть без потери состояния. На каждое
+    событие — O(1) амортизированно, память ограничена max_users.
     """
 
     def __init__(
         self,
-        cooldown: float = 1.0,
+        budgets: Optional[Dict[str, Tuple[float, float]]] = None,
         whitelist: Optional[Iterable[int]] = None,
+        max_users: int = 100_000,
         reply_text: str = "Слишком часто. Подождите немного…",
     ):
         super().__init__()
-        self.cooldown = max(0.1, cooldown)
+        budgets = budgets or {
+            "message": (1.0, 3.0),
+            "callback_query": (2.0, 5.0),
+        }
+        for kind, (rate, burst) in budgets.items():
+            if rate > 0 and burst < 1:
+                raise ValueError(f"{kind}: burst must be >= 1, got {burst}")
+        self.budgets = {k: b for k, b in budgets.items() if b[0] > 0}
         self.whitelist = set(int(x) for x in (whitelist or []))
+        self.max_users = max(1, max_users)
         self.reply_text = reply_text
-        self._last: Dict[int, float] = {}  # user_id -> last ts
+        # (kind, user_id) -> [tokens, last_ts, notified]
+        self._buckets: OrderedDict[Tuple[str, int], list] = OrderedDict()
+        self._idle = {
+            kind: burst / rate for kind, (rate, burst) in self.budgets.items()
+        }
+        self.allowed: Dict[str, int] = {kind: 0 for kind in self.budgets}
+        self.dropped: Dict[str, int] = {kind: 0 for kind in self.budgets}
+        self.evicted = 0
 
     def _uid(self, event: TelegramObject) -> Optional[int]:
         user = getattr(event, "from_user", None)
         return getattr(user, "id", None) if user else None
 
+    @staticmethod
+    def _kind(event: TelegramObject) -> str:
+        if isinstance(event, CallbackQuery):
+            return "callback_query"
+        if isinstance(event, Message):
+            return "message"
+        return type(event).__name__
+
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        while buckets:
+            (kind, _), (_, ts, _) = next(iter(buckets.items()))
+            if len(buckets) <= self.max_users and now - ts < self._idle[kind]:
+                break
+            buckets.popitem(last=False)
+            self.evicted += 1
+
+    def take(
+        self, kind: str, uid: int, now: Optional[float] = None
+    ) -> Tuple[bool, bool]:
+        """Списывает токен; возвращает (пропустить, надо ли уведомить)."""
+        rate, burst = self.budgets[kind]
+        now = time.monotonic() if now is None else now
+        key = (kind, uid)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [burst, now, False]
+        else:
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+        self._evict(now)
+
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            bucket[2] = False
+            self.allowed[kind] += 1
+            return True, False
+        self.dropped[kind] += 1
+        notify = not bucket[2]
+        bucket[2] = True  # уведомляем один раз за серию отказов
+        return False, notify
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "buckets": len(self._buckets),
+            "allowed": dict(self.allowed),
+            "dropped": dict(self.dropped),
+            "evicted": self.evicted,
+        }
+
     async def __call__(self, handler, event: TelegramObject, data: dict):
         uid = self._uid(event)
-        if uid is None or uid in self.whitelist:
+        kind = self._kind(event)
+        if uid is None or uid in self.whitelist or kind not in self.budgets:
             return await handler(event, data)
 
-        now = time.monotonic()
-        last = self._last.get(uid, 0.0)
-        if now - last < self.cooldown:
-            # Останавливаем событие, уведомляем пользователя
-            if isinstance(event, Message):
+        ok, notify = self.take(kind, uid)
+        if ok:
+            return await handler(event, data)
+
+        # Останавливаем событие, уведомляем пользователя
+        if isinstance(event, Message):
+            if notify:
                 try:
                     await event.answer(self.reply_text)
                 except Exception:
                     pass
-            elif isinstance(event, CallbackQuery):
-                try:
-                    await event.answer(self.reply_text, show_alert=False)
-                except Exception:
-                    pass
-            return  # не вызывается handler
-
-        self._last[uid] = now
-        return await handler(event, data)
+        elif isinstance(event, CallbackQuery):
+            # callback нужно закрыть всегда, иначе у кнопки висят «часики»
+            try:
+                await event.answer(
+                    self.reply_text if notify else None, show_alert=False
+                )
+            except Exception:
+                pass
+        return  # не вызывается handler
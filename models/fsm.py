@@ -0,0 +1,20 @@
+# app/models/fsm.py
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import JSON, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .db import Base
+
+
+class FsmRecord(Base):
+    """Состояние FSM aiogram (см. storage/fsm.py)."""
+
+    __tablename__ = "fsm_states"
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    state: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    data: Mapped[dict[str, Any]] = mapped_column(JSON, default=dict)
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, index=True)
@@ -0,0 +1,187 @@
+# app/models/migrations.py
+from __future__ import annotations
+
+from typing import Callable, NamedTuple
+
+from sqlalchemy import Column, Connection, Integer, MetaData, Table, inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import LOGGER
+
+from . import feedback, fsm, task  # noqa: F401 — все таблицы в Base.metadata
+from .db import Base
+from .search import create_search
+from .stats import create_stats
+
+# Служебная таблица — вне Base.metadata, чтобы create_all её не трогал
+_meta = MetaData()
+schema_version = Table(
+    "schema_version",
+    _meta,
+    Column("id", Integer, primary_key=True),
+    Column("version", Integer, nullable=False),
+)
+
+_LOCK_ID = 0x7A5C  # pg_advisory_xact_lock: миграции не идут параллельно
+
+
+class Migration(NamedTuple):
+    version: int
+    title: str
+    apply: Callable[[Connection], None]
+
+
+def _create_tables(*names: str) -> Callable[[Connection], None]:
+    def apply(conn: Connection) -> None:
+        for name in names:
+            Base.metadata.tables[name].create(conn, checkfirst=True)
+
+    return apply
+
+
+def _create_indexes(table: str, *names: str) -> Callable[[Connection], None]:
+    def apply(conn: Connection) -> None:
+        indexes = {i.name: i for i in Base.metadata.tables[table].indexes}
+        for name in names:
+            indexes[name].create(conn, checkfirst=True)
+
+    return apply
+
+
+def _recreate_sqlite_indexes(
+    table: str, *names: str
+) -> Callable[[Connection], None]:
+    # Postgres хранит условие частичного индекса уже упрощённым, там
+    # пересоздавать нечего; SQLite сопоставляет его с запросом по тексту
+    def apply(conn: Connection) -> None:
+        if conn.dialect.name != "sqlite":
+            return
+        indexes = {i.name: i for i in Base.metadata.tables[table].indexes}
+        for name in names:
+            indexes[name].drop(conn, checkfirst=True)
+            indexes[name].create(conn)
+
+    return apply
+
+
+def _drop_indexes(*names: str) -> Callable[[Connection], None]:
+    def apply(conn: Connection) -> None:
+        for name in names:
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+
+    return apply
+
+
+def _tasks_autoincrement(conn: Connection) -> None:
+    # Postgres: serial и так не возвращает выданные id. SQLite: пересоздаём
+    # tasks с AUTOINCREMENT (ALTER так не умеет) и продолжаем счётчик за
+    # последним id и в tasks, и в tasks_archive.
+    if conn.dialect.name != "sqlite":
+        return
+    table = Base.metadata.tables["tasks"]
+    for name in ("tasks_fts_ai", "tasks_fts_ad", "tasks_fts_au"):
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+    for index in inspect(conn).get_indexes("tasks"):
+        conn.exec_driver_sql(f'DROP INDEX IF EXISTS "{index["name"]}"')
+    conn.exec_driver_sql("ALTER TABLE tasks RENAME TO tasks_old")
+    table.create(conn)  # заодно триггеры и rebuild tasks_fts (models/search.py)
+    cols = ", ".join(c.name for c in table.columns)
+    conn.exec_driver_sql(f"INSERT INTO tasks ({cols}) SELECT {cols} FROM tasks_old")
+    conn.exec_driver_sql("DROP TABLE tasks_old")
+    conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'tasks'")
+    conn.exec_driver_sql(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'tasks', max("
+        "(SELECT coalesce(max(id), 0) FROM tasks), "
+        "(SELECT coalesce(max(id), 0) FROM tasks_archive))"
+    )
+
+
+# Упорядоченный список. Новая схема — новая запись в конце, старые не меняются.
+MIGRATIONS: list[Migration] = [
+    Migration(
+        1,
+        "tables added after the initial schema",
+        _create_tables("feedback", "fsm_states", "tasks_archive"),
+    ),
+    Migration(
+        2,
+        "partial indexes for pagination, reminders and archiving",
+        _create_indexes(
+            "tasks",
+            "idx_tasks_active_seek",
+            "idx_tasks_active_deadline",
+            "idx_tasks_done_seek",
+            "idx_tasks_done_ts",
+        ),
+    ),
+    Migration(3, "full-text search over task titles", create_search),
+    Migration(4, "per-user task counters", create_stats),
+    Migration(5, "never reuse task ids on SQLite", _tasks_autoincrement),
+    Migration(
+        6,
+        "partial index predicates written as the queries write them",
+        _recreate_sqlite_indexes(
+            "tasks",
+            "idx_tasks_active_seek",
+            "idx_tasks_active_deadline",
+            "idx_tasks_done_seek",
+            "idx_tasks_done_ts",
+        ),
+    ),
+    Migration(7, "drop the index on tasks.is_done", _drop_indexes("ix_tasks_is_done")),
+]
+LATEST = MIGRATIONS[-1].version
+
+
+async def current_version(engine: AsyncEngine) -> int | None:
+    """Версия схемы одним запросом; None — таблицы schema_version ещё нет."""
+    async with engine.connect() as conn:
+        try:
+            res = await conn.execute(
+                schema_version.select().with_only_columns(schema_version.c.version)
+            )
+        except DBAPIError:
+            return None
+        return res.scalar()
+
+
+def _upgrade(conn: Connection) -> tuple[int, int]:
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _LOCK_ID})
+    schema_version.create(conn, checkfirst=True)
+    version = conn.execute(
+        schema_version.select().with_only_columns(schema_version.c.version)
+    ).scalar()
+    if version is None:
+        if not inspect(conn).has_table("tasks"):
+            # пустая база: текущие модели целиком, миграции не нужны
+            Base.metadata.create_all(conn)
+            conn.execute(schema_version.insert().values(id=1, version=LATEST))
+            return 0, LATEST
+        version = 0  # база от create_all до появления миграций
+        conn.execute(schema_version.insert().values(id=1, version=0))
+    start = version
+    for m in MIGRATIONS:
+        if m.version > version:
+            LOGGER.info("Applying migration %d: %s", m.version, m.title)
+            m.apply(conn)
+            version = m.version
+    if version != start:
+        conn.execute(schema_version.update().values(version=version))
+    return start, version
+
+
+async def migrate(engine: AsyncEngine) -> tuple[int | None, int]:
+    """
+    Приводит схему к LATEST. На актуальной базе — один SELECT версии и
+    больше ничего; иначе — миграции в одной транзакции под advisory-lock
+    (параллельный старт второго процесса дождётся и ничего не повторит).
+    Возвращает (версия до, версия после).
+    """
+    version = await current_version(engine)
+    if version == LATEST:
+        return version, version
+    async with engine.begin() as conn:
+        start, version = await conn.run_sync(_upgrade)
+    return start, version
@@ -0,0 +1,59 @@
+# app/models/search.py
+from __future__ import annotations
+
+from sqlalchemy import Connection, event
+
+from .task import Task
+
+# Конфигурация разбора текста Postgres; «зашита» в генерируемую колонку,
+# смена — только новой миграцией
+TS_CONFIG = "russian"
+
+# Postgres: tsvector-колонка, которую СУБД считает сама, и GIN-индексы с
+# user_id впереди (btree_gin) — поиск идёт только по задачам пользователя.
+# Триграммы (pg_trgm) — запасной путь для опечаток и обрывков слов.
+_POSTGRES = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS btree_gin",
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_tsv tsvector "
+    f"GENERATED ALWAYS AS (to_tsvector('{TS_CONFIG}'::regconfig, title)) STORED",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_search ON tasks "
+    "USING gin (user_id, search_tsv)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_title_trgm ON tasks "
+    "USING gin (user_id, title gin_trgm_ops)",
+)
+
+# SQLite (локальная разработка): FTS5-индекс по title с внешним
+# содержимым — сами строки остаются в tasks, триггеры держат индекс в
+# согласии с ними
+_SQLITE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+    "title, content='tasks', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title) VALUES (new.id, new.title); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title) "
+    "VALUES ('delete', old.id, old.title); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title) "
+    "VALUES ('delete', old.id, old.title); "
+    "INSERT INTO tasks_fts(rowid, title) VALUES (new.id, new.title); END",
+    # заполнить индекс уже существующими строками
+    "INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')",
+)
+
+
+def create_search(conn: Connection) -> None:
+    """Поисковый индекс по tasks.title для диалекта соединения."""
+    statements = {"postgresql": _POSTGRES, "sqlite": _SQLITE}.get(
+        conn.dialect.name, ()
+    )
+    for stmt in statements:
+        conn.exec_driver_sql(stmt)
+
+
+@event.listens_for(Task.__table__, "after_create")
+def _create_search_with_tasks(target, conn: Connection, **kw) -> None:
+    # свежая база (create_all) получает индекс сразу, без миграции
+    create_search(conn)
@@ -0,0 +1,108 @@
+# app/models/stats.py
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import (
+    BigInteger,
+    Connection,
+    ForeignKey,
+    Integer,
+    Select,
+    false,
+    func,
+    insert,
+    literal,
+    select,
+    true,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .db import Base
+from .task import Task, TaskArchive, User
+
+
+class UserStats(Base):
+    """
+    Счётчики задач пользователя. storage.repo ведёт их в той же
+    транзакции, что и сами изменения (create_task, mark_done и пакетные
+    версии), поэтому /stats и has_next читают одну строку по ключу.
+
+    done_today/done_week относятся к дню done_day и неделе week_start
+    (UTC, как done_ts); если они уже не текущие, значение — 0.
+    Расхождения чинит services/stats_reconciler.py.
+    """
+
+    __tablename__ = "user_stats"
+    user_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("users.user_id"), primary_key=True
+    )
+    open_count: Mapped[int] = mapped_column(Integer, default=0)
+    done_total: Mapped[int] = mapped_column(Integer, default=0)
+    done_today: Mapped[int] = mapped_column(Integer, default=0)
+    done_day: Mapped[date | None] = mapped_column(nullable=True)
+    done_week: Mapped[int] = mapped_column(Integer, default=0)
+    week_start: Mapped[date | None] = mapped_column(nullable=True)
+
+
+def stats_buckets(now: datetime) -> tuple[date, date]:
+    """(день, понедельник недели) для момента now."""
+    day = now.date()
+    return day, day - timedelta(days=day.weekday())
+
+
+def computed_stats(now: datetime) -> Select:
+    """
+    Счётчики, посчитанные по самим задачам (tasks + tasks_archive), по
+    строке на пользователя из users. Каждый подзапрос — диапазон по
+    индексу с user_id впереди. Колонки — как у user_stats.
+    """
+    day, week = stats_buckets(now)
+    day_ts = datetime.combine(day, time())
+    week_ts = datetime.combine(week, time())
+
+    def count(model, *where):
+        return (
+            select(func.count())
+            .where(model.user_id == User.user_id, *where)
+            .scalar_subquery()
+        )
+
+    # условия — как у частичных индексов tasks (models/task.py)
+    done = Task.is_done == true()
+    return select(
+        User.user_id,
+        count(Task, Task.is_done == false()).label("open_count"),
+        (count(Task, done) + count(TaskArchive)).label("done_total"),
+        (
+            count(Task, done, Task.done_ts >= day_ts)
+            + count(TaskArchive, TaskArchive.done_ts >= day_ts)
+        ).label("done_today"),
+        literal(day).label("done_day"),
+        (
+            count(Task, done, Task.done_ts >= week_ts)
+            + count(TaskArchive, TaskArchive.done_ts >= week_ts)
+        ).label("done_week"),
+        literal(week).label("week_start"),
+    )
+
+
+STATS_COLUMNS = (
+    "user_id",
+    "open_count",
+    "done_total",
+    "done_today",
+    "done_day",
+    "done_week",
+    "week_start",
+)
+
+
+def create_stats(conn: Connection) -> None:
+    """Таблица user_stats, заполненная по уже существующим задачам."""
+    UserStats.__table__.create(conn, checkfirst=True)
+    conn.execute(
+        insert(UserStats).from_select(
+            STATS_COLUMNS, computed_stats(datetime.utcnow())
+        )
+    )
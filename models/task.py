@@ -4,7 +4,17 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import BigInteger, Boolean, ForeignKey, Index, String, Text
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    ForeignKey,
+    Index,
+    String,
+    Text,
+    column,
+    false,
+    true,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .db import Base
@@ -37,6 +47,16 @@ class Category(Base):
     __table_args__ = (Index("uq_cat_user_name", "user_id", "name", unique=True),)
 
 
+# Условия частичных индексов tasks. Запросы пишут их тем же выражением —
+# Task.is_done == false() / == true(): индекс подходит, только если условие
+# запроса совпадает с его WHERE (SQLite сравнивает выражения буквально,
+# Postgres до 17 не выводит «NOT is_done» из «is_done IS false»), а
+# Task.is_done.is_(False) на SQLite даёт «is_done IS 0».
+_IS_DONE = column("is_done", Boolean)
+ACTIVE_WHERE = _IS_DONE == false()
+DONE_WHERE = _IS_DONE == true()
+
+
 class Task(Base):
     __tablename__ = "tasks"
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
@@ -48,7 +68,9 @@ class Task(Base):
     )
     title: Mapped[str] = mapped_column(Text)
     deadline_ts: Mapped[datetime | None] = mapped_column(nullable=True)
-    is_done: Mapped[bool] = mapped_column(Boolean, default=False, index=True)
+    # без отдельного индекса: у булевой колонки он не избирателен, а SQLite
+    # без статистики предпочитал его частичным индексам ниже
+    is_done: Mapped[bool] = mapped_column(Boolean, default=False)
     created_ts: Mapped[datetime] = mapped_column(default=datetime.utcnow, index=True)
     done_ts: Mapped[datetime | None] = mapped_column(nullable=True)
 
@@ -57,4 +79,66 @@ class Task(Base):
 
     __table_args__ = (
         Index("idx_tasks_user_done_deadline", "user_id", "is_done", "deadline_ts"),
+        # Ключи keyset-пагинации (см. storage.repo.list_tasks_active/list_tasks_done)
+        Index(
+            "idx_tasks_active_seek",
+            "user_id",
+            "deadline_ts",
+            "created_ts",
+            "id",
+            postgresql_where=ACTIVE_WHERE,
+            sqlite_where=ACTIVE_WHERE,
+        ),
+        # Диапазон дедлайнов по всем пользователям (services/reminders.py)
+        Index(
+            "idx_tasks_active_deadline",
+            "deadline_ts",
+            postgresql_where=ACTIVE_WHERE,
+            sqlite_where=ACTIVE_WHERE,
+        ),
+        Index(
+            "idx_tasks_done_seek",
+            "user_id",
+            "done_ts",
+            "id",
+            postgresql_where=DONE_WHERE,
+            sqlite_where=DONE_WHERE,
+        ),
+        # Отбор кандидатов в архив по возрасту (services/archiver.py)
+        Index(
+            "idx_tasks_done_ts",
+            "done_ts",
+            postgresql_where=DONE_WHERE,
+            sqlite_where=DONE_WHERE,
+        ),
+        # SQLite без AUTOINCREMENT отдаёт max(rowid)+1: id заархивированной
+        # задачи достался бы новой и столкнулся с ней в tasks_archive
+        {"sqlite_autoincrement": True},
+    )
+
+
+class TaskArchive(Base):
+    """
+    Выполненные задачи старше ARCHIVE_AFTER_DAYS, перенесённые из tasks
+    фоновой задачей (services/archiver.py) с теми же id. Читается только
+    историей выполненных и выгрузкой, так что в tasks остаётся горячий
+    набор: активные и недавно выполненные.
+    """
+
+    __tablename__ = "tasks_archive"
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.user_id"))
+    category_id: Mapped[int | None] = mapped_column(
+        ForeignKey("categories.id"), nullable=True
+    )
+    title: Mapped[str] = mapped_column(Text)
+    deadline_ts: Mapped[datetime | None] = mapped_column(nullable=True)
+    created_ts: Mapped[datetime] = mapped_column()
+    done_ts: Mapped[datetime | None] = mapped_column(nullable=True)
+    archived_ts: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+
+    category: Mapped[Category | None] = relationship()
+
+    __table_args__ = (
+        Index("idx_tasks_archive_user_done", "user_id", "done_ts", "id"),
     )
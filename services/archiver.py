@@ -0,0 +1,65 @@
+# app/services/archiver.py
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+
+from config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH, ARCHIVE_INTERVAL, LOGGER
+from models.db import get_sessionmaker
+from services.periodic import PeriodicJob
+from storage.repo import archive_done_batch
+
+
+class TaskArchiver(PeriodicJob):
+    """
+    Фоновый перенос выполненных задач старше after в tasks_archive.
+
+    Раз в interval секунд переносит кандидатов пачками по batch строк —
+    каждая пачка в своей короткой транзакции, между пачками пауза, чтобы
+    не держать блокировки и не забирать пул у обработчиков. Так tasks и
+    его индексы содержат только активные и недавно выполненные задачи.
+    """
+
+    failure = "Task archiving failed"
+
+    def __init__(
+        self,
+        after: timedelta = timedelta(days=30),
+        batch: int = 1000,
+        interval: float = 3600.0,
+        pause: float = 0.5,
+    ):
+        super().__init__(interval)
+        self.after = after
+        self.batch = max(1, batch)
+        self.pause = pause
+        self.moved = 0
+        self.runs = 0
+
+    async def run_once(self) -> int:
+        cutoff = datetime.utcnow() - self.after
+        total = 0
+        Session = get_sessionmaker()
+        while True:
+            async with Session() as session:
+                moved = await archive_done_batch(session, cutoff, self.batch)
+                await session.commit()
+            total += moved
+            self.moved += moved
+            if moved < self.batch:
+                break
+            await asyncio.sleep(self.pause)
+        self.runs += 1
+        if total:
+            LOGGER.info("Archived %d done tasks older than %s", total, cutoff)
+        return total
+
+    def stats(self) -> dict[str, int]:
+        return {"moved": self.moved, "runs": self.runs}
+
+
+ARCHIVER = TaskArchiver(
+    after=timedelta(days=ARCHIVE_AFTER_DAYS),
+    batch=ARCHIVE_BATCH,
+    interval=ARCHIVE_INTERVAL,
+)
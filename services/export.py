@@ -0,0 +1,172 @@
+# app/services/export.py
+from __future__ import annotations
+
+import asyncio
+import csv
+import gzip
+import io
+import json
+import tempfile
+from datetime import datetime
+from typing import IO, Any, AsyncGenerator, Sequence
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import InputFile
+
+from config import EXPORT_CONCURRENCY, EXPORT_SPOOL_BYTES, LOGGER
+from models.db import get_sessionmaker
+from services.outbox import NOTIFY, OutboxFull, send_priority
+from storage.repo import iter_user_tasks
+
+FORMATS = ("csv", "jsonl")
+COLUMNS = ("id", "category", "title", "deadline", "done", "created", "done_at")
+
+
+class SpooledInputFile(InputFile):
+    """Документ для Bot API из открытого файла — читается кусками при отправке."""
+
+    def __init__(self, file: IO[bytes], filename: str, chunk_size: int = 64 * 1024):
+        super().__init__(filename=filename, chunk_size=chunk_size)
+        self.file = file
+
+    async def read(self, bot: Bot) -> AsyncGenerator[bytes, None]:
+        self.file.seek(0)
+        while chunk := await asyncio.to_thread(self.file.read, self.chunk_size):
+            yield chunk
+
+
+def _ts(value: datetime | None) -> str:
+    return value.strftime("%Y-%m-%d %H:%M") if value else ""
+
+
+def _values(row) -> list[Any]:
+    return [
+        row.id,
+        row.category or "",
+        row.title,
+        _ts(row.deadline_ts),
+        int(row.is_done),
+        _ts(row.created_ts),
+        _ts(row.done_ts),
+    ]
+
+
+def _csv_lines(lines) -> bytes:
+    # заголовок и строки — одним writer'ом, с одинаковым концом строки
+    out = io.StringIO()
+    csv.writer(out, delimiter=";", lineterminator="\n").writerows(lines)
+    return out.getvalue().encode()
+
+
+def _encode_csv(rows: Sequence) -> bytes:
+    return _csv_lines(_values(r) for r in rows)
+
+
+def _encode_jsonl(rows: Sequence) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(COLUMNS, _values(r))), ensure_ascii=False) + "\n"
+        for r in rows
+    ).encode()
+
+
+class TaskExporter:
+    """
+    Выгрузка всех задач пользователя в CSV/JSONL (gzip) документом.
+
+    Строки читаются серверным курсором пачками (iter_user_tasks), пачка
+    сжимается в отдельном потоке и пишется в SpooledTemporaryFile: до
+    spool_bytes сжатых данных — в памяти, дальше — во временный файл.
+    Память не зависит от длины истории. Выгрузка идёт фоновой задачей:
+    обработчик отвечает сразу, не больше concurrency выгрузок
+    одновременно и одна на пользователя.
+    """
+
+    def __init__(self, concurrency: int = 2, spool_bytes: int = 1024 * 1024):
+        self.spool_bytes = spool_bytes
+        self._sem = asyncio.Semaphore(max(1, concurrency))
+        self._running: dict[int, asyncio.Task] = {}
+        self.exported = 0
+        self.failed = 0
+
+    def start(self, bot: Bot, chat_id: int, user_id: int, fmt: str) -> bool:
+        """False — у пользователя уже идёт выгрузка."""
+        if user_id in self._running:
+            return False
+        task = asyncio.create_task(self._run(bot, chat_id, user_id, fmt))
+        self._running[user_id] = task
+        task.add_done_callback(lambda _: self._running.pop(user_id, None))
+        return True
+
+    async def stop(self) -> None:
+        for task in list(self._running.values()):
+            task.cancel()
+        await asyncio.gather(*self._running.values(), return_exceptions=True)
+
+    async def _run(self, bot: Bot, chat_id: int, user_id: int, fmt: str) -> None:
+        # готовый файл — уведомление, не ответ: пропускает ответы вперёд
+        with send_priority(NOTIFY):
+            await self._export(bot, chat_id, user_id, fmt)
+
+    async def _export(self, bot: Bot, chat_id: int, user_id: int, fmt: str) -> None:
+        async with self._sem:
+            try:
+                buf, count = await self.build(user_id, fmt)
+            except Exception:
+                self.failed += 1
+                LOGGER.exception("Export for %s failed", user_id)
+                await self._notify(bot, chat_id, "Не удалось подготовить выгрузку.")
+                return
+            try:
+                if not count:
+                    await self._notify(bot, chat_id, "Задач пока нет.")
+                    return
+                name = f"tasks-{datetime.now():%Y%m%d-%H%M}.{fmt}.gz"
+                await bot.send_document(
+                    chat_id,
+                    SpooledInputFile(buf, filename=name),
+                    caption=f"Выгрузка задач: {count}",
+                )
+                self.exported += 1
+            except (TelegramAPIError, OutboxFull) as e:
+                # в том числе сетевые ошибки и таймаут загрузки большого файла
+                self.failed += 1
+                LOGGER.warning("Export for %s not delivered: %s", user_id, e)
+            finally:
+                buf.close()
+
+    async def build(self, user_id: int, fmt: str) -> tuple[IO[bytes], int]:
+        encode = _encode_jsonl if fmt == "jsonl" else _encode_csv
+        buf = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes)
+        count = 0
+        try:
+            gz = gzip.GzipFile(fileobj=buf, mode="wb")
+            if fmt == "csv":
+                gz.write(_csv_lines([COLUMNS]))
+            Session = get_sessionmaker()
+            async with Session() as session:
+                async for part in iter_user_tasks(session, user_id):
+                    count += len(part)
+                    # и кодирование, и сжатие — в потоке, не в event loop
+                    await asyncio.to_thread(lambda: gz.write(encode(part)))
+            gz.close()
+        except BaseException:
+            buf.close()
+            raise
+        return buf, count
+
+    async def _notify(self, bot: Bot, chat_id: int, text: str) -> None:
+        try:
+            await bot.send_message(chat_id, text)
+        except (TelegramAPIError, OutboxFull):
+            pass
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "running": len(self._running),
+            "exported": self.exported,
+            "failed": self.failed,
+        }
+
+
+EXPORTS = TaskExporter(concurrency=EXPORT_CONCURRENCY, spool_bytes=EXPORT_SPOOL_BYTES)
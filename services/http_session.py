@@ -0,0 +1,179 @@
+# app/services/http_session.py
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Optional, cast
+
+from aiogram import Bot, __version__
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.exceptions import TelegramNetworkError
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiohttp import ClientError, ClientSession, TraceConfig
+from aiohttp.hdrs import CONTENT_TYPE, USER_AGENT
+from aiohttp.http import SERVER_SOFTWARE
+
+JsonLoads = Callable[[Any], Any]
+JsonDumps = Callable[[Any], str]
+
+
+def json_backend(name: str = "auto") -> tuple[str, JsonLoads, JsonDumps]:
+    """
+    (имя, loads, dumps) для сессии Bot API. auto — orjson, если установлен,
+    иначе stdlib json; orjson — обязательно orjson.
+    """
+    if name in ("auto", "orjson"):
+        try:
+            import orjson
+        except ImportError:
+            if name == "orjson":
+                raise RuntimeError("BOT_JSON=orjson requires the orjson package")
+        else:
+            return "orjson", orjson.loads, lambda obj: orjson.dumps(obj).decode()
+    if name not in ("auto", "orjson", "json"):
+        raise RuntimeError(f"Unknown BOT_JSON: {name!r} (auto | orjson | json)")
+    return "json", json.loads, json.dumps
+
+
+class BotHttpSession(AiohttpSession):
+    """
+    AiohttpSession с настроенным пулом соединений к Bot API.
+
+    Один долгоживущий TCPConnector: до limit соединений, простаивающее
+    соединение живёт keepalive секунд (у aiohttp по умолчанию 15 — бот с
+    редкими апдейтами каждый раз платит за новый TCP+TLS), адрес
+    api.telegram.org кэшируется на dns_ttl секунд. JSON — через
+    json_backend (orjson, если есть).
+
+    Запросы без файлов уходят телом application/json одним dumps вместо
+    form-data (поле за полем, вложенные объекты — отдельными dumps);
+    загрузка файлов — как в AiohttpSession.
+
+    stats(): новые и переиспользованные соединения, DNS-запросы и время
+    запросов по методам (HTTP + разбор ответа, без ожидания в очереди
+    исходящих).
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        keepalive: float = 60.0,
+        dns_ttl: int = 300,
+        json: str = "auto",
+        **kwargs: Any,
+    ):
+        self.json_name, loads, dumps = json_backend(json)
+        kwargs.setdefault("json_loads", loads)
+        kwargs.setdefault("json_dumps", dumps)
+        super().__init__(limit=limit, **kwargs)
+        self._connector_init.update(keepalive_timeout=keepalive, ttl_dns_cache=dns_ttl)
+        self.connects = 0
+        self.reused = 0
+        self.dns_lookups = 0
+        self.dns_cache_hits = 0
+        # метод -> [вызовов, суммарное время, максимум]
+        self._timing: dict[str, list] = {}
+
+    def _trace_config(self) -> TraceConfig:
+        trace = TraceConfig()
+
+        async def on_connect(session, ctx: SimpleNamespace, params) -> None:
+            self.connects += 1
+
+        async def on_reuse(session, ctx: SimpleNamespace, params) -> None:
+            self.reused += 1
+
+        async def on_dns(session, ctx: SimpleNamespace, params) -> None:
+            self.dns_lookups += 1
+
+        async def on_dns_hit(session, ctx: SimpleNamespace, params) -> None:
+            self.dns_cache_hits += 1
+
+        trace.on_connection_create_end.append(on_connect)
+        trace.on_connection_reuseconn.append(on_reuse)
+        trace.on_dns_resolvehost_end.append(on_dns)
+        trace.on_dns_cache_hit.append(on_dns_hit)
+        return trace
+
+    async def create_session(self) -> ClientSession:
+        # как в AiohttpSession, плюс trace_configs для счётчиков соединений
+        if self._should_reset_connector:
+            await self.close()
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(
+                connector=self._connector_type(**self._connector_init),
+                headers={USER_AGENT: f"{SERVER_SOFTWARE} aiogram/{__version__}"},
+                trace_configs=[self._trace_config()],
+            )
+            self._should_reset_connector = False
+        return self._session
+
+    async def make_request(
+        self,
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+        timeout: Optional[int] = None,
+    ) -> TelegramType:
+        started = time.perf_counter()
+        try:
+            return await self._request(bot, method, timeout)
+        finally:
+            elapsed = time.perf_counter() - started
+            t = self._timing.get(method.__api_method__)
+            if t is None:
+                t = self._timing[method.__api_method__] = [0, 0.0, 0.0]
+            t[0] += 1
+            t[1] += elapsed
+            t[2] = max(t[2], elapsed)
+
+    async def _request(
+        self,
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+        timeout: Optional[int],
+    ) -> TelegramType:
+        files: dict[str, Any] = {}
+        payload = self.prepare_value(
+            method.model_dump(warnings=False), bot=bot, files=files, _dumps_json=False
+        )
+        if files:
+            return await super().make_request(bot, method, timeout)
+        session = await self.create_session()
+        url = self.api.api_url(token=bot.token, method=method.__api_method__)
+        try:
+            async with session.post(
+                url,
+                data=self.json_dumps(payload),
+                headers={CONTENT_TYPE: "application/json"},
+                timeout=self.timeout if timeout is None else timeout,
+            ) as resp:
+                raw_result = await resp.text()
+        except asyncio.TimeoutError:
+            raise TelegramNetworkError(method=method, message="Request timeout error")
+        except ClientError as e:
+            raise TelegramNetworkError(
+                method=method, message=f"{type(e).__name__}: {e}"
+            )
+        response = self.check_response(
+            bot=bot, method=method, status_code=resp.status, content=raw_result
+        )
+        return cast(TelegramType, response.result)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "connects": self.connects,
+            "reused": self.reused,
+            "dns_lookups": self.dns_lookups,
+            "dns_cache_hits": self.dns_cache_hits,
+            "methods": {
+                name: {
+                    "calls": n,
+                    "avg_ms": round(total / n * 1000, 2),
+                    "max_ms": round(peak * 1000, 2),
+                }
+                for name, (n, total, peak) in self._timing.items()
+            },
+        }
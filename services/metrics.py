@@ -0,0 +1,323 @@
+# app/services/metrics.py
+from __future__ import annotations
+
+import asyncio
+import bisect
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from config import LOGGER, WORKER_INDEX
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+LabelKey = Tuple[str, ...]
+
+# Имя текущего обработчика — для логов, которые не видят data (SQL-события)
+CURRENT_HANDLER: ContextVar[Optional[str]] = ContextVar("current_handler", default=None)
+
+
+def _fmt_labels(names: Tuple[str, ...], values: LabelKey, *extra: str) -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    parts += [e for e in extra if e]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, *labels: str, value: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + value
+
+    def render(self, const: str = "") -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, v in self._values.items():
+            out.append(f"{self.name}{_fmt_labels(self.labels, key, const)} {v}")
+        return out
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Iterable[str] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [счётчики по корзинам..., sum, count]
+        self._values: Dict[LabelKey, list] = {}
+
+    def observe(self, seconds: float, *labels: str) -> None:
+        row = self._values.get(labels)
+        if row is None:
+            row = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+        i = bisect.bisect_left(self.buckets, seconds)
+        if i < len(self.buckets):
+            row[i] += 1
+        row[-2] += seconds
+        row[-1] += 1
+
+    def render(self, const: str = "") -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, row in self._values.items():
+            acc = 0
+            for le, n in zip(self.buckets, row):
+                acc += n
+                labels = _fmt_labels(self.labels, key, const, f'le="{le}"')
+                out.append(f"{self.name}_bucket{labels} {acc}")
+            labels = _fmt_labels(self.labels, key, const, 'le="+Inf"')
+            out.append(f"{self.name}_bucket{labels} {row[-1]}")
+            labels = _fmt_labels(self.labels, key, const)
+            out.append(f"{self.name}_sum{labels} {row[-2]}")
+            out.append(f"{self.name}_count{labels} {row[-1]}")
+        return out
+
+    def summary(self) -> Dict[LabelKey, Tuple[int, float]]:
+        """(count, среднее) по меткам — для лога в polling-режиме."""
+        return {k: (row[-1], row[-2] / row[-1]) for k, row in self._values.items()}
+
+
+class Registry:
+    """
+    Метрики процесса. Помимо своих счётчиков и гистограмм собирает
+    gauge-значения из stats() подсистем (кэши, очереди, антиспам),
+    зарегистрированных через add_collector.
+
+    const_labels добавляются ко всем значениям — например, worker при
+    BOT_WORKERS > 1, чтобы ряды разных процессов не смешивались.
+    """
+
+    def __init__(self, const_labels: Optional[Dict[str, str]] = None):
+        self._metrics: list[Counter | Histogram] = []
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        const_labels = const_labels or {}
+        # готовая строка {a="1"} (или пустая) для подстановки в каждый ряд
+        self._const = _fmt_labels(tuple(const_labels), tuple(const_labels.values()))
+
+    def counter(self, *args, **kwargs) -> Counter:
+        m = Counter(*args, **kwargs)
+        self._metrics.append(m)
+        return m
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        m = Histogram(*args, **kwargs)
+        self._metrics.append(m)
+        return m
+
+    def add_collector(self, prefix: str, stats: Callable[[], Dict[str, Any]]) -> None:
+        self._collectors[prefix] = stats
+
+    def _gauges(self) -> list[str]:
+        out = []
+        for prefix, stats in self._collectors.items():
+            for key, value in _flatten(stats()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"taskbot_{prefix}_{key}"
+                out += [f"# TYPE {name} gauge", f"{name}{self._const} {value}"]
+        return out
+
+    def render(self) -> str:
+        lines: list[str] = []
+        const = self._const[1:-1]  # без фигурных скобок
+        for m in self._metrics:
+            lines += m.render(const)
+        lines += self._gauges()
+        return "\n".join(lines) + "\n"
+
+
+def _flatten(stats: Dict[str, Any], prefix: str = ""):
+    for key, value in stats.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{name}_")
+        else:
+            yield name, value
+
+
+REGISTRY = Registry(
+    const_labels={"worker": str(WORKER_INDEX)} if WORKER_INDEX is not None else None
+)
+
+HANDLER_LATENCY = REGISTRY.histogram(
+    "taskbot_handler_seconds",
+    "Update processing time by handler",
+    labels=("update_type", "handler"),
+)
+HANDLER_ERRORS = REGISTRY.counter(
+    "taskbot_handler_errors_total",
+    "Unhandled exceptions by handler",
+    labels=("update_type", "handler"),
+)
+DB_STATEMENT = REGISTRY.histogram(
+    "taskbot_db_statement_seconds", "SQL statement time", labels=("statement",)
+)
+DB_POOL_WAIT = REGISTRY.histogram(
+    "taskbot_db_pool_wait_seconds", "Time waiting for a pooled connection"
+)
+API_LATENCY = REGISTRY.histogram(
+    "taskbot_api_seconds", "Telegram Bot API call time", labels=("method",)
+)
+API_ERRORS = REGISTRY.counter(
+    "taskbot_api_errors_total", "Failed Bot API calls", labels=("method", "error")
+)
+
+
+# ---------- handlers ----------
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Outer-мидлварь на dp.update: время и ошибки каждого апдейта.
+    Имя сработавшего обработчика ей сообщает HandlerTagMiddleware
+    (inner на observer'ах событий) через общий словарь в data.
+    """
+
+    async def __call__(self, handler, event: TelegramObject, data: dict):
+        tag: Dict[str, str] = {}
+        data["metrics_tag"] = tag
+        update_type = getattr(event, "event_type", "update")
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(update_type, tag.get("handler", "unhandled"))
+            raise
+        finally:
+            HANDLER_LATENCY.observe(
+                time.perf_counter() - started,
+                update_type,
+                tag.get("handler", "unhandled"),
+            )
+
+
+class HandlerTagMiddleware(BaseMiddleware):
+    async def __call__(self, handler, event: TelegramObject, data: dict):
+        handler_obj = data.get("handler")
+        if handler_obj is None:
+            return await handler(event, data)
+        name = getattr(handler_obj.callback, "__name__", "handler")
+        tag = data.get("metrics_tag")
+        if tag is not None:
+            tag["handler"] = name
+        token = CURRENT_HANDLER.set(name)
+        try:
+            return await handler(event, data)
+        finally:
+            CURRENT_HANDLER.reset(token)
+
+
+def tag_handlers(dp) -> None:
+    """Inner-мидлварь на все observer'ы событий: имя обработчика в CURRENT_HANDLER."""
+    tagger = HandlerTagMiddleware()
+    for name, observer in dp.observers.items():
+        if name not in ("update", "error"):
+            observer.middleware(tagger)
+
+
+def setup_dispatcher_metrics(dp) -> None:
+    dp.update.outer_middleware(MetricsMiddleware())
+    tag_handlers(dp)
+
+
+# ---------- Bot API ----------
+class ApiTimingMiddleware(BaseRequestMiddleware):
+    """Мидлварь сессии Bot API: время каждого метода и ошибки по типам."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = method.__api_method__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            API_ERRORS.inc(name, type(e).__name__)
+            raise
+        finally:
+            API_LATENCY.observe(time.perf_counter() - started, name)
+
+
+# ---------- SQLAlchemy ----------
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Время каждого SQL-выражения (по первому слову: SELECT/INSERT/...)."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_started"].pop()
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement else "?"
+        DB_STATEMENT.observe(time.perf_counter() - started, verb)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        if context.connection is None:
+            return
+        stack = context.connection.info.get("metrics_started")
+        if stack:
+            stack.pop()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, замеряющий ожидание свободного соединения."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - started)
+
+
+# ---------- polling ----------
+async def log_metrics_periodically(interval: float) -> None:
+    """В polling-режиме /metrics некому отдавать — пишем сводку в лог."""
+    while True:
+        await asyncio.sleep(interval)
+        parts = [
+            f"{handler}: n={n} avg={avg * 1000:.1f}ms"
+            for (_, handler), (n, avg) in sorted(HANDLER_LATENCY.summary().items())
+        ]
+        api = [
+            f"{m}: n={n} avg={avg * 1000:.1f}ms"
+            for (m,), (n, avg) in sorted(API_LATENCY.summary().items())
+        ]
+        LOGGER.info("Metrics: handlers [%s] api [%s]", "; ".join(parts), "; ".join(api))
+
+
+def metrics_handler_factory(registry: Optional[Registry] = None):
+    from aiohttp import web
+
+    registry = registry or REGISTRY
+
+    async def metrics(request: web.Request) -> web.Response:
+        return web.Response(
+            text=registry.render(), content_type="text/plain", charset="utf-8"
+        )
+
+    return metrics
@@ -0,0 +1,412 @@
+# app/services/outbox.py
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Iterator
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from config import (
+    BOT_WORKERS,
+    LOGGER,
+    SEND_CHAT_BURST,
+    SEND_CHAT_RATE,
+    SEND_GROUP_PER_MINUTE,
+    SEND_MAX_PENDING,
+    SEND_RATE,
+    SEND_RETRIES,
+    WORKER_INDEX,
+)
+
+# Полосы приоритета: ответы пользователю раньше фоновых уведомлений
+INTERACTIVE, NOTIFY = 0, 1
+LANES = ("interactive", "notify")
+
+_PRIORITY: ContextVar[int] = ContextVar("send_priority", default=INTERACTIVE)
+
+# Методы, которые Telegram считает «отправкой сообщения» и ограничивает
+_FORWARDS = {"copyMessage", "copyMessages", "forwardMessage", "forwardMessages"}
+
+
+def _throttled(name: str) -> bool:
+    return (name.startswith("send") and name != "sendChatAction") or name in _FORWARDS
+
+
+class OutboxFull(RuntimeError):
+    pass
+
+
+@contextmanager
+def send_priority(priority: int) -> Iterator[None]:
+    """Все отправки внутри блока идут в полосе priority."""
+    token = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+_LATER: set[asyncio.Task] = set()
+
+
+def send_later(call: Awaitable[Any], priority: int = NOTIFY) -> asyncio.Task:
+    """
+    Отправка «выстрелил и забыл»: send_later(bot.send_message(...)).
+    Ошибки Bot API только логируются; результат (или None) можно
+    дождаться, awaited возвращённую задачу.
+    """
+
+    async def run():
+        _PRIORITY.set(priority)  # у задачи своя копия контекста
+        try:
+            return await call
+        except (TelegramAPIError, OutboxFull) as e:
+            LOGGER.warning("Background send failed: %s", e)
+            return None
+
+    task = asyncio.create_task(run())
+    _LATER.add(task)
+    task.add_done_callback(_LATER.discard)
+    return task
+
+
+class _Job:
+    __slots__ = (
+        "make_request",
+        "bot",
+        "method",
+        "chat",
+        "lane",
+        "cost",
+        "enqueued",
+        "attempts",
+        "future",
+    )
+
+    def __init__(self, make_request, bot, method, chat, lane, cost):
+        self.make_request = make_request
+        self.bot = bot
+        self.method = method
+        self.chat = chat
+        self.lane = lane
+        self.cost = cost
+        self.enqueued = time.monotonic()
+        self.attempts = 0
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class _ChatState:
+    __slots__ = ("tokens", "ts", "blocked_until", "recent")
+
+    def __init__(self, burst: float, now: float, group: bool):
+        self.tokens = burst
+        self.ts = now
+        self.blocked_until = 0.0
+        # отметки времени отправок за последнюю минуту — только для групп
+        self.recent: deque[float] | None = deque() if group else None
+
+
+class OutboundQueue(BaseRequestMiddleware):
+    """
+    Очередь исходящих сообщений — мидлварь сессии Bot API.
+
+    Каждый send*/copy*/forward* любого кода (message.answer, bot.send_*)
+    проходит через неё; остальные методы (ответы на callback, правки)
+    идут напрямую. Лимиты — как у Telegram: общий токен-бакет на бота
+    (rate в секунду), в личном чате — chat_rate в секунду со всплеском
+    chat_burst, в группе — ещё и не больше group_per_minute в минуту.
+
+    У каждого чата своя FIFO-очередь в каждой полосе приоритета; планировщик
+    берёт готовый по лимитам чат из старшей полосы, поэтому рассылка
+    уведомлений не задерживает ответы, а медленный чат не задерживает
+    остальных. Сам HTTP-запрос выполняется отдельной задачей.
+
+    TelegramRetryAfter не доходит до вызывающего: чат блокируется на
+    retry_after, сообщение встаёт в начало его очереди (до retries раз).
+    Вызывающий ждёт доставки как обычного вызова Bot API; для «выстрелил
+    и забыл» — send_later().
+
+    Все лимиты — на процесс. При BOT_WORKERS > 1 общий rate делится
+    между воркерами поровну, а личный чат и группа могут получить до
+    chat_rate и group_per_minute от каждого воркера, в который попали
+    их апдейты; от flood control тогда спасает только RetryAfter.
+    rate или chat_rate <= 0 — этот лимит не действует.
+    """
+
+    def __init__(
+        self,
+        rate: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: float = 3.0,
+        group_per_minute: int = 20,
+        retries: int = 3,
+        max_pending: int = 10_000,
+    ):
+        self.rate = rate
+        self.chat_rate = chat_rate
+        # ёмкость общего бакета: при rate < 1 (SEND_RATE / BOT_WORKERS)
+        # бакет ёмкостью rate никогда не накопил бы целый токен
+        self._capacity = max(1.0, rate)
+        self.chat_burst = max(1.0, chat_burst)
+        self.group_per_minute = max(1, group_per_minute)
+        self.retries = retries
+        self.max_pending = max(1, max_pending)
+        self._tokens = self._capacity
+        self._ts = time.monotonic()
+        self._chats: dict[int | str, _ChatState] = {}
+        self._queues: list[dict[int | str, deque[_Job]]] = [{} for _ in LANES]
+        # по полосам: (когда чат будет готов, seq, chat)
+        self._ready: list[list[tuple[float, int, int | str]]] = [[] for _ in LANES]
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._inflight: set[asyncio.Task] = set()
+        self._gc_at = 0.0
+        self.pending = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    # ---------- мидлварь сессии ----------
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat = getattr(method, "chat_id", None)
+        if chat is None or not _throttled(method.__api_method__):
+            return await make_request(bot, method)
+        lane = _PRIORITY.get()
+        if lane != INTERACTIVE and self.pending >= self.max_pending:
+            self.rejected += 1
+            raise OutboxFull(f"outbound queue is full ({self.pending})")
+        cost = len(getattr(method, "media", None) or ()) or 1  # альбом — по файлам
+        job = _Job(make_request, bot, method, chat, lane, cost)
+        self._ensure_started()
+        self._push(job, job.enqueued)
+        return await job.future
+
+    # ---------- жизненный цикл ----------
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Дождаться отправки очереди (не дольше timeout) и остановиться."""
+        deadline = time.monotonic() + timeout
+        while (self.pending or self._inflight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for queues in self._queues:
+            for q in queues.values():
+                for job in q:
+                    job.future.cancel()
+            queues.clear()
+        for heap in self._ready:
+            heap.clear()
+        self.pending = 0
+
+    # ---------- лимиты ----------
+    def _chat(self, chat: int | str, now: float) -> _ChatState:
+        state = self._chats.get(chat)
+        if state is None:
+            group = not isinstance(chat, int) or chat < 0
+            state = self._chats[chat] = _ChatState(self.chat_burst, now, group)
+        return state
+
+    def _chat_ready_at(self, chat: int | str, now: float) -> float:
+        st = self._chat(chat, now)
+        at = max(now, st.blocked_until)
+        if self.chat_rate > 0:
+            st.tokens = min(self.chat_burst, st.tokens + (now - st.ts) * self.chat_rate)
+            st.ts = now
+            if st.tokens < 1:
+                at = max(at, now + (1 - st.tokens) / self.chat_rate)
+        if st.recent is not None:
+            while st.recent and st.recent[0] <= now - 60:
+                st.recent.popleft()
+            if len(st.recent) >= self.group_per_minute:
+                at = max(at, st.recent[0] + 60)
+        return at
+
+    def _spend(self, chat: int | str, cost: int, now: float) -> None:
+        # бакеты уходят в минус на стоимость альбома — следующий подождёт
+        self._tokens -= cost
+        st = self._chats[chat]
+        st.tokens -= cost
+        if st.recent is not None:
+            st.recent.extend([now] * cost)
+
+    def _global_wait(self, now: float) -> float:
+        if self.rate <= 0:
+            return 0.0
+        self._tokens = min(self._capacity, self._tokens + (now - self._ts) * self.rate)
+        self._ts = now
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    # ---------- очередь ----------
+    def _push(self, job: _Job, now: float, front: bool = False) -> None:
+        queues = self._queues[job.lane]
+        q = queues.get(job.chat)
+        if q is None:
+            q = queues[job.chat] = deque()
+            heapq.heappush(
+                self._ready[job.lane],
+                (self._chat_ready_at(job.chat, now), next(self._seq), job.chat),
+            )
+        if front:
+            q.appendleft(job)
+        else:
+            q.append(job)
+        self.pending += 1
+        self._wakeup.set()
+
+    def _pick(self, now: float) -> _Job | float | None:
+        """Готовое к отправке сообщение, иначе — когда появится (None — пусто)."""
+        next_at = None
+        for lane, heap in enumerate(self._ready):
+            queues = self._queues[lane]
+            while heap:
+                at, _, chat = heap[0]
+                if at > now:
+                    next_at = at if next_at is None else min(next_at, at)
+                    break
+                heapq.heappop(heap)
+                # чат мог получить сообщение из другой полосы — пересчитываем
+                real = self._chat_ready_at(chat, now)
+                if real > now:
+                    heapq.heappush(heap, (real, next(self._seq), chat))
+                    continue
+                q = queues[chat]
+                job = q.popleft()
+                self.pending -= 1
+                if q:
+                    heapq.heappush(heap, (now, next(self._seq), chat))
+                else:
+                    del queues[chat]
+                if job.future.done():  # вызывающий уже не ждёт
+                    continue
+                return job
+        return next_at
+
+    async def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+            wait = self._global_wait(now)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            job = self._pick(now)
+            if isinstance(job, _Job):
+                self._spend(job.chat, job.cost, now)
+                task = asyncio.create_task(self._deliver(job))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+                continue
+            if now >= self._gc_at:
+                self._gc(now)
+            self._wakeup.clear()
+            timeout = None if job is None else job - now
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver(self, job: _Job) -> None:
+        waited = time.monotonic() - job.enqueued
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        try:
+            result = await job.make_request(job.bot, job.method)
+        except TelegramRetryAfter as e:
+            job.attempts += 1
+            if job.attempts > self.retries or job.future.done():
+                self.failed += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+                return
+            self.retried += 1
+            LOGGER.warning("Flood control in %s: retry in %ss", job.chat, e.retry_after)
+            now = time.monotonic()
+            st = self._chat(job.chat, now)
+            st.blocked_until = max(st.blocked_until, now + e.retry_after)
+            self._push(job, now, front=True)
+        except BaseException as e:
+            self.failed += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+        else:
+            self.sent += 1
+            if not job.future.done():
+                job.future.set_result(result)
+
+    def _gc(self, now: float) -> None:
+        """Забыть чаты без очереди, у которых все лимиты восстановились."""
+        self._gc_at = now + 60
+        busy = set().union(*self._queues)
+        for chat in [
+            c
+            for c, st in self._chats.items()
+            if c not in busy
+            and st.blocked_until <= now
+            and (
+                self.chat_rate <= 0
+                or st.ts + (self.chat_burst - st.tokens) / self.chat_rate <= now
+            )
+            and not (st.recent and st.recent[-1] > now - 60)
+        ]:
+            del self._chats[chat]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queued": {
+                name: sum(len(q) for q in queues.values())
+                for name, queues in zip(LANES, self._queues)
+            },
+            "inflight": len(self._inflight),
+            "chats": len(self._chats),
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "wait_avg_ms": round(self.wait_total / self.sent * 1000, 2)
+            if self.sent
+            else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 2),
+        }
+
+
+OUTBOX = OutboundQueue(
+    # общий лимит бота — на все процессы-воркеры вместе
+    rate=SEND_RATE / BOT_WORKERS if WORKER_INDEX is not None else SEND_RATE,
+    chat_rate=SEND_CHAT_RATE,
+    chat_burst=SEND_CHAT_BURST,
+    group_per_minute=SEND_GROUP_PER_MINUTE,
+    retries=SEND_RETRIES,
+    max_pending=SEND_MAX_PENDING,
+)
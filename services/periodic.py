@@ -0,0 +1,44 @@
+# app/services/periodic.py
+from __future__ import annotations
+
+import asyncio
+
+from config import LOGGER
+
+
+class PeriodicJob:
+    """
+    Фоновая работа «раз в interval секунд»: запуск, остановка и цикл,
+    который логирует ошибку прохода и ждёт следующего. Подкласс
+    реализует run_once() и stats(); failure — текст для лога.
+    """
+
+    failure = "Periodic job failed"
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                LOGGER.exception(self.failure)
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> int:
+        raise NotImplementedError
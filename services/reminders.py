@@ -0,0 +1,333 @@
+# app/services/reminders.py
+from __future__ import annotations
+
+import asyncio
+import heapq
+import html
+from datetime import datetime, timedelta
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+from sqlalchemy import Select, false, select
+
+from config import (
+    BOT_WORKERS,
+    LOGGER,
+    REMINDER_LEAD_MINUTES,
+    REMINDER_MAX_PENDING,
+    REMINDER_SYNC_SECONDS,
+    REMINDER_WINDOW_MINUTES,
+)
+from models.db import get_sessionmaker
+from models.task import Task
+from services.outbox import NOTIFY, OutboxFull, send_priority
+
+_SYNC_GRACE = timedelta(seconds=30)
+_RETRY_SECONDS = 5.0  # пауза после ошибки шага планировщика (обычно БД)
+
+
+class ReminderScheduler:
+    """
+    Напоминания о дедлайнах на таймерной куче.
+
+    В памяти держим только «окно» — задачи, напоминание по которым
+    сработает в ближайшие `window`. Окно загружается одним диапазонным
+    запросом по idx_tasks_active_deadline, следующее — заранее, за
+    `prefetch` до конца текущего. В куче не больше `max_pending` живых
+    напоминаний: окно, в которое не помещаются все задачи, укорачивается
+    до последнего загруженного дедлайна, а пока куча полна, следующее
+    окно не грузится — память ограничена независимо от размера таблицы.
+
+    create_task/mark_done (storage.repo) вызывают schedule/cancel после
+    коммита. Задачи, созданные в других процессах (BOT_WORKERS > 1), до
+    schedule() этого процесса не доходят: раз в sync секунд их подбирает
+    запрос по created_ts с последней сверки (0 — не подбирать).
+    Отмена ленивая: запись остаётся в куче, но пропускается при
+    срабатывании; кучу перестраиваем, когда мусора больше живых.
+
+    Ошибка шага (недоступна БД) не останавливает планировщик: шаг
+    повторяется через _RETRY_SECONDS, снятые с кучи напоминания
+    возвращаются в неё.
+    """
+
+    def __init__(
+        self,
+        lead: timedelta = timedelta(hours=1),
+        window: timedelta = timedelta(hours=1),
+        prefetch: timedelta = timedelta(minutes=5),
+        max_pending: int = 50_000,
+        sync: float = 0.0,
+    ):
+        self.lead = lead
+        self.window = window
+        self.prefetch = min(prefetch, window / 2)
+        self.max_pending = max(1, max_pending)
+        self.sync = sync
+        self._synced_at: datetime | None = None  # UTC, как created_ts
+        self._heap: list[tuple[datetime, int]] = []
+        # task_id -> (fire_at, user_id, title, deadline)
+        self._live: dict[int, tuple[datetime, int, str, datetime]] = {}
+        self._window_end: datetime | None = None
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._next_sync = 0.0  # loop.time() следующей сверки
+        self._sending: set[asyncio.Task] = set()
+        self._bot: Bot | None = None
+        self.sent = 0
+        self.failed = 0
+        self.loads = 0
+        self.synced = 0
+
+    # ---------- public ----------
+    def start(self, bot: Bot) -> None:
+        if self._task is None:
+            self._bot = bot
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def schedule(
+        self, task_id: int, user_id: int, title: str, deadline: datetime | None
+    ) -> None:
+        if self._task is None or self._window_end is None or deadline is None:
+            return
+        if deadline <= datetime.now() or deadline - self.lead >= self._window_end:
+            return  # прошлое не напоминаем, будущее подхватит загрузка окна
+        # до дедлайна меньше lead — fire_at уже прошёл, сработает сразу
+        self._push(task_id, user_id, title, deadline)
+        if self._heap[0][1] == task_id:
+            self._wakeup.set()
+
+    def cancel(self, task_id: int) -> None:
+        if self._live.pop(task_id, None) is not None:
+            self._maybe_compact()
+            if len(self._live) == self.max_pending - 1:
+                self._wakeup.set()  # место освободилось — можно грузить окно
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": len(self._live),
+            "heap": len(self._heap),
+            "sent": self.sent,
+            "failed": self.failed,
+            "window_loads": self.loads,
+            "synced": self.synced,
+        }
+
+    # ---------- heap ----------
+    def _push(self, task_id: int, user_id: int, title: str, deadline: datetime):
+        fire_at = deadline - self.lead
+        self._live[task_id] = (fire_at, user_id, title, deadline)
+        heapq.heappush(self._heap, (fire_at, task_id))
+
+    def _maybe_compact(self) -> None:
+        if len(self._heap) > 2 * len(self._live) + 64:
+            self._heap = [(v[0], tid) for tid, v in self._live.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_due(self, now: datetime) -> list[tuple[int, int, str, datetime]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, task_id = heapq.heappop(self._heap)
+            item = self._live.get(task_id)
+            if item is None or item[0] != fire_at:
+                continue  # отменена или перепланирована
+            del self._live[task_id]
+            due.append((task_id, item[1], item[2], item[3]))
+        return due
+
+    # ---------- loading ----------
+    async def _load_window(
+        self, start: datetime, end: datetime, limit: int
+    ) -> datetime:
+        """
+        Грузит до limit напоминаний с fire_at в [start, end); возвращает
+        конец окна (раньше end, если всё не поместилось).
+        """
+        Session = get_sessionmaker()
+        async with Session() as session:
+            q = self._window_query(start + self.lead, end + self.lead)
+            rows = list((await session.execute(q.limit(limit))).all())
+            if len(rows) == limit:
+                # окно переполнено: обрезаем по последнему дедлайну, а задачи
+                # ровно с этим дедлайном догружаем целиком (их немного)
+                cutoff = rows[-1].deadline_ts
+                rows = [r for r in rows if r.deadline_ts < cutoff]
+                rows += (
+                    await session.execute(
+                        q.where(Task.deadline_ts == cutoff).order_by(None)
+                    )
+                ).all()
+                end = cutoff - self.lead + timedelta(microseconds=1)
+        for r in rows:
+            self._push(r.id, r.user_id, r.title, r.deadline_ts)
+        self.loads += 1
+        LOGGER.info("Reminders: loaded %d deadlines until %s", len(rows), end)
+        return end
+
+    @staticmethod
+    def _window_query(lo: datetime, hi: datetime) -> Select:
+        """Активные задачи с дедлайном в [lo, hi) — по idx_tasks_active_deadline."""
+        return (
+            select(Task.id, Task.user_id, Task.title, Task.deadline_ts)
+            .where(
+                Task.is_done == false(), Task.deadline_ts >= lo, Task.deadline_ts < hi
+            )
+            .order_by(Task.deadline_ts)
+        )
+
+    async def _sync(self) -> None:
+        """
+        Подбирает задачи с дедлайном в загруженном окне, созданные после
+        прошлой сверки. Нахлёст _SYNC_GRACE покрывает транзакции, которые
+        выставили created_ts раньше, а закоммитились позже; уже известные
+        задачи повторно не кладутся.
+        """
+        started = datetime.utcnow()
+        since = (self._synced_at or started) - _SYNC_GRACE
+        now = datetime.now()
+        Session = get_sessionmaker()
+        async with Session() as session:
+            q = select(Task.id, Task.user_id, Task.title, Task.deadline_ts).where(
+                Task.created_ts >= since,
+                Task.is_done == false(),
+                Task.deadline_ts > now,
+                Task.deadline_ts < self._window_end + self.lead,
+            )
+            rows = (await session.execute(q)).all()
+        self._synced_at = started
+        for r in rows:
+            known = self._live.get(r.id)
+            if known is None or known[0] != r.deadline_ts - self.lead:
+                self._push(r.id, r.user_id, r.title, r.deadline_ts)
+                self.synced += 1
+
+    async def _still_open(self, task_ids: list[int]) -> set[int]:
+        Session = get_sessionmaker()
+        async with Session() as session:
+            q = select(Task.id).where(Task.id.in_(task_ids), Task.is_done == false())
+            return set((await session.execute(q)).scalars().all())
+
+    # ---------- loop ----------
+    async def _advance(self, start: datetime) -> None:
+        # конец окна сдвигаем до запроса: задача, закоммиченная после
+        # него, попадёт в кучу через schedule() (повтор в куче безвреден)
+        prev, self._window_end = self._window_end, start + self.window
+        try:
+            end = await self._load_window(
+                start, self._window_end, self.max_pending - len(self._live)
+            )
+        except BaseException:
+            self._window_end = prev  # окно не загружено — повторим с того же места
+            raise
+        self._window_end = min(self._window_end, end)
+
+    async def _run(self) -> None:
+        self._synced_at = datetime.utcnow()
+        loop = asyncio.get_running_loop()
+        self._next_sync = loop.time() + self.sync
+        while True:
+            try:
+                timeout = await self._step(loop)
+            except Exception:
+                LOGGER.exception(
+                    "Reminders: scheduler step failed, retry in %ss", _RETRY_SECONDS
+                )
+                timeout = _RETRY_SECONDS
+            if timeout is None:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _step(self, loop: asyncio.AbstractEventLoop) -> float | None:
+        """
+        Один шаг цикла: окно, сверка, срабатывания. Возвращает, сколько
+        ждать следующего; None — следующий шаг сразу.
+        """
+        if self._window_end is None:
+            await self._advance(datetime.now())
+        if self.sync > 0 and loop.time() >= self._next_sync:
+            try:
+                await self._sync()
+            except Exception:
+                LOGGER.exception("Reminders: sync with other workers failed")
+            self._next_sync = loop.time() + self.sync
+        now = datetime.now()
+        full = len(self._live) >= self.max_pending
+        if now >= self._window_end - self.prefetch and not full:
+            await self._advance(self._window_end)
+            return None
+
+        due = self._pop_due(now)
+        if due:
+            # задачу могли закрыть в другом процессе (BOT_WORKERS > 1),
+            # где cancel() до этой кучи не доходит
+            try:
+                still_open = await self._still_open([item[0] for item in due])
+            except BaseException:
+                for item in due:
+                    self._push(*item)
+                raise
+            for item in due:
+                if item[0] in still_open:
+                    # держим ссылку, иначе задачу может собрать GC
+                    task = asyncio.create_task(self._notify(*item))
+                    self._sending.add(task)
+                    task.add_done_callback(self._sending.discard)
+
+        next_at = self._window_end - self.prefetch
+        if self._heap:
+            # при полной куче ждём срабатываний, а не конца окна
+            top = self._heap[0][0]
+            next_at = top if full else min(next_at, top)
+        timeout = max(0.0, (next_at - datetime.now()).total_seconds())
+        if self.sync > 0:
+            timeout = min(timeout, max(0.0, self._next_sync - loop.time()))
+        return timeout
+
+    async def _notify(
+        self, task_id: int, user_id: int, title: str, deadline: datetime
+    ) -> None:
+        text = (
+            f"⏰ <b>Скоро дедлайн</b>\n"
+            f"[#{task_id}] {html.escape(title)} — до {deadline:%Y-%m-%d %H:%M}"
+        )
+        # темп и повторы после RetryAfter — в очереди исходящих
+        try:
+            with send_priority(NOTIFY):
+                await self._bot.send_message(user_id, text)
+            self.sent += 1
+            return
+        except (
+            TelegramBadRequest,
+            TelegramForbiddenError,
+            TelegramRetryAfter,
+            OutboxFull,
+        ) as e:
+            LOGGER.info("Reminder for task %s not delivered: %s", task_id, e)
+        except Exception:
+            LOGGER.exception("Reminder for task %s failed", task_id)
+        self.failed += 1
+
+
+REMINDERS = ReminderScheduler(
+    lead=timedelta(minutes=REMINDER_LEAD_MINUTES),
+    window=timedelta(minutes=REMINDER_WINDOW_MINUTES),
+    max_pending=REMINDER_MAX_PENDING,
+    # напоминания живут в одном процессе, задачи создают все
+    sync=REMINDER_SYNC_SECONDS if BOT_WORKERS > 1 else 0.0,
+)
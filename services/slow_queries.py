@@ -0,0 +1,173 @@
+# app/services/slow_queries.py
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import json
+import logging
+import random
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import LOGGER
+from services.metrics import CURRENT_HANDLER
+
+_STARTED_KEY = "slow_query_started"
+_PARAM_LIMIT = 200  # символов на параметр в логе
+
+
+def _json_param(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (dt.datetime, dt.date)):
+        return value.isoformat()
+    text = str(value)
+    return text if len(text) <= _PARAM_LIMIT else text[:_PARAM_LIMIT] + "…"
+
+
+def _json_params(parameters: Any) -> Any:
+    if isinstance(parameters, dict):
+        return {k: _json_param(v) for k, v in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_json_param(v) for v in parameters]
+    return _json_param(parameters)
+
+
+class SlowQueryLog:
+    """
+    Детектор медленных запросов на engine.
+
+    Каждое выражение дольше threshold_ms пишется строкой JSON в
+    ротируемый файл: время, длительность, SQL, параметры и имя
+    обработчика aiogram, из которого он выполнен (CURRENT_HANDLER).
+
+    С вероятностью explain_sample для SELECT снимается план —
+    EXPLAIN (ANALYZE, BUFFERS) на Postgres, EXPLAIN QUERY PLAN на
+    SQLite — на отдельном соединении из пула, вне обработчика. Планы
+    не снимаются для INSERT/UPDATE/DELETE (ANALYZE их выполнил бы) и
+    для executemany. Одновременно снимается не больше одного плана, а
+    один и тот же текст запроса — не чаще раза в explain_cooldown
+    секунд, чтобы EXPLAIN не добавлял нагрузки, когда база и так тормозит.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        path: str,
+        threshold_ms: float = 200.0,
+        explain_sample: float = 0.1,
+        explain_cooldown: float = 60.0,
+        max_bytes: int = 10 * 1024 * 1024,
+        backups: int = 5,
+    ):
+        self.engine = engine
+        self.threshold = threshold_ms / 1000
+        self.explain_sample = explain_sample
+        self.explain_cooldown = explain_cooldown
+        self._postgres = engine.dialect.name == "postgresql"
+        self._explaining = False
+        self._explained_at: dict[str, float] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.logged = 0
+        self.explained = 0
+
+        self._log = logging.getLogger("task-bot.slow_queries")
+        self._log.propagate = False
+        self._log.setLevel(logging.INFO)
+        if not self._log.handlers:
+            handler = RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._log.addHandler(handler)
+
+    def install(self) -> None:
+        sync_engine = self.engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", self._before)
+        event.listen(sync_engine, "after_cursor_execute", self._after)
+        event.listen(sync_engine, "handle_error", self._error)
+
+    # ---------- события engine ----------
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_STARTED_KEY, []).append(time.perf_counter())
+
+    def _error(self, context) -> None:
+        if context.connection is None:
+            return
+        stack = context.connection.info.get(_STARTED_KEY)
+        if stack:
+            stack.pop()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info[_STARTED_KEY].pop()
+        if elapsed < self.threshold or statement.lstrip()[:7].upper() == "EXPLAIN":
+            return
+        entry = {
+            "ts": dt.datetime.now().isoformat(timespec="milliseconds"),
+            "ms": round(elapsed * 1000, 2),
+            "handler": CURRENT_HANDLER.get(),
+            "statement": statement,
+            "params": _json_params(parameters),
+            "executemany": executemany,
+        }
+        if self._want_plan(statement, executemany):
+            self._explaining = True
+            if len(self._explained_at) > 1000:
+                self._explained_at.clear()
+            self._explained_at[statement] = time.monotonic()
+            task = asyncio.get_running_loop().create_task(
+                self._explain_and_write(entry, statement, parameters)
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            self._write(entry)
+
+    # ---------- план ----------
+    def _want_plan(self, statement: str, executemany: bool) -> bool:
+        if executemany or self._explaining or self.explain_sample <= 0:
+            return False
+        verb = statement.lstrip()[:6].upper()
+        if verb != "SELECT" and not verb.startswith("WITH"):
+            return False
+        last = self._explained_at.get(statement)
+        if last is not None and time.monotonic() - last < self.explain_cooldown:
+            return False
+        return random.random() < self.explain_sample
+
+    async def _explain_and_write(self, entry: dict, statement: str, parameters):
+        try:
+            entry["plan"] = await self._explain(statement, parameters)
+            self.explained += 1
+        except Exception as e:
+            entry["plan_error"] = f"{type(e).__name__}: {e}"
+        finally:
+            self._explaining = False
+        self._write(entry)
+
+    async def _explain(self, statement: str, parameters) -> Any:
+        if self._postgres:
+            prefix = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) "
+        else:
+            prefix = "EXPLAIN QUERY PLAN "
+        async with self.engine.connect() as conn:
+            res = await conn.exec_driver_sql(prefix + statement, parameters)
+            rows = res.all()
+            await conn.rollback()
+        if self._postgres:
+            return rows[0][0]  # FORMAT JSON — одна строка с JSON-массивом
+        return [" ".join(str(v) for v in row) for row in rows]
+
+    def _write(self, entry: dict) -> None:
+        self.logged += 1
+        try:
+            self._log.info(json.dumps(entry, ensure_ascii=False, default=str))
+        except Exception:
+            LOGGER.exception("Failed to write slow query log")
+
+    def stats(self) -> dict[str, int]:
+        return {"logged": self.logged, "explained": self.explained}
@@ -0,0 +1,57 @@
+# app/services/stats_reconciler.py
+from __future__ import annotations
+
+import asyncio
+
+from config import LOGGER, STATS_RECONCILE_BATCH, STATS_RECONCILE_INTERVAL
+from models.db import get_sessionmaker
+from services.periodic import PeriodicJob
+from storage.repo import reconcile_user_stats
+
+
+class StatsReconciler(PeriodicJob):
+    """
+    Фоновая сверка счётчиков user_stats с самими задачами.
+
+    Счётчики ведутся приращениями в транзакциях записи, и расхождение
+    возможно только в обход storage.repo (ручные правки в БД, старый
+    код) или в редких гонках. Раз в interval секунд проходит всех
+    пользователей пачками по batch — каждая пачка в своей короткой
+    транзакции, между пачками пауза — и переписывает расходящиеся строки.
+    """
+
+    failure = "User stats reconciliation failed"
+
+    def __init__(self, interval: float = 3600.0, batch: int = 500, pause: float = 0.5):
+        super().__init__(interval)
+        self.batch = max(1, batch)
+        self.pause = pause
+        self.fixed = 0
+        self.runs = 0
+
+    async def run_once(self) -> int:
+        total = 0
+        last = None
+        Session = get_sessionmaker()
+        while True:
+            async with Session() as session:
+                last, fixed = await reconcile_user_stats(session, last, self.batch)
+                await session.commit()
+            if last is None:
+                break
+            total += fixed
+            self.fixed += fixed
+            await asyncio.sleep(self.pause)
+        self.runs += 1
+        if total:
+            LOGGER.warning("Reconciled user stats: %d rows had drifted", total)
+        return total
+
+    def stats(self) -> dict[str, int]:
+        return {"fixed": self.fixed, "runs": self.runs}
+
+
+RECONCILER = StatsReconciler(
+    interval=STATS_RECONCILE_INTERVAL,
+    batch=STATS_RECONCILE_BATCH,
+)
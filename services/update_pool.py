@@ -0,0 +1,144 @@
+# app/services/update_pool.py
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiohttp import web
+
+from config import LOGGER
+
+
+def update_user_id(update: dict[str, Any]) -> int | None:
+    """Автор апдейта по сырому JSON — без разбора в pydantic-модели."""
+    for key, value in update.items():
+        if key == "update_id" or not isinstance(value, dict):
+            continue
+        sender = value.get("from") or value.get("user")
+        if isinstance(sender, dict) and "id" in sender:
+            return sender["id"]
+        chat = value.get("chat") or (value.get("message") or {}).get("chat")
+        if isinstance(chat, dict) and "id" in chat:
+            return chat["id"]
+    return None
+
+
+class ShardedUpdatePool:
+    """
+    Обработка webhook-апдейтов пулом из N воркеров с шардированием по
+    пользователю.
+
+    Апдейты одного пользователя всегда попадают в одну очередь и
+    выполняются строго по порядку (два быстрых taskdone: не гоняются),
+    разные пользователи обрабатываются параллельно. Порядок — только
+    внутри процесса: при BOT_WORKERS > 1 апдейты пользователя приходят
+    в разные воркеры, и закрытие задачи и листание списка выстраивает
+    уже storage/user_lock.py. Очереди ограничены
+    queue_size: при переполнении webhook-запрос ждёт места, и Telegram
+    сам притормаживает доставку (он держит не больше max_connections
+    запросов одновременно).
+
+    Метрики: глубина очередей, задержка от приёма до начала обработки
+    (lag), время обработки и число ошибок — см. stats().
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        workers: int = 16,
+        queue_size: int = 100,
+        **data: Any,
+    ):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.data = data
+        self.workers = max(1, workers)
+        self._queues = [
+            asyncio.Queue(maxsize=max(1, queue_size)) for _ in range(self.workers)
+        ]
+        self._tasks: list[asyncio.Task] = []
+        self.received = 0
+        self.processed = 0
+        self.errors = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.busy_total = 0.0
+
+    # ---------- aiohttp ----------
+    def register(self, app: web.Application, path: str) -> None:
+        app.router.add_post(path, self.handle)
+        app.on_startup.append(self._on_startup)
+        app.on_shutdown.append(self._on_shutdown)
+
+    async def _on_startup(self, app: web.Application) -> None:
+        self.start()
+
+    async def _on_shutdown(self, app: web.Application) -> None:
+        await self.stop()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        update = await request.json(loads=self.bot.session.json_loads)
+        await self.submit(update)
+        return web.json_response({}, dumps=self.bot.session.json_dumps)
+
+    # ---------- pool ----------
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._worker(q)) for q in self._queues
+            ]
+
+    async def stop(self) -> None:
+        """Дорабатывает уже принятые апдейты и останавливает воркеров."""
+        for q in self._queues:
+            await q.join()
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, update: dict[str, Any]) -> None:
+        uid = update_user_id(update)
+        key = uid if uid is not None else update.get("update_id", 0)
+        self.received += 1
+        await self._queues[hash(key) % self.workers].put((time.monotonic(), update))
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            enqueued, update = await queue.get()
+            started = time.monotonic()
+            lag = started - enqueued
+            self.lag_total += lag
+            self.lag_max = max(self.lag_max, lag)
+            try:
+                result = await self.dispatcher.feed_raw_update(
+                    self.bot, update, **self.data
+                )
+                if isinstance(result, TelegramMethod):
+                    await self.dispatcher.silent_call_request(self.bot, result)
+            except Exception:
+                self.errors += 1
+                LOGGER.exception("Update %s failed", update.get("update_id"))
+            finally:
+                self.processed += 1
+                self.busy_total += time.monotonic() - started
+                queue.task_done()
+
+    def stats(self) -> dict[str, Any]:
+        depths = [q.qsize() for q in self._queues]
+        done = self.processed or 1
+        return {
+            "workers": self.workers,
+            "queued": sum(depths),
+            "max_queue_depth": max(depths),
+            "received": self.received,
+            "processed": self.processed,
+            "errors": self.errors,
+            "avg_lag_ms": round(self.lag_total / done * 1000, 2),
+            "max_lag_ms": round(self.lag_max * 1000, 2),
+            "avg_busy_ms": round(self.busy_total / done * 1000, 2),
+        }
@@ -0,0 +1,68 @@
+# app/services/workers.py
+from __future__ import annotations
+
+import multiprocessing
+import os
+import signal
+from multiprocessing.connection import wait
+from typing import Callable
+
+from config import LOGGER
+
+
+def run_workers(target: Callable[[int], None], count: int, timeout: float) -> int:
+    """
+    Запускает count процессов target(index) и присматривает за ними.
+
+    Процессы стартуют через spawn: каждый импортирует приложение заново
+    и создаёт собственный engine/пул соединений, ничего не наследуя от
+    родителя. Номер процесса передаётся и окружением (BOT_WORKER_INDEX →
+    config.WORKER_INDEX) — его видят модули уже при импорте.
+    Остановка согласованная: SIGTERM/SIGINT родителю, или неожиданное
+    завершение любого воркера, рассылают SIGTERM всем, ждут до timeout
+    секунд и добивают оставшихся. Возвращает код выхода.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    procs = [
+        ctx.Process(target=target, args=(i,), name=f"bot-worker-{i}")
+        for i in range(count)
+    ]
+    for i, p in enumerate(procs):
+        os.environ["BOT_WORKER_INDEX"] = str(i)
+        try:
+            p.start()
+        finally:
+            del os.environ["BOT_WORKER_INDEX"]
+    LOGGER.info("Started %d workers: %s", count, [p.pid for p in procs])
+
+    stopping = False
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    exit_code = 0
+    while not stopping:
+        done = wait([p.sentinel for p in procs], timeout=0.5)
+        if done:
+            dead = [p for p in procs if not p.is_alive()]
+            LOGGER.error(
+                "Worker(s) exited: %s, shutting down",
+                [(p.name, p.exitcode) for p in dead],
+            )
+            exit_code = 1
+            break
+
+    for p in procs:
+        if p.is_alive():
+            p.terminate()  # SIGTERM — воркер дорабатывает принятые апдейты
+    for p in procs:
+        p.join(timeout)
+        if p.is_alive():
+            LOGGER.warning("%s did not stop in %ss, killing", p.name, timeout)
+            p.kill()
+            p.join()
+    return exit_code
@@ -0,0 +1,6 @@
+# app/states/import_tasks.py
+from aiogram.fsm.state import State, StatesGroup
+
+
+class ImportStates(StatesGroup):
+    waiting = State()
@@ -0,0 +1,178 @@
+# app/storage/cache.py
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+from config import KNOWN_USERS_SIZE, PAGE_CACHE_SIZE, PAGE_CACHE_TTL
+
+
+class PageCache:
+    """
+    Ограниченный LRU/TTL-кэш отрисованных страниц списка задач.
+
+    Ключ — (user_id, *ключ страницы). Каждая запись помнит версию
+    пользователя на момент отрисовки; bump(user_id) делает все его записи
+    устаревшими без обхода кэша. Таблица версий тоже ограничена: версия
+    вытесненного пользователя заменяется «полом» — максимумом вытесненных
+    версий, так что старая запись не может снова совпасть.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, int, Any]] = OrderedDict()
+        self._versions: OrderedDict[int, int] = OrderedDict()
+        self._clock = 0
+        self._floor = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def version(self, user_id: int) -> int:
+        return self._versions.get(user_id, self._floor)
+
+    def bump(self, user_id: int) -> None:
+        self._clock += 1
+        self._versions[user_id] = self._clock
+        self._versions.move_to_end(user_id)
+        self.invalidations += 1
+        while len(self._versions) > self.maxsize:
+            _, v = self._versions.popitem(last=False)
+            self._floor = max(self._floor, v)
+
+    def get(self, user_id: int, key: Hashable) -> Any | None:
+        full = (user_id, key)
+        item = self._data.get(full)
+        if item is not None:
+            expires, ver, value = item
+            if ver == self.version(user_id) and expires > time.monotonic():
+                self._data.move_to_end(full)
+                self.hits += 1
+                return value
+            del self._data[full]
+        self.misses += 1
+        return None
+
+    def put(self, user_id: int, key: Hashable, value: Any, version: int) -> None:
+        full = (user_id, key)
+        self._data[full] = (time.monotonic() + self.ttl, version, value)
+        self._data.move_to_end(full)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_load(
+        self, user_id: int, key: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        value = self.get(user_id, key)
+        if value is not None:
+            return value
+        # версию фиксируем до загрузки: если между чтением и записью
+        # случится bump, запись сразу окажется устаревшей
+        version = self.version(user_id)
+        value = await loader()
+        self.put(user_id, key, value, version)
+        return value
+
+    def stats(self) -> dict[str, int | float]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+PAGE_CACHE = PageCache(maxsize=PAGE_CACHE_SIZE, ttl=PAGE_CACHE_TTL)
+
+
+class CategoryCache:
+    """
+    Имя -> id категорий. Системные (user_id IS NULL) прогреваются при
+    старте (storage.repo.warm_category_cache) и не меняются; личные
+    категории держим для последних max_users пользователей. id категорий
+    неизменны, поэтому устареть запись не может — только отсутствовать.
+    """
+
+    def __init__(self, max_users: int = 10_000):
+        self.max_users = max(1, max_users)
+        self.system: dict[str, int] = {}
+        self._users: OrderedDict[int, dict[str, int]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int | None, name: str) -> int | None:
+        if user_id is None:
+            cat_id = self.system.get(name)
+        else:
+            names = self._users.get(user_id)
+            cat_id = names.get(name) if names is not None else None
+            if names is not None:
+                self._users.move_to_end(user_id)
+        if cat_id is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cat_id
+
+    def put(self, user_id: int | None, name: str, cat_id: int) -> None:
+        if user_id is None:
+            self.system[name] = cat_id
+            return
+        self._users.setdefault(user_id, {})[name] = cat_id
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        self._users.pop(user_id, None)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "system": len(self.system),
+            "users": len(self._users),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+CATEGORY_CACHE = CategoryCache()
+
+
+class KnownUsers:
+    """
+    user_id -> username пользователей, чья строка в users уже закоммичена
+    с этим username. Для них ensure_user не ходит в БД. Ограничен LRU.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = max(1, maxsize)
+        self._users: OrderedDict[int, str | None] = OrderedDict()
+
+    def is_current(self, user_id: int, username: str | None) -> bool:
+        known = self._users.get(user_id, self._MISSING)
+        if known is self._MISSING or known != username:
+            return False
+        self._users.move_to_end(user_id)
+        return True
+
+    def remember(self, user_id: int, username: str | None) -> None:
+        self._users[user_id] = username
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.maxsize:
+            self._users.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+
+KNOWN_USERS = KnownUsers(maxsize=KNOWN_USERS_SIZE)
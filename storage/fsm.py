@@ -0,0 +1,222 @@
+# app/storage/fsm.py
+from __future__ import annotations
+
+import asyncio
+import copy
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseStorage,
+    DefaultKeyBuilder,
+    StateType,
+    StorageKey,
+)
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import LOGGER
+from models.fsm import FsmRecord
+
+
+class _Entry:
+    __slots__ = ("state", "data", "loaded_at", "dirty")
+
+    def __init__(self, state: Optional[str], data: Dict[str, Any], dirty: bool):
+        self.state = state
+        self.data = data
+        self.loaded_at = time.monotonic()
+        self.dirty = dirty
+
+
+class SQLAlchemyStorage(BaseStorage):
+    """
+    FSM-хранилище в таблице fsm_states поверх общего AsyncEngine.
+
+    - Горячий кэш: последние cache_size ключей живут в памяти процесса,
+      чтение из БД — только при промахе или по истечении cache_ttl.
+    - Write-behind: set_state/set_data лишь помечают ключ «грязным»,
+      фоновая задача раз в flush_interval пишет все изменения одной
+      транзакцией (один upsert + один delete). Несколько шагов мастера
+      внутри интервала схлопываются в одну запись.
+    - flush_interval=0 — запись сразу (write-through). Так стоит
+      запускать несколько процессов без привязки пользователя к
+      процессу, вместе с cache_ttl=0.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        flush_interval: float = 1.0,
+        cache_size: int = 10_000,
+        cache_ttl: float = 30.0,
+    ):
+        self.engine = engine
+        self.flush_interval = max(0.0, flush_interval)
+        self.cache_size = max(1, cache_size)
+        self.cache_ttl = cache_ttl
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._cache: OrderedDict[str, _Entry] = OrderedDict()
+        self._flush_lock = asyncio.Lock()
+        self._flusher: asyncio.Task | None = None
+        self._closed = False
+        self.db_reads = 0
+        self.db_writes = 0
+
+    # ---------- BaseStorage ----------
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        entry = await self._entry(key)
+        entry.state = state.state if isinstance(state, State) else state
+        await self._mark_dirty(entry)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._entry(key)).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        entry = await self._entry(key)
+        entry.data = copy.deepcopy(dict(data))
+        await self._mark_dirty(entry)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return copy.deepcopy((await self._entry(key)).data)
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+
+    # ---------- cache ----------
+    async def _entry(self, key: StorageKey) -> _Entry:
+        skey = self.key_builder.build(key)
+        entry = self._cache.get(skey)
+        if entry is not None and (
+            entry.dirty or time.monotonic() - entry.loaded_at < self.cache_ttl
+        ):
+            self._cache.move_to_end(skey)
+            return entry
+
+        async with self.engine.connect() as conn:
+            row = (
+                await conn.execute(
+                    select(FsmRecord.state, FsmRecord.data).where(FsmRecord.key == skey)
+                )
+            ).first()
+        self.db_reads += 1
+        cached = self._cache.get(skey)
+        if cached is not None and cached.dirty:
+            # пока ждали БД, ключ уже изменили в этом процессе
+            return cached
+        if row is not None:
+            entry = _Entry(row.state, dict(row.data or {}), dirty=False)
+        else:
+            entry = _Entry(None, {}, dirty=False)
+        self._cache[skey] = entry
+        self._cache.move_to_end(skey)
+        await self._evict(keep=skey)
+        return entry
+
+    async def _evict(self, keep: str) -> None:
+        # грязные записи не вытесняем до сброса в БД, keep — только что
+        # загруженную — тоже: её сейчас вернут вызывающему
+        if len(self._cache) <= self.cache_size:
+            return
+        self._drop_clean(keep)
+        if len(self._cache) > self.cache_size:
+            # кэш забит несброшенными записями — пишем их досрочно
+            try:
+                await self.flush()
+            except Exception:
+                LOGGER.exception("FSM flush failed, will retry")
+            self._drop_clean(keep)
+
+    def _drop_clean(self, keep: str) -> None:
+        for skey in list(self._cache):
+            if len(self._cache) <= self.cache_size:
+                break
+            if skey != keep and not self._cache[skey].dirty:
+                del self._cache[skey]
+
+    async def _mark_dirty(self, entry: _Entry) -> None:
+        entry.dirty = True
+        entry.loaded_at = time.monotonic()
+        if self.flush_interval == 0 or self._closed:
+            await self.flush()
+        elif self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    # ---------- write-behind ----------
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                LOGGER.exception("FSM flush failed, will retry")
+            if not any(e.dirty for e in self._cache.values()):
+                return
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            batch = {k: e for k, e in self._cache.items() if e.dirty}
+            if not batch:
+                return
+            # снимаем флаг до записи: изменения, пришедшие во время
+            # транзакции, снова пометят ключ и уйдут следующей пачкой
+            snapshot = {}
+            for k, e in batch.items():
+                e.dirty = False
+                snapshot[k] = (e.state, copy.deepcopy(e.data))
+            try:
+                await self._write(snapshot)
+            except Exception:
+                for e in batch.values():
+                    e.dirty = True
+                raise
+            self.db_writes += 1
+
+    async def _write(self, snapshot: dict[str, tuple[Optional[str], dict]]) -> None:
+        now = datetime.utcnow()
+        gone = [k for k, (state, data) in snapshot.items() if state is None and not data]
+        rows = [
+            {"key": k, "state": state, "data": data, "updated_at": now}
+            for k, (state, data) in snapshot.items()
+            if state is not None or data
+        ]
+        async with self.engine.begin() as conn:
+            if gone:
+                await conn.execute(delete(FsmRecord).where(FsmRecord.key.in_(gone)))
+            if rows:
+                await conn.execute(self._upsert(rows))
+
+    def _upsert(self, rows: list[dict]):
+        if self.engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(FsmRecord).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[FsmRecord.key],
+            set_={
+                "state": stmt.excluded.state,
+                "data": stmt.excluded.data,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "cached": len(self._cache),
+            "dirty": sum(1 for e in self._cache.values() if e.dirty),
+            "db_reads": self.db_reads,
+            "db_writes": self.db_writes,
+        }
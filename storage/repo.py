@@ -1,22 +1,173 @@
 # app/storage/repo.py
 from __future__ import annotations
 
-from datetime import datetime
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Callable, NamedTuple
 
-from sqlalchemy import select, update
+from sqlalchemy import (
+    Row,
+    case,
+    column,
+    delete,
+    event,
+    false,
+    func,
+    insert,
+    literal,
+    literal_column,
+    select,
+    table,
+    true,
+    tuple_,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 
-from models.task import Category, Task, User
+from config import LOGGER
+from models.db import get_sessionmaker
+from models.search import TS_CONFIG
+from models.stats import STATS_COLUMNS, UserStats, computed_stats, stats_buckets
+from models.task import Category, Task, TaskArchive, User
+from services.reminders import REMINDERS
+from storage.cache import CATEGORY_CACHE, KNOWN_USERS, PAGE_CACHE
+
+_EPOCH = datetime(1970, 1, 1)
+_US = timedelta(microseconds=1)
+
+
+class TaskKey(NamedTuple):
+    """Ключ сортировки активного списка: (deadline_ts, created_ts, id)."""
+
+    deadline_ts: datetime | None
+    created_ts: datetime
+    id: int
+
+    @classmethod
+    def of(cls, task: Task) -> "TaskKey":
+        return cls(task.deadline_ts, task.created_ts, task.id)
+
+    def preceding(self) -> "TaskKey":
+        """Ключ сразу перед этим: after=key.preceding() выбирает и саму строку key."""
+        return self._replace(id=self.id - 1)
+
+    def following(self) -> "TaskKey":
+        """Ключ сразу после этого: before=key.following() выбирает и саму строку key."""
+        return self._replace(id=self.id + 1)
+
+
+def _ts_to_token(ts: datetime | None) -> str:
+    if ts is None:
+        return ""
+    return _int_to_b36((ts - _EPOCH) // _US)
+
+
+def _token_to_ts(token: str) -> datetime | None:
+    if not token:
+        return None
+    return _EPOCH + int(token, 36) * _US
+
+
+def _int_to_b36(n: int) -> str:
+    sign = "-" if n < 0 else ""
+    n = abs(n)
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    out = ""
+    while True:
+        n, r = divmod(n, 36)
+        out = digits[r] + out
+        if not n:
+            return sign + out
+
+
+def encode_cursor(key: TaskKey) -> str:
+    """Компактное представление ключа для callback_data (лимит 64 байта)."""
+    return ".".join(
+        (_ts_to_token(key.deadline_ts), _ts_to_token(key.created_ts), _int_to_b36(key.id))
+    )
+
+
+def decode_cursor(token: str) -> TaskKey:
+    dl, cr, tid = token.split(".")
+    return TaskKey(_token_to_ts(dl), _token_to_ts(cr), int(tid, 36))
+
+
+def _after_commit(session: AsyncSession, fn: Callable[[], None]) -> None:
+    """Выполнить fn после успешного коммита сессии (при откате — забыть)."""
+    session.info.setdefault("after_commit", []).append(fn)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(session: Session) -> None:
+    for fn in session.info.pop("after_commit", ()):
+        try:
+            fn()
+        except Exception:
+            LOGGER.exception("after_commit hook failed")
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session: Session) -> None:
+    session.info.pop("after_commit", None)
+
+
+def _touch_user_tasks(session: AsyncSession, user_id: int) -> None:
+    """Сбрасывает кэш страниц пользователя сейчас и ещё раз после коммита."""
+    PAGE_CACHE.bump(user_id)
+    # Чтение, попавшее между flush и commit, могло закэшировать старые данные
+    _after_commit(session, lambda: PAGE_CACHE.bump(user_id))
 
 
 # Пользователь
 async def ensure_user(session: AsyncSession, user_id: int, username: str | None):
-    user = await session.get(User, user_id)
-    if not user:
-        user = User(user_id=user_id, username=username)
-        session.add(user)
-        await session.flush()
-    return user
+    """
+    Гарантирует строку в users без отдельного SELECT и flush.
+
+    Знакомый пользователь с тем же username (KNOWN_USERS) — ноль запросов.
+    Иначе — один upsert в той же транзакции, что и последующий
+    create_task: вставка без гонки на дубликат ключа, а username
+    переписывается, только если он действительно изменился.
+    """
+    await ensure_users_bulk(session, {user_id: username})
+
+
+def _dialect_insert(session: AsyncSession):
+    """insert() с поддержкой ON CONFLICT для текущего диалекта."""
+    if session.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert
+
+
+async def ensure_users_bulk(
+    session: AsyncSession, users: dict[int, str | None]
+) -> None:
+    """Один upsert на всех ещё не известных процессу пользователей пачки."""
+    users = {
+        uid: name
+        for uid, name in users.items()
+        if not KNOWN_USERS.is_current(uid, name)
+    }
+    if not users:
+        return
+    stmt = _dialect_insert(session)(User).values(
+        [{"user_id": uid, "username": name} for uid, name in users.items()]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[User.user_id],
+        set_={"username": stmt.excluded.username},
+        where=User.username.is_distinct_from(stmt.excluded.username),
+    )
+    await session.execute(stmt)
+
+    def _remember():
+        for uid, name in users.items():
+            KNOWN_USERS.remember(uid, name)
+
+    _after_commit(session, _remember)
 
 
 # Категории
@@ -26,17 +177,94 @@ async def get_or_create_category(
     q = select(Category).where(Category.user_id == user_id, Category.name == name)
     res = await session.execute(q)
     cat = res.scalar_one_or_none()
-    if not cat:
+    if cat:
+        CATEGORY_CACHE.put(user_id, name, cat.id)
+    else:
         cat = Category(name=name, user_id=user_id)
         session.add(cat)
         await session.flush()
+        _cache_new_category(session, user_id, name, cat.id)
     return cat
 
 
+def _cache_new_category(
+    session: AsyncSession, user_id: int | None, name: str, cat_id: int
+) -> None:
+    # новая категория попадает в кэш только после коммита: при откате id невалиден
+    if user_id is not None:
+        _after_commit(session, lambda: CATEGORY_CACHE.invalidate(user_id))
+    _after_commit(session, lambda: CATEGORY_CACHE.put(user_id, name, cat_id))
+
+
+async def get_category_id(
+    session: AsyncSession, user_id: int | None, name: str
+) -> int:
+    """id категории по имени; при попадании в кэш — без запроса к БД."""
+    cat_id = CATEGORY_CACHE.get(user_id, name)
+    if cat_id is None:
+        cat_id = (await get_or_create_category(session, user_id, name)).id
+    return cat_id
+
+
+async def resolve_categories(
+    session: AsyncSession, user_id: int | None, names: set[str]
+) -> dict[str, int]:
+    """
+    id категорий пользователя (user_id=None — системных) по именам:
+    кэш, затем один SELECT, недостающие создаются одним INSERT.
+    """
+    found = {}
+    for name in names:
+        cat_id = CATEGORY_CACHE.get(user_id, name)
+        if cat_id is not None:
+            found[name] = cat_id
+    unknown = names - found.keys()
+    if not unknown:
+        return found
+    if user_id is None:
+        owner = Category.user_id.is_(None)
+    else:
+        owner = Category.user_id == user_id
+    q = select(Category.name, Category.id).where(owner, Category.name.in_(unknown))
+    for name, cat_id in (await session.execute(q)).all():
+        CATEGORY_CACHE.put(user_id, name, cat_id)
+        found[name] = cat_id
+    missing = sorted(unknown - found.keys())
+    if missing:
+        res = await session.execute(
+            insert(Category).returning(
+                Category.name, Category.id, sort_by_parameter_order=True
+            ),
+            [{"name": n, "user_id": user_id} for n in missing],
+        )
+        for name, cat_id in res.all():
+            _cache_new_category(session, user_id, name, cat_id)
+            found[name] = cat_id
+    return found
+
+
+async def resolve_system_categories(
+    session: AsyncSession, names: set[str]
+) -> dict[str, int]:
+    """id системных категорий по именам; недостающие создаются одним INSERT."""
+    return await resolve_categories(session, None, names)
+
+
+async def warm_category_cache(names: list[str]) -> None:
+    """Прогрев системных категорий при старте (создаёт недостающие)."""
+    Session = get_sessionmaker()
+    async with Session() as session:
+        await resolve_system_categories(session, set(names))
+        await session.commit()
+
+
 async def list_categories(session: AsyncSession, user_id: int | None):
     q = select(Category).where(Category.user_id == user_id)
     res = await session.execute(q)
-    return list(res.scalars().all())
+    cats = list(res.scalars().all())
+    for cat in cats:
+        CATEGORY_CACHE.put(user_id, cat.name, cat.id)
+    return cats
 
 
 # Задачи
@@ -46,31 +274,387 @@ async def create_task(
     title: str,
     category: Category | None,
     deadline: datetime | None,
+    category_id: int | None = None,
 ):
+    """category — ORM-объект, либо category_id, если id уже известен (кэш)."""
     task = Task(user_id=user_id, title=title, category=category, deadline_ts=deadline)
+    if category is None and category_id is not None:
+        task.category_id = category_id
     session.add(task)
     await session.flush()
+    await _bump_stats(session, {user_id: (1, 0)})
+    _touch_user_tasks(session, user_id)
+    task_id = task.id
+    _after_commit(
+        session, lambda: REMINDERS.schedule(task_id, user_id, title, deadline)
+    )
     return task
 
 
+async def create_tasks_bulk(session: AsyncSession, rows: list[dict]) -> list[int]:
+    """
+    Пачка задач одним многострочным INSERT (insertmanyvalues).
+    rows — словари user_id/title/category_id/deadline_ts; id возвращаются
+    в порядке rows.
+    """
+    if not rows:
+        return []
+    now = datetime.utcnow()
+    res = await session.execute(
+        insert(Task).returning(Task.id, sort_by_parameter_order=True),
+        [{"is_done": False, "created_ts": now, **r} for r in rows],
+    )
+    ids = list(res.scalars().all())
+    opened = Counter(r["user_id"] for r in rows)
+    await _bump_stats(session, {uid: (n, 0) for uid, n in opened.items()})
+    for r, task_id in zip(rows, ids):
+        uid, title, dl = r["user_id"], r["title"], r["deadline_ts"]
+        _touch_user_tasks(session, uid)
+        _after_commit(
+            session,
+            lambda t=task_id, u=uid, ti=title, d=dl: REMINDERS.schedule(t, u, ti, d),
+        )
+    return ids
+
+
+async def _fetch(session: AsyncSession, q, limit: int) -> list[Task]:
+    if limit <= 0:
+        return []
+    res = await session.execute(q.limit(limit))
+    return list(res.scalars().all())
+
+
 async def list_tasks_active(
-    session: AsyncSession, user_id: int, limit: int = 10, offset: int = 0
-):
-    q = (
+    session: AsyncSession,
+    user_id: int,
+    limit: int = 10,
+    after: TaskKey | None = None,
+    before: TaskKey | None = None,
+) -> list[Task]:
+    """
+    Keyset-пагинация активных задач: сначала с дедлайном по возрастанию,
+    затем без дедлайна, внутри — по (created_ts, id).
+
+    Задачи с дедлайном и без выбираются разными запросами: у каждого
+    предикат — обычное сравнение кортежей, которое целиком ложится на
+    idx_tasks_active_seek, поэтому любая страница стоит как первая.
+    Второй запрос делается только на стыке двух сегментов.
+    """
+    base = (
         select(Task)
-        .where(Task.user_id == user_id, Task.is_done.is_(False))
-        .order_by(Task.deadline_ts.is_(None), Task.deadline_ts, Task.created_ts)
-        .limit(limit)
-        .offset(offset)
+        .options(joinedload(Task.category))  # категория в том же запросе (JOIN)
+        .where(Task.user_id == user_id, Task.is_done == false())
     )
-    res = await session.execute(q)
-    return list(res.scalars().all())
+    dated = base.where(Task.deadline_ts.is_not(None))
+    undated = base.where(Task.deadline_ts.is_(None))
+    dated_key = tuple_(Task.deadline_ts, Task.created_ts, Task.id)
+    undated_key = tuple_(Task.created_ts, Task.id)
+
+    if before is not None:
+        # Назад: идём в обратном порядке от первой строки текущей страницы
+        if before.deadline_ts is None:
+            tasks = await _fetch(
+                session,
+                undated.where(undated_key < (before.created_ts, before.id)).order_by(
+                    Task.created_ts.desc(), Task.id.desc()
+                ),
+                limit,
+            )
+            tail = dated
+        else:
+            tasks = []
+            tail = dated.where(dated_key < tuple(before))
+        tasks += await _fetch(
+            session,
+            tail.order_by(
+                Task.deadline_ts.desc(), Task.created_ts.desc(), Task.id.desc()
+            ),
+            limit - len(tasks),
+        )
+        tasks.reverse()
+        return tasks
+
+    if after is not None and after.deadline_ts is None:
+        return await _fetch(
+            session,
+            undated.where(undated_key > (after.created_ts, after.id)).order_by(
+                Task.created_ts, Task.id
+            ),
+            limit,
+        )
+
+    if after is not None:
+        dated = dated.where(dated_key > tuple(after))
+    tasks = await _fetch(
+        session, dated.order_by(Task.deadline_ts, Task.created_ts, Task.id), limit
+    )
+    tasks += await _fetch(
+        session, undated.order_by(Task.created_ts, Task.id), limit - len(tasks)
+    )
+    return tasks
+
+
+async def list_active_page(
+    session: AsyncSession,
+    user_id: int,
+    limit: int,
+    after: TaskKey | None = None,
+    before: TaskKey | None = None,
+) -> tuple[list[Task], bool]:
+    """
+    Страница активных задач и признак has_next без отдельного COUNT:
+    вперёд запрашиваем limit + 1 строку (лишняя — только проба), а при
+    движении назад следующая страница существует по определению.
+    """
+    if before is not None:
+        tasks = await list_tasks_active(session, user_id, limit=limit, before=before)
+        return tasks, True
+    tasks = await list_tasks_active(session, user_id, limit=limit + 1, after=after)
+    return tasks[:limit], len(tasks) > limit
 
 
 async def count_tasks_active(session: AsyncSession, user_id: int) -> int:
-    q = select(Task).where(Task.user_id == user_id, Task.is_done.is_(False))
-    res = await session.execute(q)
-    return len(res.scalars().all())
+    """Число активных задач: из user_stats, без строки счётчиков — COUNT."""
+    n = await _stats_value(session, user_id, UserStats.open_count)
+    if n is not None:
+        return n
+    q = select(func.count(Task.id)).where(
+        Task.user_id == user_id, Task.is_done == false()
+    )
+    return (await session.execute(q)).scalar_one()
+
+
+# Счётчики пользователя (models/stats.py)
+class TaskCounters(NamedTuple):
+    open: int
+    overdue: int
+    done_today: int
+    done_week: int
+    done_total: int
+
+
+async def _bump_stats(
+    session: AsyncSession,
+    deltas: dict[int, tuple[int, int]],
+    now: datetime | None = None,
+) -> None:
+    """
+    Прибавляет к user_stats (открыто, закрыто) по пользователям одним
+    upsert в транзакции сессии — счётчики фиксируются вместе с задачами.
+    Закрытые считаются в день и неделю now (UTC, как done_ts); если в
+    строке счётчики прошлого дня/недели, они начинаются заново.
+    """
+    deltas = {uid: d for uid, d in deltas.items() if d != (0, 0)}
+    if not deltas:
+        return
+    day, week = stats_buckets(now or datetime.utcnow())
+    # строки — по возрастанию user_id: пакеты блокируют их в одном порядке
+    stmt = _dialect_insert(session)(UserStats).values(
+        [
+            {
+                "user_id": uid,
+                "open_count": opened,
+                "done_total": closed,
+                "done_today": closed,
+                "done_day": day,
+                "done_week": closed,
+                "week_start": week,
+            }
+            for uid, (opened, closed) in sorted(deltas.items())
+        ]
+    )
+    new = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserStats.user_id],
+        set_={
+            "open_count": UserStats.open_count + new.open_count,
+            "done_total": UserStats.done_total + new.done_total,
+            "done_today": case(
+                (
+                    UserStats.done_day == new.done_day,
+                    UserStats.done_today + new.done_today,
+                ),
+                else_=new.done_today,
+            ),
+            "done_day": new.done_day,
+            "done_week": case(
+                (
+                    UserStats.week_start == new.week_start,
+                    UserStats.done_week + new.done_week,
+                ),
+                else_=new.done_week,
+            ),
+            "week_start": new.week_start,
+        },
+    )
+    await session.execute(stmt)
+
+
+async def _stats_value(session: AsyncSession, user_id: int, col):
+    q = select(col).where(UserStats.user_id == user_id)
+    return (await session.execute(q)).scalar_one_or_none()
+
+
+def _current(row, now: datetime) -> tuple[int, int, int, int]:
+    """(открыто, всего, сегодня, за неделю) строки счётчиков на момент now."""
+    day, week = stats_buckets(now)
+    return (
+        row.open_count,
+        row.done_total,
+        row.done_today if row.done_day == day else 0,
+        row.done_week if row.week_start == week else 0,
+    )
+
+
+async def get_user_stats(session: AsyncSession, user_id: int) -> TaskCounters:
+    """
+    Сводка для /stats: строка user_stats по ключу плюс число просроченных.
+    Просрочка зависит от текущего времени, а не от записей, поэтому её
+    не хранить — это COUNT по индексу (user_id, is_done, deadline_ts),
+    который читает только сами просроченные задачи.
+    Нет строки счётчиков — она считается по задачам и сохраняется.
+    """
+    now = datetime.utcnow()
+    row = (
+        await session.execute(select(UserStats).where(UserStats.user_id == user_id))
+    ).scalar_one_or_none()
+    if row is None:
+        await _store_computed(session, [user_id], now)
+        row = (
+            await session.execute(
+                select(UserStats).where(UserStats.user_id == user_id)
+            )
+        ).scalar_one_or_none()
+    counts = _current(row, now) if row is not None else (0, 0, 0, 0)
+    overdue = (
+        await session.execute(
+            select(func.count()).where(
+                Task.user_id == user_id,
+                Task.is_done == false(),
+                Task.deadline_ts < datetime.now(),  # дедлайны — местное время
+            )
+        )
+    ).scalar_one()
+    opened, total, today, week = counts
+    return TaskCounters(opened, overdue, today, week, total)
+
+
+async def _store_computed(
+    session: AsyncSession, user_ids: list[int], now: datetime
+) -> None:
+    """Пересчитанные по задачам счётчики — поверх строк user_stats."""
+    stmt = _dialect_insert(session)(UserStats).from_select(
+        STATS_COLUMNS,
+        computed_stats(now)
+        .where(User.user_id.in_(user_ids))
+        .order_by(User.user_id),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserStats.user_id],
+        set_={c: getattr(stmt.excluded, c) for c in STATS_COLUMNS[1:]},
+    )
+    await session.execute(stmt)
+
+
+async def reconcile_user_stats(
+    session: AsyncSession, after_user_id: int | None, limit: int
+) -> tuple[int | None, int]:
+    """
+    Сверяет user_stats с задачами для следующих limit пользователей
+    (по user_id после after_user_id) и переписывает расходящиеся строки,
+    создаёт недостающие. Возвращает (последний user_id пачки или None,
+    если пользователи кончились; сколько строк исправлено).
+
+    На Postgres строки счётчиков пачки блокируются до пересчёта:
+    create_task/mark_done этих пользователей ждут коммита сверки, а их
+    задачи, закоммиченные раньше, пересчёт уже видит.
+    """
+    q = select(User.user_id).order_by(User.user_id).limit(limit)
+    if after_user_id is not None:
+        q = q.where(User.user_id > after_user_id)
+    ids = list((await session.execute(q)).scalars().all())
+    if not ids:
+        return None, 0
+    stored = select(UserStats).where(UserStats.user_id.in_(ids))
+    if session.bind.dialect.name == "postgresql":
+        stored = stored.order_by(UserStats.user_id).with_for_update()
+    now = datetime.utcnow()
+    have = {
+        r.user_id: _current(r, now)
+        for r in (await session.execute(stored)).scalars().all()
+    }
+    computed = await session.execute(computed_stats(now).where(User.user_id.in_(ids)))
+    stale = [
+        r.user_id for r in computed.all() if have.get(r.user_id) != _current(r, now)
+    ]
+    if stale:
+        await _store_computed(session, stale, now)
+    return ids[-1], len(stale)
+
+
+_WORD_RE = re.compile(r"\w+")
+_TRGM_MIN = 3  # короче триграммы не сравнить
+
+
+def search_terms(query: str) -> list[str]:
+    """Слова запроса в нижнем регистре — только буквы и цифры, без синтаксиса."""
+    return _WORD_RE.findall(query.lower())
+
+
+async def search_tasks(
+    session: AsyncSession,
+    user_id: int,
+    query: str,
+    limit: int = 10,
+    offset: int = 0,
+) -> tuple[list[Task], bool]:
+    """
+    Поиск по названиям активных задач пользователя, по релевантности.
+    Выполненные не ищутся: часть их уже в tasks_archive без индекса, и
+    выдача не должна зависеть от того, успел ли пройти архиватор.
+    Последнее слово ищется как префикс — короткие и недописанные запросы
+    тоже находят. has_next — по пробной лишней строке.
+
+    Postgres: tsvector-колонка и GIN (user_id, search_tsv); если ничего не
+    нашлось — триграммы (опечатки, обрывки слов) по GIN
+    (user_id, title gin_trgm_ops). SQLite: FTS5-таблица tasks_fts.
+    См. models/search.py.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return [], False
+    base = (
+        select(Task)
+        .options(joinedload(Task.category))
+        .where(Task.user_id == user_id, Task.is_done.is_(False))
+    )
+    if session.bind.dialect.name == "postgresql":
+        tsv = literal_column("tasks.search_tsv")
+        tsq = func.to_tsquery(
+            literal_column(f"'{TS_CONFIG}'::regconfig"),
+            " & ".join(terms[:-1] + [terms[-1] + ":*"]),
+        )
+        q = base.where(tsv.op("@@")(tsq)).order_by(
+            func.ts_rank_cd(tsv, tsq).desc(), Task.id.desc()
+        )
+        tasks = await _fetch(session, q.offset(offset), limit + 1)
+        text = " ".join(terms)
+        if not tasks and len(text) >= _TRGM_MIN:
+            # word_similarity: запрос похож на часть названия
+            q = base.where(Task.title.op("%>")(text))
+            q = q.order_by(func.word_similarity(text, Task.title).desc(), Task.id)
+            tasks = await _fetch(session, q.offset(offset), limit + 1)
+    else:
+        fts = table("tasks_fts", column("rowid"))
+        # у unicode61 нет стемминга — все слова как префиксы («сайт» ~ «сайте»)
+        match = " ".join(f'"{t}"*' for t in terms)
+        q = (
+            base.join(fts, fts.c.rowid == Task.id)
+            .where(literal_column("tasks_fts").op("MATCH")(match))
+            .order_by(func.bm25(literal_column("tasks_fts")), Task.id)
+        )
+        tasks = await _fetch(session, q.offset(offset), limit + 1)
+    return tasks[:limit], len(tasks) > limit
 
 
 async def mark_done(session: AsyncSession, task_id: int, user_id: int):
@@ -79,19 +663,140 @@ async def mark_done(session: AsyncSession, task_id: int, user_id: int):
         task.is_done = True
         task.done_ts = datetime.utcnow()
         await session.flush()
+        await _bump_stats(session, {user_id: (-1, 1)}, task.done_ts)
+        _touch_user_tasks(session, user_id)
+        _after_commit(session, lambda: REMINDERS.cancel(task_id))
         return True
     return False
 
 
+async def mark_done_bulk(
+    session: AsyncSession, pairs: list[tuple[int, int]]
+) -> set[tuple[int, int]]:
+    """
+    Закрывает пачку задач одним UPDATE. pairs — (task_id, user_id);
+    возвращает пары, которые действительно были закрыты.
+    """
+    if not pairs:
+        return set()
+    now = datetime.utcnow()
+    res = await session.execute(
+        update(Task)
+        .where(tuple_(Task.id, Task.user_id).in_(pairs), Task.is_done.is_(False))
+        .values(is_done=True, done_ts=now)
+        .returning(Task.id, Task.user_id)
+        .execution_options(synchronize_session=False)
+    )
+    closed = {(tid, uid) for tid, uid in res.all()}
+    per_user = Counter(uid for _, uid in closed)
+    await _bump_stats(session, {uid: (-n, n) for uid, n in per_user.items()}, now)
+    for tid, uid in closed:
+        _touch_user_tasks(session, uid)
+        _after_commit(session, lambda t=tid: REMINDERS.cancel(t))
+    return closed
+
+
 async def list_tasks_done(
-    session: AsyncSession, user_id: int, limit: int = 10, offset: int = 0
-):
+    session: AsyncSession,
+    user_id: int,
+    limit: int = 10,
+    before: tuple[datetime, int] | None = None,
+) -> list[Task | TaskArchive]:
+    """
+    Выполненные задачи, новые сверху; before — (done_ts, id) последней строки.
+
+    Читает и tasks, и tasks_archive: по limit строк из каждой таблицы
+    (оба запроса — seek по индексу user_id, done_ts, id) и слияние.
+    """
+    found: list[Task | TaskArchive] = []
+    for model in (Task, TaskArchive):
+        q = (
+            select(model)
+            .options(joinedload(model.category))
+            .where(model.user_id == user_id)
+            .order_by(model.done_ts.desc(), model.id.desc())
+        )
+        if model is Task:
+            q = q.where(Task.is_done == true())
+        if before is not None:
+            q = q.where(tuple_(model.done_ts, model.id) < before)
+        found += await _fetch(session, q, limit)
+    found.sort(key=lambda t: (t.done_ts, t.id), reverse=True)
+    return found[:limit]
+
+
+_ARCHIVE_COLUMNS = (
+    "id",
+    "user_id",
+    "category_id",
+    "title",
+    "deadline_ts",
+    "created_ts",
+    "done_ts",
+)
+
+
+async def archive_done_batch(
+    session: AsyncSession, cutoff: datetime, limit: int
+) -> int:
+    """
+    Переносит до limit выполненных задач с done_ts < cutoff из tasks в
+    tasks_archive: INSERT … SELECT и DELETE по одному списку id в
+    транзакции сессии. На Postgres кандидаты берутся с SKIP LOCKED —
+    параллельный архиватор или mark_done не ждут друг друга.
+    Возвращает число перенесённых строк.
+    """
     q = (
-        select(Task)
-        .where(Task.user_id == user_id, Task.is_done.is_(True))
-        .order_by(Task.done_ts.desc())
+        select(Task.id)
+        .where(Task.is_done == true(), Task.done_ts < cutoff)
+        .order_by(Task.done_ts)
         .limit(limit)
-        .offset(offset)
     )
-    res = await session.execute(q)
-    return list(res.scalars().all())
+    if session.bind.dialect.name == "postgresql":
+        q = q.with_for_update(skip_locked=True)
+    ids = list((await session.execute(q)).scalars().all())
+    if not ids:
+        return 0
+    moved = select(
+        *(getattr(Task, c) for c in _ARCHIVE_COLUMNS), literal(datetime.utcnow())
+    ).where(Task.id.in_(ids))
+    await session.execute(
+        insert(TaskArchive).from_select([*_ARCHIVE_COLUMNS, "archived_ts"], moved)
+    )
+    await session.execute(
+        delete(Task)
+        .where(Task.id.in_(ids))
+        .execution_options(synchronize_session=False)
+    )
+    return len(ids)
+
+
+async def iter_user_tasks(
+    session: AsyncSession, user_id: int, batch: int = 500
+) -> AsyncIterator[list[Row]]:
+    """
+    Все задачи пользователя (архив, затем tasks) пачками по batch
+    строк через серверный курсор — для выгрузки без загрузки истории
+    в память. Строки: id, category, title, deadline_ts, is_done,
+    created_ts, done_ts.
+    """
+    for model in (TaskArchive, Task):
+        is_done = literal(True) if model is TaskArchive else Task.is_done
+        q = (
+            select(
+                model.id,
+                Category.name.label("category"),
+                model.title,
+                model.deadline_ts,
+                is_done.label("is_done"),
+                model.created_ts,
+                model.done_ts,
+            )
+            .outerjoin(Category, model.category_id == Category.id)
+            .where(model.user_id == user_id)
+            .order_by(model.created_ts, model.id)
+            .execution_options(yield_per=batch)
+        )
+        result = await session.stream(q)
+        async for part in result.partitions():
+            yield part
@@ -0,0 +1,72 @@
+# app/storage/user_lock.py
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from sqlalchemy import text
+
+from models.db import get_engine
+
+_LOCK = text("SELECT pg_advisory_xact_lock(:ns, :key)")
+_LOCK_NS = 0x7A5D  # пространство ключей (int4, int4) — своё, не как у миграций
+
+
+class UserLocks:
+    """
+    Очередь апдейтов одного пользователя между процессами.
+
+    Внутри процесса порядок держит ShardedUpdatePool, но при BOT_WORKERS > 1
+    SO_REUSEPORT отдаёт соединения Telegram любому воркеру, и два быстрых
+    нажатия одного пользователя выполняются параллельно в разных
+    процессах. hold(user_id) берёт транзакционный advisory-lock Postgres
+    по пользователю на отдельном соединении и держит его до конца блока
+    (закрытие задачи и правка списка) — замок снимается вместе с
+    транзакцией, даже если процесс упал.
+
+    Одновременно замков не больше slots: каждый держит соединение пула,
+    а обработчику внутри блока нужны свои. slots должен быть меньше
+    pool_size движка (5 по умолчанию). Выключен (enabled=False, один
+    процесс) или не Postgres — hold() ничего не делает.
+    """
+
+    def __init__(self, slots: int = 4):
+        self.enabled = False
+        self.slots = max(1, slots)
+        self._sem: asyncio.Semaphore | None = None
+        self.held = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @asynccontextmanager
+    async def hold(self, user_id: int) -> AsyncIterator[None]:
+        engine = get_engine()
+        if not self.enabled or engine.dialect.name != "postgresql":
+            yield
+            return
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.slots)
+        started = time.monotonic()
+        async with self._sem, engine.connect() as conn:
+            # ключ — int4: совпадение двух пользователей лишь выстроит их в очередь
+            await conn.execute(_LOCK, {"ns": _LOCK_NS, "key": user_id % 2**31})
+            waited = time.monotonic() - started
+            self.held += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            yield
+        # выход из connect() откатывает транзакцию и снимает замок
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "held": self.held,
+            "wait_avg_ms": round(self.wait_total / self.held * 1000, 2)
+            if self.held
+            else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 2),
+        }
+
+
+USER_LOCKS = UserLocks()
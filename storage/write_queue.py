@@ -0,0 +1,213 @@
+# app/storage/write_queue.py
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+from typing import Any, NamedTuple
+
+from config import LOGGER, WRITE_QUEUE_MAX_BATCH, WRITE_QUEUE_WINDOW_MS
+from models.db import get_sessionmaker
+from storage.repo import (
+    create_tasks_bulk,
+    ensure_users_bulk,
+    mark_done_bulk,
+    resolve_system_categories,
+)
+
+
+class _CreateOp(NamedTuple):
+    user_id: int
+    username: str | None
+    title: str
+    category: str | None  # имя системной категории
+    deadline: datetime | None
+    future: asyncio.Future
+
+
+class _DoneOp(NamedTuple):
+    task_id: int
+    user_id: int
+    future: asyncio.Future
+
+
+_STOP = object()  # метка в очереди: дописать собранное и выйти
+
+
+class WriteQueue:
+    """
+    Групповой коммит для создания и закрытия задач.
+
+    Обработчики ставят операцию в очередь и ждут свой future. Фоновая
+    задача собирает операции за window секунд (но не больше max_batch)
+    и пишет их одной транзакцией: один INSERT пользователей
+    (ON CONFLICT DO NOTHING), один INSERT задач и один UPDATE на все
+    закрытия. Если пачка падает целиком, операции повторяются по одной,
+    чтобы ошибка одной строки не задела соседей.
+    """
+
+    def __init__(self, window: float = 0.01, max_batch: int = 200):
+        self.window = max(0.0, window)
+        self.max_batch = max(1, max_batch)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker: asyncio.Task | None = None
+        self.batches = 0
+        self.ops = 0
+        self.fallbacks = 0
+
+    # ---------- public ----------
+    async def create_task(
+        self,
+        user_id: int,
+        username: str | None,
+        title: str,
+        category: str | None,
+        deadline: datetime | None,
+    ) -> int:
+        """Создаёт задачу; возвращает её id после коммита пачки."""
+        fut = asyncio.get_running_loop().create_future()
+        self._submit(_CreateOp(user_id, username, title, category, deadline, fut))
+        return await fut
+
+    async def mark_done(self, task_id: int, user_id: int) -> bool:
+        fut = asyncio.get_running_loop().create_future()
+        self._submit(_DoneOp(task_id, user_id, fut))
+        return await fut
+
+    async def stop(self) -> None:
+        """Дописывает всё, что уже в очереди, и останавливает воркер."""
+        if self._worker is None:
+            return
+        # не отменяем воркер: отмена посреди _write откатила бы пачку, и
+        # её future никогда бы не разрешились
+        if not self._worker.done():
+            self._queue.put_nowait(_STOP)
+            await self._worker
+        self._worker = None
+        # поставленное, пока воркер дописывал последнюю пачку
+        batch = []
+        while not self._queue.empty():
+            op = self._queue.get_nowait()
+            if op is not _STOP:
+                batch.append(op)
+        if batch:
+            await self._flush(batch)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "ops": self.ops,
+            "avg_batch": round(self.ops / self.batches, 2) if self.batches else 0.0,
+            "fallbacks": self.fallbacks,
+        }
+
+    # ---------- worker ----------
+    def _submit(self, op) -> None:
+        self._queue.put_nowait(op)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            op = await self._queue.get()
+            if op is _STOP:
+                return
+            batch = [op]
+            stop = False
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    op = self._queue.get_nowait()
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        op = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if op is _STOP:
+                    stop = True
+                    break
+                batch.append(op)
+            await self._flush(batch)
+            if stop:
+                return
+
+    async def _flush(self, batch: list) -> None:
+        self.batches += 1
+        self.ops += len(batch)
+        try:
+            results = await self._write(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                _resolve(batch[0].future, exc=e)
+                return
+            LOGGER.warning("Write batch of %d failed, retrying singly", len(batch))
+            self.fallbacks += 1
+            for op in batch:
+                try:
+                    results = await self._write([op])
+                except Exception as op_exc:
+                    _resolve(op.future, exc=op_exc)
+                else:
+                    _resolve(op.future, results[0])
+            return
+        for op, result in zip(batch, results):
+            _resolve(op.future, result)
+
+    async def _write(self, batch: list) -> list:
+        creates = [op for op in batch if isinstance(op, _CreateOp)]
+        dones = [op for op in batch if isinstance(op, _DoneOp)]
+
+        Session = get_sessionmaker()
+        async with Session() as session:
+            await ensure_users_bulk(
+                session, {op.user_id: op.username for op in creates}
+            )
+            cat_ids = await resolve_system_categories(
+                session, {op.category for op in creates if op.category}
+            )
+            task_ids = await create_tasks_bulk(
+                session,
+                [
+                    {
+                        "user_id": op.user_id,
+                        "title": op.title,
+                        "category_id": cat_ids.get(op.category),
+                        "deadline_ts": op.deadline,
+                    }
+                    for op in creates
+                ],
+            )
+            closed = await mark_done_bulk(
+                session, [(op.task_id, op.user_id) for op in dones]
+            )
+            await session.commit()
+
+        created = dict(zip((id(op) for op in creates), task_ids))
+        results = []
+        for op in batch:
+            if isinstance(op, _CreateOp):
+                results.append(created[id(op)])
+            else:
+                # повторное нажатие в той же пачке — как при уже закрытой задаче
+                pair = (op.task_id, op.user_id)
+                results.append(pair in closed)
+                closed.discard(pair)
+        return results
+
+
+def _resolve(fut: asyncio.Future, result=None, exc: BaseException | None = None):
+    if fut.done():  # вызывающий мог уже отменить ожидание
+        return
+    if exc is not None:
+        fut.set_exception(exc)
+    else:
+        fut.set_result(result)
+
+
+WRITE_QUEUE = WriteQueue(
+    window=WRITE_QUEUE_WINDOW_MS / 1000, max_batch=WRITE_QUEUE_MAX_BATCH
+)
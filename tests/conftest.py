@@ -0,0 +1,63 @@
+# tests/conftest.py
+import asyncio
+import os
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from models.db import Base
+from models.migrations import migrate, schema_version
+from storage.cache import CATEGORY_CACHE, KNOWN_USERS, PAGE_CACHE
+
+# Postgres для тестов, которые гоняются на обоих диалектах; база
+# пересоздаётся с нуля — только отдельная тестовая!
+TEST_PG_DSN = os.getenv("TEST_PG_DSN")
+
+
+def _runner(url: str, fresh: bool = False):
+    def run(body):
+        async def main():
+            engine = create_async_engine(url)
+            try:
+                if fresh:
+                    async with engine.begin() as conn:
+                        await conn.run_sync(Base.metadata.drop_all)
+                        await conn.run_sync(schema_version.drop, checkfirst=True)
+                await migrate(engine)
+                return await body(engine)
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture(autouse=True)
+def _fresh_caches():
+    # кэши процесса помнят строки прошлой базы: «известный» пользователь
+    # не попал бы в users новой
+    KNOWN_USERS._users.clear()
+    CATEGORY_CACHE.system.clear()
+    CATEGORY_CACHE._users.clear()
+    PAGE_CACHE._data.clear()
+    yield
+
+
+@pytest.fixture
+def run_db(tmp_path):
+    """
+    run_db(body) — выполняет async body(engine) на свежей SQLite-базе,
+    приведённой к последней схеме; engine закрывается после теста.
+    """
+    return _runner(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def run_any_db(request, tmp_path):
+    """Как run_db, но ещё и на Postgres из TEST_PG_DSN (без него — skip)."""
+    if request.param == "sqlite":
+        return _runner(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    if not TEST_PG_DSN:
+        pytest.skip("TEST_PG_DSN не задан")
+    return _runner(TEST_PG_DSN, fresh=True)
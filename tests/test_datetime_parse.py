@@ -0,0 +1,34 @@
+# tests/test_datetime_parse.py
+import re
+from datetime import datetime
+
+import pytest
+
+from utils.datetime_parse import (
+    FORMAT_HINT,
+    OUT_OF_RANGE,
+    parse_deadline,
+    parse_deadlines,
+)
+
+NOW = datetime(2025, 3, 1, 12, 0)
+
+
+@pytest.mark.parametrize(
+    "text", ["+1000000000d", "+99999999d", "через 999999999 дней", "+1d +999999999d"]
+)
+def test_out_of_range_is_value_error(text):
+    with pytest.raises(ValueError, match=OUT_OF_RANGE):
+        parse_deadline(text, now=NOW)
+
+
+def test_out_of_range_does_not_abort_batch():
+    out = parse_deadlines(["+1000000000d", "завтра 10:00"], now=NOW)
+    assert isinstance(out[0], ValueError)
+    assert out[1] == datetime(2025, 3, 2, 10, 0)
+
+
+def test_year_zero_is_rejected():
+    # год 0 — ошибка, а не «год не указан»
+    with pytest.raises(ValueError, match=re.escape(FORMAT_HINT)):
+        parse_deadline("0000-01-01", now=NOW)
@@ -0,0 +1,63 @@
+# tests/test_fsm.py
+from aiogram.fsm.storage.base import StorageKey
+from sqlalchemy import func, select
+
+from models.fsm import FsmRecord
+from storage.fsm import SQLAlchemyStorage
+
+
+def _key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+
+
+async def _rows(engine) -> int:
+    async with engine.connect() as conn:
+        res = await conn.execute(select(func.count()).select_from(FsmRecord))
+        return res.scalar()
+
+
+def test_write_behind_collapses_steps(run_db):
+    async def body(engine):
+        storage = SQLAlchemyStorage(engine, flush_interval=60)
+        await storage.set_state(_key(1), "Add:title")
+        await storage.set_data(_key(1), {"title": "x"})
+        await storage.set_state(_key(1), "Add:deadline")
+        assert await _rows(engine) == 0  # пока только в памяти
+        await storage.close()
+        assert storage.stats()["db_writes"] == 1
+
+        reopened = SQLAlchemyStorage(engine)
+        assert await reopened.get_state(_key(1)) == "Add:deadline"
+        assert await reopened.get_data(_key(1)) == {"title": "x"}
+        await reopened.close()
+
+    run_db(body)
+
+
+def test_full_cache_of_dirty_entries_flushes_before_evicting(run_db):
+    async def body(engine):
+        storage = SQLAlchemyStorage(engine, flush_interval=60, cache_size=2)
+        for uid in (1, 2):
+            await storage.set_state(_key(uid), f"s{uid}")
+        # третий ключ не влезает, а вытеснять грязные нельзя — досрочный сброс
+        assert await storage.get_state(_key(3)) is None
+        assert await _rows(engine) == 2
+        assert storage.stats()["cached"] <= 2 and storage.stats()["dirty"] == 0
+
+        # вытесненный ключ читается из БД, а не теряется
+        assert await storage.get_state(_key(1)) == "s1"
+        await storage.close()
+
+    run_db(body)
+
+
+def test_cleared_state_deletes_row(run_db):
+    async def body(engine):
+        storage = SQLAlchemyStorage(engine, flush_interval=0)
+        await storage.set_state(_key(1), "Add:title")
+        assert await _rows(engine) == 1
+        await storage.set_state(_key(1), None)
+        assert await _rows(engine) == 0
+        await storage.close()
+
+    run_db(body)
@@ -0,0 +1,102 @@
+# tests/test_migrations.py
+import asyncio
+
+from sqlalchemy import insert, inspect, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from models.migrations import LATEST, migrate, schema_version
+from models.stats import UserStats
+from models.task import Task
+from storage.repo import list_tasks_active, search_tasks
+
+# Схема, которую создавал create_all до появления миграций: без
+# schema_version, частичных индексов, поиска, счётчиков и AUTOINCREMENT
+BASELINE = [
+    "CREATE TABLE users (user_id BIGINT NOT NULL, username VARCHAR(255), "
+    "PRIMARY KEY (user_id))",
+    "CREATE TABLE categories (id INTEGER NOT NULL, name VARCHAR(64) NOT NULL, "
+    "user_id BIGINT, PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users "
+    "(user_id))",
+    "CREATE INDEX ix_categories_name ON categories (name)",
+    "CREATE UNIQUE INDEX uq_cat_user_name ON categories (user_id, name)",
+    "CREATE TABLE tasks (id INTEGER NOT NULL, user_id BIGINT NOT NULL, "
+    "category_id INTEGER, title TEXT NOT NULL, deadline_ts DATETIME, "
+    "is_done BOOLEAN NOT NULL, created_ts DATETIME NOT NULL, done_ts DATETIME, "
+    "PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (user_id), "
+    "FOREIGN KEY(category_id) REFERENCES categories (id))",
+    "CREATE INDEX ix_tasks_user_id ON tasks (user_id)",
+    "CREATE INDEX ix_tasks_is_done ON tasks (is_done)",
+    "CREATE INDEX ix_tasks_created_ts ON tasks (created_ts)",
+    "CREATE INDEX idx_tasks_user_done_deadline ON tasks (user_id, is_done, "
+    "deadline_ts)",
+    "INSERT INTO users (user_id, username) VALUES (1, 'u')",
+    "INSERT INTO tasks (id, user_id, title, deadline_ts, is_done, created_ts, "
+    "done_ts) VALUES "
+    "(1, 1, 'купить молоко', '2025-03-02 10:00:00', 0, '2025-03-01 12:00:00', NULL), "
+    "(2, 1, 'позвонить', NULL, 0, '2025-03-01 12:01:00', NULL), "
+    "(3, 1, 'отчёт', NULL, 1, '2025-03-01 12:02:00', '2025-03-01 13:00:00')",
+]
+
+
+def _run(tmp_path, body):
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'old.db'}")
+        try:
+            async with engine.begin() as conn:
+                for statement in BASELINE:
+                    await conn.exec_driver_sql(statement)
+            return await body(engine)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def test_baseline_db_migrates_to_latest(tmp_path):
+    async def body(engine):
+        assert await migrate(engine) == (0, LATEST)
+        assert await migrate(engine) == (LATEST, LATEST)  # повторно — ничего
+
+        async with engine.connect() as conn:
+            version = await conn.execute(select(schema_version.c.version))
+            assert version.scalar() == LATEST
+            indexes = await conn.run_sync(
+                lambda c: {i["name"] for i in inspect(c).get_indexes("tasks")}
+            )
+            partial = await conn.exec_driver_sql(
+                "SELECT name, sql FROM sqlite_master WHERE name LIKE 'idx_tasks_%'"
+            )
+            partial = dict(partial.all())
+        assert {
+            "idx_tasks_active_seek",
+            "idx_tasks_active_deadline",
+            "idx_tasks_done_seek",
+            "idx_tasks_done_ts",
+        } <= indexes
+        assert "ix_tasks_is_done" not in indexes
+        # условие — ровно как в запросах, иначе SQLite индекс не возьмёт
+        assert "is_done = 0" in partial["idx_tasks_active_seek"]
+        assert "is_done = 1" in partial["idx_tasks_done_ts"]
+
+        async with async_sessionmaker(engine)() as session:
+            assert [t.id for t in await list_tasks_active(session, 1)] == [1, 2]
+            found, _ = await search_tasks(session, 1, "молоко")
+            assert [t.id for t in found] == [1]
+            stats = await session.get(UserStats, 1)
+            assert (stats.open_count, stats.done_total) == (2, 1)
+
+    _run(tmp_path, body)
+
+
+def test_task_ids_are_not_reused_after_migration(tmp_path):
+    async def body(engine):
+        await migrate(engine)
+        async with engine.begin() as conn:
+            await conn.exec_driver_sql("DELETE FROM tasks WHERE id = 3")
+            res = await conn.execute(
+                insert(Task).returning(Task.id),
+                [{"user_id": 1, "title": "new", "is_done": False}],
+            )
+            assert res.scalar() == 4
+
+    _run(tmp_path, body)
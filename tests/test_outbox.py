@@ -0,0 +1,50 @@
+# tests/test_outbox.py
+import asyncio
+import time
+
+from aiogram.methods import SendMessage
+
+from services.outbox import OutboundQueue
+
+
+async def _send_all(outbox: OutboundQueue, chats: list[int], timeout: float) -> list:
+    sent = []
+
+    async def make_request(bot, method):
+        sent.append((method.chat_id, time.monotonic()))
+        return True
+
+    calls = [
+        outbox(make_request, None, SendMessage(chat_id=c, text="x")) for c in chats
+    ]
+    try:
+        await asyncio.wait_for(asyncio.gather(*calls), timeout)
+    finally:
+        await outbox.stop(timeout=0)
+    return sent
+
+
+def test_rate_below_one_still_sends():
+    # SEND_RATE / BOT_WORKERS < 1: бакет всё равно копит целый токен
+    outbox = OutboundQueue(rate=0.5, chat_rate=10)
+    sent = asyncio.run(_send_all(outbox, [1], timeout=1.0))
+    assert len(sent) == 1
+
+
+def test_zero_rates_mean_no_limit():
+    outbox = OutboundQueue(rate=0, chat_rate=0, chat_burst=1)
+    sent = asyncio.run(_send_all(outbox, [1] * 20 + [2] * 20, timeout=1.0))
+    assert len(sent) == 40
+    outbox._gc(time.monotonic() + 120)  # без деления на chat_rate
+    assert outbox.stats()["chats"] == 0
+
+
+def test_chat_rate_spaces_messages_to_one_chat():
+    outbox = OutboundQueue(rate=100, chat_rate=20, chat_burst=1)
+    sent = asyncio.run(_send_all(outbox, [1, 1, 1, 2], timeout=2.0))
+    times = [t for chat, t in sent if chat == 1]
+    assert len(times) == 3
+    # после всплеска в 1 сообщение — не чаще chat_rate в секунду
+    assert times[2] - times[0] >= 2 / 20 * 0.9
+    # соседний чат не ждёт очереди первого
+    assert [chat for chat, _ in sent].index(2) < 2
@@ -0,0 +1,54 @@
+# tests/test_page_cache.py
+import asyncio
+
+from storage.cache import PageCache
+
+
+def test_bump_invalidates_only_that_user():
+    cache = PageCache(maxsize=10, ttl=60)
+    cache.put(1, "p0", "a", cache.version(1))
+    cache.put(2, "p0", "b", cache.version(2))
+    cache.bump(1)
+    assert cache.get(1, "p0") is None
+    assert cache.get(2, "p0") == "b"
+
+
+def test_evicted_version_never_matches_again():
+    cache = PageCache(maxsize=2, ttl=60)
+    stale = cache.version(1)
+    cache.put(1, "p0", "old", stale)
+    cache.bump(1)
+    cache.bump(2)
+    cache.bump(3)  # версия пользователя 1 вытеснена — вместо неё «пол»
+    assert cache.version(1) > stale
+    cache.put(1, "p0", "old", stale)
+    assert cache.get(1, "p0") is None
+
+
+def test_bump_during_load_is_not_cached():
+    cache = PageCache(maxsize=10, ttl=60)
+
+    async def main():
+        async def load():
+            cache.bump(1)  # задачу изменили, пока страница рисовалась
+            return "stale"
+
+        await cache.get_or_load(1, "p0", load)
+        return await cache.get_or_load(1, "p0", lambda: asyncio.sleep(0, "fresh"))
+
+    assert asyncio.run(main()) == "fresh"
+
+
+def test_ttl_zero_never_hits():
+    cache = PageCache(maxsize=10, ttl=0)
+    cache.put(1, "p0", "a", cache.version(1))
+    assert cache.get(1, "p0") is None
+    assert cache.stats()["hits"] == 0
+
+
+def test_size_is_bounded():
+    cache = PageCache(maxsize=3, ttl=60)
+    for i in range(5):
+        cache.put(1, i, i, cache.version(1))
+    assert cache.get(1, 0) is None and cache.get(1, 4) == 4
+    assert cache.stats()["size"] == 3 and cache.stats()["evictions"] == 2
@@ -0,0 +1,86 @@
+# tests/test_pagination.py
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from models.task import Task, User
+from storage.repo import (
+    TaskKey,
+    decode_cursor,
+    encode_cursor,
+    list_active_page,
+    list_tasks_active,
+)
+
+NOW = datetime(2025, 3, 1, 12, 0)
+
+
+@pytest.mark.parametrize(
+    "key",
+    [
+        TaskKey(NOW, NOW, 1),
+        TaskKey(None, NOW + timedelta(microseconds=7), 123456789),
+        TaskKey(datetime(1969, 12, 31, 23, 59, 59, 1), NOW, 0),
+        TaskKey(datetime(9999, 12, 31, 23, 59), datetime(1970, 1, 1), 2**40),
+    ],
+)
+def test_cursor_round_trip(key):
+    token = encode_cursor(key)
+    assert decode_cursor(token) == key
+    # page:{номер}:{n|p}:{ключ} должен влезать в callback_data
+    assert len(f"page:999:n:{token}".encode()) <= 64
+
+
+def test_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+async def _seed(engine) -> None:
+    # дедлайны с повторами и задачи без дедлайна — обе ветки ключа и стык
+    async with engine.begin() as conn:
+        await conn.execute(insert(User).values(user_id=1))
+        await conn.execute(
+            insert(Task),
+            [
+                {
+                    "user_id": 1,
+                    "title": f"t{i}",
+                    "is_done": i % 5 == 0,
+                    "deadline_ts": NOW + timedelta(hours=i % 4) if i % 3 else None,
+                    "created_ts": NOW + timedelta(minutes=i // 2),
+                }
+                for i in range(23)
+            ],
+        )
+
+
+def test_pages_cover_list_forward_and_back(run_db):
+    async def body(engine):
+        await _seed(engine)
+        async with async_sessionmaker(engine)() as session:
+            everything = await list_tasks_active(session, 1, limit=100)
+            keys = {t.id: TaskKey.of(t) for t in everything}
+            # с дедлайном по возрастанию, затем без него — по (created_ts, id)
+            assert list(keys.values()) == sorted(
+                keys.values(),
+                key=lambda k: (k.deadline_ts is None, k.deadline_ts or NOW, k[1:]),
+            )
+
+            pages, after, has_next = [], None, True
+            while has_next:
+                tasks, has_next = await list_active_page(session, 1, 5, after=after)
+                pages.append([t.id for t in tasks])
+                after = decode_cursor(encode_cursor(TaskKey.of(tasks[-1])))
+            assert [i for page in pages for i in page] == [t.id for t in everything]
+            assert all(len(page) == 5 for page in pages[:-1])
+
+            # назад от первой строки каждой страницы — ровно предыдущая
+            for prev, page in zip(pages, pages[1:]):
+                before = decode_cursor(encode_cursor(keys[page[0]]))
+                back, has_next = await list_active_page(session, 1, 5, before=before)
+                assert [t.id for t in back] == prev and has_next
+
+    run_db(body)
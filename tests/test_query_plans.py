@@ -0,0 +1,153 @@
+# tests/test_query_plans.py
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from models.task import Task, User
+from services.reminders import ReminderScheduler
+from storage.repo import (
+    TaskKey,
+    archive_done_batch,
+    get_user_stats,
+    list_active_page,
+    list_tasks_active,
+    list_tasks_done,
+)
+
+NOW = datetime(2025, 3, 1, 12, 0)
+_TASKS = re.compile(r"FROM tasks\b")
+_PG_SORT = re.compile(r"\bSort\b(?! Key)")
+
+
+async def _seed(engine):
+    async with engine.begin() as conn:
+        await conn.execute(insert(User).values(user_id=1))
+        await conn.execute(
+            insert(Task),
+            [
+                {
+                    "user_id": 1,
+                    "title": f"t{i}",
+                    "is_done": i % 3 == 0,
+                    "deadline_ts": NOW + timedelta(hours=i) if i % 2 else None,
+                    "created_ts": NOW + timedelta(minutes=i),
+                    "done_ts": NOW if i % 3 == 0 else None,
+                }
+                for i in range(30)
+            ],
+        )
+
+
+async def _plans(engine, call) -> list[str]:
+    """План каждого SELECT по tasks, выполненного в call(session)."""
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith("SELECT") and _TASKS.search(statement):
+            seen.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        async with async_sessionmaker(engine)() as session:
+            await call(session)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+    pg = engine.dialect.name == "postgresql"
+    plans = []
+    async with engine.connect() as conn:
+        if pg:
+            # на паре десятков строк Postgres и так прочтёт таблицу целиком;
+            # проверяем, что индекс подходит к запросу
+            await conn.exec_driver_sql("SET enable_seqscan = off")
+        for statement, parameters in seen:
+            explain = "EXPLAIN " if pg else "EXPLAIN QUERY PLAN "
+            rows = await conn.exec_driver_sql(explain + statement, parameters)
+            plans.append(" / ".join(r[-1] for r in rows))
+    assert plans, "call() не выполнил ни одного запроса по tasks"
+    return plans
+
+
+def _assert_index(plans: list[str], *indexes: str) -> None:
+    for plan in plans:
+        assert any(index in plan for index in indexes), plan
+        # сортировка поверх индекса — страница снова стоит как весь набор
+        assert "TEMP B-TREE" not in plan, plan
+        assert not _PG_SORT.search(plan), plan
+
+
+def test_active_pages_seek_partial_index(run_any_db):
+    async def body(engine):
+        await _seed(engine)
+        key = TaskKey(NOW + timedelta(hours=5), NOW + timedelta(minutes=5), 5)
+        undated = TaskKey(None, NOW + timedelta(minutes=4), 4)
+        for kwargs in ({}, {"after": key}, {"after": undated}, {"before": key}):
+            plans = await _plans(
+                engine, lambda s: list_tasks_active(s, 1, limit=5, **kwargs)
+            )
+            _assert_index(plans, "idx_tasks_active_seek")
+
+    run_any_db(body)
+
+
+def test_done_pages_seek_partial_index(run_any_db):
+    async def body(engine):
+        await _seed(engine)
+        plans = await _plans(
+            engine, lambda s: list_tasks_done(s, 1, limit=5, before=(NOW, 10))
+        )
+        _assert_index(plans, "idx_tasks_done_seek")
+
+    run_any_db(body)
+
+
+def test_reminder_window_uses_partial_index(run_any_db):
+    async def body(engine):
+        await _seed(engine)
+        q = ReminderScheduler._window_query(NOW, NOW + timedelta(hours=10))
+        plans = await _plans(engine, lambda s: s.execute(q.limit(100)))
+        _assert_index(plans, "idx_tasks_active_deadline")
+
+    run_any_db(body)
+
+
+def test_active_page_is_one_statement(run_any_db):
+    async def body(engine):
+        await _seed(engine)
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", record)
+        try:
+            async with async_sessionmaker(engine)() as session:
+                key = TaskKey(NOW + timedelta(hours=5), NOW + timedelta(minutes=5), 5)
+                tasks, has_next = await list_active_page(session, 1, 3, after=key)
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", record)
+        assert [t.id for t in tasks] == [6, 8, 12] and has_next
+        assert len(statements) == 1, statements
+
+    run_any_db(body)
+
+
+def test_overdue_count_uses_index(run_any_db):
+    async def body(engine):
+        await _seed(engine)
+        plans = await _plans(engine, lambda s: get_user_stats(s, 1))
+        _assert_index(plans, "idx_tasks_user_done_deadline", "idx_tasks_active_seek")
+
+    run_any_db(body)
+
+
+def test_archive_candidates_use_partial_index(run_any_db):
+    async def body(engine):
+        await _seed(engine)
+        plans = await _plans(
+            engine, lambda s: archive_done_batch(s, NOW + timedelta(days=1), 10)
+        )
+        _assert_index(plans, "idx_tasks_done_ts")
+
+    run_any_db(body)
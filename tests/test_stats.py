@@ -0,0 +1,66 @@
+# tests/test_stats.py
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from models.stats import UserStats
+from storage.repo import (
+    TaskCounters,
+    create_task,
+    ensure_user,
+    get_user_stats,
+    mark_done,
+    reconcile_user_stats,
+)
+
+USER = 1
+
+
+async def _three_tasks_one_done(Session) -> None:
+    async with Session() as session:
+        await ensure_user(session, USER, "u")
+        past = datetime.now() - timedelta(days=1)
+        tasks = [
+            await create_task(session, USER, f"t{i}", None, past if i else None)
+            for i in range(3)
+        ]
+        await session.commit()
+        assert await mark_done(session, tasks[2].id, USER)
+        assert not await mark_done(session, tasks[2].id, USER)
+        await session.commit()
+
+
+def test_counters_follow_tasks(run_db):
+    async def body(engine):
+        Session = async_sessionmaker(engine, expire_on_commit=False)
+        await _three_tasks_one_done(Session)
+        async with Session() as session:
+            stats = await get_user_stats(session, USER)
+        # открыто 2, из них просрочена 1; закрыта 1 — сегодня
+        assert stats == TaskCounters(
+            open=2, overdue=1, done_today=1, done_week=1, done_total=1
+        )
+
+    run_db(body)
+
+
+def test_reconcile_repairs_drift(run_db):
+    async def body(engine):
+        Session = async_sessionmaker(engine, expire_on_commit=False)
+        await _three_tasks_one_done(Session)
+        async with Session() as session:
+            await session.execute(
+                update(UserStats).values(open_count=40, done_total=0)
+            )
+            await session.commit()
+
+            last, fixed = await reconcile_user_stats(session, None, limit=10)
+            await session.commit()
+            assert (last, fixed) == (USER, 1)
+            assert await reconcile_user_stats(session, USER, limit=10) == (None, 0)
+
+            stats = await get_user_stats(session, USER)
+        assert (stats.open, stats.done_total) == (2, 1)
+
+    run_db(body)
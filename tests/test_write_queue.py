@@ -0,0 +1,80 @@
+# tests/test_write_queue.py
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from models.task import Task
+from storage import write_queue
+from storage.write_queue import WriteQueue
+
+USER = 1
+
+
+@pytest.fixture
+def run_queue(run_db, monkeypatch):
+    """run_queue(body) — body(engine, queue) с очередью поверх тестовой базы."""
+
+    def run(body, **kwargs):
+        async def main(engine):
+            Session = async_sessionmaker(engine, expire_on_commit=False)
+            monkeypatch.setattr(write_queue, "get_sessionmaker", lambda: Session)
+            queue = WriteQueue(**kwargs)
+            try:
+                return await body(engine, queue)
+            finally:
+                await queue.stop()
+
+        return run_db(main)
+
+    return run
+
+
+def test_concurrent_ops_share_one_commit(run_queue):
+    async def body(engine, queue):
+        ids = await asyncio.gather(
+            *(queue.create_task(USER, "u", f"t{i}", None, None) for i in range(10))
+        )
+        assert len(set(ids)) == 10
+        assert queue.stats()["batches"] == 1
+
+        # повторное нажатие в той же пачке закрывает задачу один раз
+        done = await asyncio.gather(
+            queue.mark_done(ids[0], USER), queue.mark_done(ids[0], USER)
+        )
+        assert sorted(done) == [False, True]
+        async with engine.connect() as conn:
+            closed = await conn.execute(select(Task.id).where(Task.is_done))
+            assert closed.scalars().all() == [ids[0]]
+
+    run_queue(body, window=0.05)
+
+
+def test_bad_op_fails_alone(run_queue):
+    async def body(engine, queue):
+        results = await asyncio.gather(
+            queue.create_task(USER + 1, "u", "ok", None, None),
+            queue.create_task(USER + 1, "u", None, None, None),  # title NOT NULL
+            queue.create_task(USER + 1, "u", "ok too", None, None),
+            return_exceptions=True,
+        )
+        assert isinstance(results[1], Exception)
+        assert all(isinstance(r, int) for r in (results[0], results[2]))
+        assert queue.stats()["fallbacks"] == 1
+
+    run_queue(body, window=0.05)
+
+
+def test_stop_writes_everything_queued(run_queue):
+    async def body(engine, queue):
+        pending = [
+            asyncio.create_task(queue.create_task(USER + 2, "u", f"t{i}", None, None))
+            for i in range(5)
+        ]
+        await asyncio.sleep(0)  # операции в очереди, пачка ещё собирается
+        await queue.stop()
+        assert all(t.done() for t in pending)
+        assert len({t.result() for t in pending}) == 5
+
+    run_queue(body, window=10)
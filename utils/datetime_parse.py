@@ -2,36 +2,254 @@
 from __future__ import annotations
 
 import re
+import time
 from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Callable, Iterable, Sequence
 
 FMT_DATE = "%Y-%m-%d"
 FMT_DATETIME = "%Y-%m-%d %H:%M"
 
+DEFAULT_TIME = (18, 0)  # дедлайн без времени — к 18:00
+NO_DEADLINE = frozenset({"-", "нет", "без дедлайна", "none", "no"})
 
-def parse_deadline(text: str) -> datetime | None:
-    t = (text or "").strip().lower()
-    if not t or t in {"-", "нет", "без дедлайна"}:
+FORMAT_HINT = (
+    "Неверный формат даты. Примеры: 2025-03-01, 2025-03-01 15:00, 01.03, "
+    "01.03.2025 15:00, завтра 10:00, в пятницу 15:00, через 3 дня, +2h."
+)
+OUT_OF_RANGE = "Дата вне допустимого диапазона."
+
+# Один проход по строке: альтернативы пробуются в этом порядке
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ISO>\d{4}-\d{1,2}-\d{1,2})
+  | (?P<DATE>\d{1,2}\.\d{1,2}(?:\.\d{2}(?:\d{2})?)?)
+  | (?P<TIME>\d{1,2}:\d{2})
+  | (?P<REL>\+\d+\s*[a-zа-я]+)
+  | (?P<NUM>\d+)
+  | (?P<WORD>[a-zа-я]+)
+  | (?P<SP>[\s,]+)
+    """,
+    re.VERBOSE,
+)
+_REL_RE = re.compile(r"\+(\d+)\s*([a-zа-я]+)")
+_SPACES_RE = re.compile(r"\s+")
+
+_MINUTE = timedelta(minutes=1)
+_HOUR = timedelta(hours=1)
+_DAY = timedelta(days=1)
+_WEEK = timedelta(weeks=1)
+
+
+def _forms(value, *words: str) -> dict[str, tuple]:
+    return {w: value for w in words}
+
+
+# Словарь: слово -> (вид токена, значение). Вид None — служебное слово
+VOCAB: dict[str, tuple[str | None, object]] = {
+    **_forms((None, None), "в", "во", "к", "до", "на", "at", "on", "by", "in"),
+    **_forms(("IN", None), "через"),
+    **_forms(("DAY", 0), "сегодня", "today"),
+    **_forms(("DAY", 1), "завтра", "tomorrow"),
+    **_forms(("DAY", 2), "послезавтра"),
+    **_forms(("WEEKDAY", 0), "понедельник", "пн", "monday", "mon"),
+    **_forms(("WEEKDAY", 1), "вторник", "вт", "tuesday", "tue"),
+    **_forms(("WEEKDAY", 2), "среда", "среду", "ср", "wednesday", "wed"),
+    **_forms(("WEEKDAY", 3), "четверг", "чт", "thursday", "thu"),
+    **_forms(("WEEKDAY", 4), "пятница", "пятницу", "пт", "friday", "fri"),
+    **_forms(("WEEKDAY", 5), "суббота", "субботу", "сб", "saturday", "sat"),
+    **_forms(("WEEKDAY", 6), "воскресенье", "вс", "sunday", "sun"),
+    **_forms(
+        ("UNIT", _MINUTE), "минуту", "минуты", "минут", "мин", "minute", "minutes"
+    ),
+    **_forms(("UNIT", _HOUR), "час", "часа", "часов", "ч", "hour", "hours"),
+    **_forms(("UNIT", _DAY), "день", "дня", "дней", "сутки", "суток", "day", "days"),
+    **_forms(("UNIT", _WEEK), "неделю", "недели", "недель", "week", "weeks"),
+}
+
+# Единицы «+2h»: без пробела и в короткой форме
+REL_UNITS: dict[str, timedelta] = {
+    **_forms(_MINUTE, "m", "min", "м", "мин"),
+    **_forms(_HOUR, "h", "ч"),
+    **_forms(_DAY, "d", "д"),
+    **_forms(_WEEK, "w", "н", "нед"),
+}
+
+
+def _at(day: datetime, hm: tuple[int, int]) -> datetime:
+    return day.replace(hour=hm[0], minute=hm[1], second=0, microsecond=0)
+
+
+def _day(now: datetime, offset: int, hm: tuple[int, int] | None) -> datetime:
+    if hm is None:
+        # «сегодня» без времени — до конца дня
+        hm = (23, 59) if offset == 0 else DEFAULT_TIME
+    return _at(now + timedelta(days=offset), hm)
+
+
+def _weekday(now: datetime, wd: int, hm: tuple[int, int] | None) -> datetime:
+    ahead = (wd - now.weekday()) % 7
+    dt = _at(now + timedelta(days=ahead), hm or DEFAULT_TIME)
+    return dt if dt > now else dt + _WEEK
+
+
+def _clock(now: datetime, hm: tuple[int, int]) -> datetime:
+    dt = _at(now, hm)
+    return dt if dt > now else dt + _DAY
+
+
+def _dm(now: datetime, dm: tuple[int, int, int | None], hm) -> datetime:
+    d, m, y = dm
+    dt = _at(datetime(y if y is not None else now.year, m, d), hm or DEFAULT_TIME)
+    if y is None and dt < now:
+        dt = dt.replace(year=now.year + 1)  # «01.03» в декабре — следующий год
+    return dt
+
+
+Rule = Callable[[datetime, Sequence], datetime]
+
+# Грамматика: последовательность видов токенов -> сборка даты.
+# Разбор — один поиск по словарю, так что цена вызова не зависит от числа правил.
+RULES: dict[tuple[str, ...], Rule] = {
+    ("DAY",): lambda now, v: _day(now, v[0], None),
+    ("DAY", "TIME"): lambda now, v: _day(now, v[0], v[1]),
+    ("TIME", "DAY"): lambda now, v: _day(now, v[1], v[0]),
+    ("WEEKDAY",): lambda now, v: _weekday(now, v[0], None),
+    ("WEEKDAY", "TIME"): lambda now, v: _weekday(now, v[0], v[1]),
+    ("TIME", "WEEKDAY"): lambda now, v: _weekday(now, v[1], v[0]),
+    ("TIME",): lambda now, v: _clock(now, v[0]),
+    ("IN", "UNIT"): lambda now, v: now + v[1],
+    ("IN", "NUM", "UNIT"): lambda now, v: now + v[1] * v[2],
+    ("NUM", "UNIT"): lambda now, v: now + v[0] * v[1],
+    ("REL",): lambda now, v: now + v[0],
+    ("ISO",): lambda now, v: _dm(now, v[0], None),
+    ("ISO", "TIME"): lambda now, v: _dm(now, v[0], v[1]),
+    ("DATE",): lambda now, v: _dm(now, v[0], None),
+    ("DATE", "TIME"): lambda now, v: _dm(now, v[0], v[1]),
+    ("TIME", "DATE"): lambda now, v: _dm(now, v[1], v[0]),
+}
+
+
+class DeadlineGrammar:
+    """
+    Разбор дедлайна: токенизатор в один проход (одно предкомпилированное
+    регулярное выражение со всеми альтернативами) и таблица правил по
+    последовательности видов токенов. Новые формы добавляются строкой в
+    vocab/rules, без ещё одного regex на вызов.
+    """
+
+    def __init__(
+        self,
+        vocab: dict[str, tuple[str | None, object]],
+        rules: dict[tuple[str, ...], Rule],
+        rel_units: dict[str, timedelta],
+    ):
+        self.vocab = vocab
+        self.rules = rules
+        self.rel_units = rel_units
+
+    def tokenize(self, text: str) -> tuple[tuple[str, ...], list]:
+        kinds: list[str] = []
+        values: list = []
+        pos, end = 0, len(text)
+        while pos < end:
+            m = _TOKEN_RE.match(text, pos)
+            if m is None:
+                raise ValueError(FORMAT_HINT)
+            pos = m.end()
+            kind, raw = m.lastgroup, m.group()
+            if kind == "SP":
+                continue
+            if kind == "WORD":
+                kind, value = self.vocab.get(raw, ("?", raw))
+                if kind is None:
+                    continue
+                if kind == "?":
+                    raise ValueError(FORMAT_HINT)
+            elif kind == "NUM":
+                value = int(raw)
+            elif kind == "TIME":
+                h, mi = raw.split(":")
+                value = (int(h), int(mi))
+            elif kind == "ISO":
+                y, mo, d = raw.split("-")
+                value = (int(d), int(mo), int(y))
+            elif kind == "DATE":
+                parts = [int(p) for p in raw.split(".")]
+                year = parts[2] if len(parts) == 3 else None
+                if year is not None and year < 100:
+                    year += 2000
+                value = (parts[0], parts[1], year)
+            else:  # REL
+                n, unit = _REL_RE.fullmatch(raw).groups()
+                if unit not in self.rel_units:
+                    raise ValueError(FORMAT_HINT)
+                value = int(n) * self.rel_units[unit]
+                if kinds and kinds[-1] == "REL":  # «+1d +2h»
+                    values[-1] += value
+                    continue
+            kinds.append(kind)
+            values.append(value)
+        return tuple(kinds), values
+
+    def parse(self, text: str, now: datetime) -> datetime:
+        try:
+            kinds, values = self.tokenize(text)
+        except OverflowError:  # +1000000000d: timedelta не строится
+            raise ValueError(OUT_OF_RANGE) from None
+        rule = self.rules.get(kinds)
+        if rule is None:
+            raise ValueError(FORMAT_HINT)
+        try:
+            dt = rule(now, values)
+        except OverflowError:  # дальше datetime.max
+            raise ValueError(OUT_OF_RANGE) from None
+        except ValueError:  # 31.02, 25:00, год 0 и т.п.
+            raise ValueError(FORMAT_HINT) from None
+        return dt.replace(second=0, microsecond=0)
+
+
+GRAMMAR = DeadlineGrammar(VOCAB, RULES, REL_UNITS)
+
+
+def normalize(text: str | None) -> str:
+    return _SPACES_RE.sub(" ", (text or "").strip().lower().replace("ё", "е"))
+
+
+@lru_cache(maxsize=4096)
+def _parse_cached(norm: str, minute: int) -> datetime:
+    # относительные формы зависят от «сейчас» — ключ включает минуту
+    return GRAMMAR.parse(norm, datetime.fromtimestamp(minute * 60))
+
+
+def _minute(now: datetime | None) -> int:
+    return int((now.timestamp() if now else time.time()) // 60)
+
+
+def parse_deadline(text: str, now: datetime | None = None) -> datetime | None:
+    t = normalize(text)
+    if not t or t in NO_DEADLINE:
         return None
+    return _parse_cached(t, _minute(now))
+
 
-    # быстрые хэлперы
-    now = datetime.now()
-    if t in {"сегодня", "today"}:
-        return now.replace(hour=23, minute=59, second=0, microsecond=0)
-    if t in {"завтра", "tomorrow"}:
-        d = now + timedelta(days=1)
-        return d.replace(hour=18, minute=0, second=0, microsecond=0)
-
-    # YYYY-MM-DD HH:MM
-    m = re.fullmatch(r"(\d{4}-\d{2}-\d{2})\s+(\d{2}:\d{2})", t)
-    if m:
-        return datetime.strptime(t, FMT_DATETIME)
-
-    # YYYY-MM-DD
-    m = re.fullmatch(r"\d{4}-\d{2}-\d{2}", t)
-    if m:
-        d = datetime.strptime(t, FMT_DATE)
-        return d.replace(hour=18, minute=0)
-
-    raise ValueError(
-        "Неверный формат даты. Используйте YYYY-MM-DD или YYYY-MM-DD HH:MM."
-    )
+def parse_deadlines(
+    texts: Iterable[str | None], now: datetime | None = None
+) -> list[datetime | None | ValueError]:
+    """
+    Пакетный разбор (импорт): одно «сейчас» на всю пачку, повторы
+    берутся из кэша. Ошибка строки не прерывает разбор — на её месте
+    в результате стоит ValueError.
+    """
+    minute = _minute(now)
+    out: list[datetime | None | ValueError] = []
+    for text in texts:
+        t = normalize(text)
+        if not t or t in NO_DEADLINE:
+            out.append(None)
+            continue
+        try:
+            out.append(_parse_cached(t, minute))
+        except ValueError as e:
+            out.append(e)
+    return out
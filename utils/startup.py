@@ -0,0 +1,60 @@
+# app/utils/startup.py
+from __future__ import annotations
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from config import LOGGER
+
+
+def _process_age() -> float:
+    """Сколько секунд назад стартовал процесс (Linux, /proc); иначе 0."""
+    try:
+        with open("/proc/self/stat") as f:
+            # поле 22 — время старта в тиках с загрузки; имя процесса в скобках
+            started = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - started / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class StartupTimer:
+    """
+    Отчёт о холодном старте: сколько ушло на запуск интерпретатора и
+    импорты, инициализацию БД, регистрацию webhook и т.д. Первый шаг
+    отсчитывается от старта процесса, следующие — от конца предыдущего.
+    """
+
+    def __init__(self):
+        self._t0 = time.perf_counter() - _process_age()
+        self._last = self._t0
+        self.steps: list[tuple[str, float]] = []
+        self.notes: list[str] = []
+
+    def mark(self, name: str) -> None:
+        """Закрывает шаг name: время с конца предыдущего шага."""
+        now = time.perf_counter()
+        self.steps.append((name, now - self._last))
+        self._last = now
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._last = time.perf_counter()
+            self.steps.append((name, self._last - started))
+
+    def report(self) -> None:
+        total = time.perf_counter() - self._t0
+        parts = ", ".join(f"{name} {sec * 1000:.0f}ms" for name, sec in self.steps)
+        notes = f" ({'; '.join(self.notes)})" if self.notes else ""
+        LOGGER.info("Startup in %.0fms: %s%s", total * 1000, parts, notes)
+
+
+STARTUP = StartupTimer()
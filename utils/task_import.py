@@ -0,0 +1,93 @@
+# app/utils/task_import.py
+from __future__ import annotations
+
+import csv
+import itertools
+from datetime import datetime
+from typing import Iterable, NamedTuple
+
+from utils.datetime_parse import parse_deadlines
+
+TITLE_LIMIT = 200
+CATEGORY_LIMIT = 64  # Category.name — String(64)
+HEADERS = {
+    ("category", "title", "deadline"),
+    ("категория", "задача", "дедлайн"),
+    ("категория", "название", "дедлайн"),
+}
+
+
+class ImportRow(NamedTuple):
+    line: int
+    category: str | None
+    title: str
+    deadline: datetime | None
+
+
+def _sniff_delimiter(line: str) -> str:
+    # «;» — основной формат, CSV из таблиц бывает и через запятую/таб
+    counts = {d: line.count(d) for d in (";", "\t", ",")}
+    best = max(counts, key=counts.get)
+    return best if counts[best] else ";"
+
+
+def parse_rows(
+    lines: Iterable[str], max_rows: int, delimiter: str | None = None
+) -> tuple[list[ImportRow], list[tuple[int, str]]]:
+    """
+    Разбор строк «категория;название;дедлайн» по мере чтения.
+
+    lines — любой итератор строк (текст сообщения или открытый файл),
+    целиком в память не читается; после max_rows строк чтение
+    прекращается. Поля справа можно опускать: «категория;название»
+    или просто «название». Строка заголовка пропускается.
+    Возвращает годные строки и ошибки (номер строки, текст ошибки).
+    """
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return [], []
+    reader = csv.reader(
+        itertools.chain([first], lines),
+        delimiter=delimiter or _sniff_delimiter(first),
+        skipinitialspace=True,
+    )
+
+    raw: list[tuple[int, str | None, str, str]] = []
+    errors: list[tuple[int, str]] = []
+    for fields in reader:
+        fields = [f.strip() for f in fields]
+        if not any(fields):
+            continue
+        line = reader.line_num
+        if not raw and not errors and tuple(f.lower() for f in fields[:3]) in HEADERS:
+            continue
+        if len(raw) + len(errors) >= max_rows:
+            errors.append((line, f"больше {max_rows} строк, остальные пропущены"))
+            break
+        if len(fields) > 3:
+            errors.append((line, "больше трёх полей"))
+            continue
+        if len(fields) == 1:
+            fields = ["", fields[0]]
+        category, title = fields[0] or None, fields[1]
+        deadline = fields[2] if len(fields) == 3 else ""
+        if not title:
+            errors.append((line, "пустое название"))
+        elif len(title) > TITLE_LIMIT:
+            errors.append((line, f"название длиннее {TITLE_LIMIT} символов"))
+        elif category and len(category) > CATEGORY_LIMIT:
+            # иначе INSERT категории упадёт на Postgres и потянет всю пачку
+            errors.append((line, f"категория длиннее {CATEGORY_LIMIT} символов"))
+        else:
+            raw.append((line, category, title, deadline))
+
+    rows: list[ImportRow] = []
+    deadlines = parse_deadlines(r[3] for r in raw)
+    for (line, category, title, _), dl in zip(raw, deadlines):
+        if isinstance(dl, ValueError):
+            errors.append((line, "не удалось разобрать дедлайн"))
+        else:
+            rows.append(ImportRow(line, category, title, dl))
+    errors.sort()
+    return rows, errors